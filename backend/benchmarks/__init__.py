@@ -0,0 +1,8 @@
+"""
+Benchmarks
+Reproducible load tests against an in-memory PostgREST stand-in.
+
+The app runs in-process with its real Supabase client; only the HTTP
+transport underneath is replaced by benchmarks.fake_postgrest, seeded by
+benchmarks.seed. Run `python -m benchmarks.run --help` from backend/.
+"""
@@ -0,0 +1,44 @@
+"""
+Compare two benchmark reports.
+
+    python -m benchmarks.compare base.json head.json --threshold 10 --fail-on-regression
+"""
+
+import argparse
+import json
+import sys
+
+from benchmarks.report import compare_reports
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare", description="Diff two benchmark runs.")
+    parser.add_argument("base", help="Report from the baseline commit")
+    parser.add_argument("head", help="Report from the commit under test")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0,
+        help="Percent p95 increase or req/s drop counted as a regression",
+    )
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if anything regressed")
+    args = parser.parse_args(argv)
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+
+    lines, regressions = compare_reports(base, head, args.threshold)
+    print("\n".join(lines))
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:g}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1 if args.fail_on_regression else 0
+
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
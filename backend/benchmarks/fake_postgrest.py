@@ -0,0 +1,815 @@
+"""
+Fake PostgREST
+In-memory stand-in for the subset of the Supabase REST API the app uses.
+
+FakePostgREST is an httpx transport: the real supabase client builds and
+sends its requests as usual and they are answered from Python dicts. It
+understands the filters, logic trees, ordering, paging and Accept/Prefer
+headers the routes and services send, and implements the SQL functions
+of schema.sql and schema_auth.sql. A fixed per-request latency stands in
+for the network and the database.
+
+Tables keep hash indexes on the columns the schema indexes, and ordered
+scans start at the first row a range filter on the leading sort column
+can match, so keyset pages cost what an index seek would. Spatial and
+search functions are answered by the app's own in-process indexes
+(services.geo_index / services.search_index), not by PostGIS plans.
+"""
+
+import json
+import math
+import operator
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from uuid import uuid4
+
+import httpx
+
+from benchmarks.support import geo_index, search_index
+
+MAX_MERCATOR_LAT = geo_index.MAX_MERCATOR_LAT
+GridIndex = geo_index.GridIndex
+SearchIndex = search_index.SearchIndex
+
+REST_PREFIX = "/rest/v1/"
+SINGLE_OBJECT_MEDIA_TYPE = "application/vnd.pgrst.object+json"
+
+# Column default meaning "insert time"
+NOW = object()
+# Return value of functions declared RETURNS void
+VOID = object()
+
+# (kind, column, op, value, negated) or (kind, children, negated)
+Node = tuple
+Order = List[Tuple[str, bool]]  # (column, descending)
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class PostgrestError(Exception):
+    """An error answered with PostgREST's JSON error body."""
+
+    def __init__(self, status_code: int, code: str, message: str, details: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = {"code": code, "message": message, "details": details, "hint": None}
+
+
+# ============================================
+# Tables
+# ============================================
+
+class Table:
+    """Rows keyed by primary key, with hash indexes and cached sort orders."""
+
+    def __init__(
+        self,
+        name: str,
+        defaults: Dict[str, Any],
+        primary_key: str = "id",
+        indexes: Sequence[str] = (),
+        unique: Sequence[Sequence[str]] = (),
+    ):
+        self.name = name
+        self.defaults = defaults
+        self.primary_key = primary_key
+        self.unique = [tuple(columns) for columns in unique]
+        self.rows: Dict[Any, dict] = {}
+        self.indexes: Dict[str, Dict[Any, Set[Any]]] = {
+            column: {} for column in (*indexes, *(columns[0] for columns in self.unique))
+        }
+        self._layout_version = 0  # inserts and deletes
+        self._column_versions: Counter = Counter()  # updates, per column
+        self._sorted: Dict[tuple, Tuple[tuple, List[dict], Optional[list]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def insert(self, values: dict) -> dict:
+        row = {}
+        if self.primary_key == "id" and "id" not in values:
+            row["id"] = str(uuid4())
+        for column, default in self.defaults.items():
+            row[column] = now_iso() if default is NOW else default
+        row.update(values)
+
+        pk = row.get(self.primary_key)
+        if pk is None:
+            raise PostgrestError(400, "23502", f'null value in column "{self.primary_key}" of relation "{self.name}"')
+        if pk in self.rows:
+            raise PostgrestError(409, "23505", f'duplicate key value violates unique constraint "{self.name}_pkey"')
+        self._check_unique(row)
+
+        self.rows[pk] = row
+        for column, index in self.indexes.items():
+            if row.get(column) is not None:
+                index.setdefault(row[column], set()).add(pk)
+        self._layout_version += 1
+        return row
+
+    def update(self, row: dict, changes: dict) -> dict:
+        pk = row[self.primary_key]
+        self._check_unique({**row, **changes}, ignore=pk)
+
+        for column, value in changes.items():
+            index = self.indexes.get(column)
+            if index is not None and row.get(column) != value:
+                if row.get(column) is not None:
+                    index[row[column]].discard(pk)
+                if value is not None:
+                    index.setdefault(value, set()).add(pk)
+            self._column_versions[column] += 1
+        row.update(changes)
+        return row
+
+    def delete(self, row: dict) -> None:
+        pk = row[self.primary_key]
+        for column, index in self.indexes.items():
+            if row.get(column) is not None:
+                index[row[column]].discard(pk)
+        del self.rows[pk]
+        self._layout_version += 1
+
+    def _check_unique(self, row: dict, ignore: Any = None) -> None:
+        for columns in self.unique:
+            values = [row.get(column) for column in columns]
+            if any(value is None for value in values):
+                continue
+            for pk in self.indexes[columns[0]].get(values[0], ()):
+                other = self.rows[pk]
+                if pk != ignore and all(other.get(c) == v for c, v in zip(columns, values)):
+                    raise PostgrestError(
+                        409, "23505",
+                        f'duplicate key value violates unique constraint "{self.name}_{"_".join(columns)}_key"',
+                    )
+
+    def lookup(self, column: str, value: Any) -> Optional[List[dict]]:
+        """Rows with column = value through the primary key or an index; None if unindexed."""
+        if column == self.primary_key:
+            row = self.rows.get(value)
+            return [row] if row is not None else []
+        index = self.indexes.get(column)
+        if index is None:
+            return None
+        return [self.rows[pk] for pk in index.get(value, ())]
+
+    def sorted_rows(self, order: Order) -> Tuple[List[dict], Optional[list]]:
+        """
+        All rows in `order`, cached until an insert, delete or update of a sort column.
+
+        Returns:
+            (rows, ascending values of the leading sort column or None if it has NULLs)
+        """
+        key = tuple(order)
+        version = (self._layout_version, *(self._column_versions[column] for column, _ in order))
+        cached = self._sorted.get(key)
+        if cached is None or cached[0] != version:
+            rows = sort_rows(self.rows.values(), order)
+            column, desc = order[0]
+            leading = [row.get(column) for row in (reversed(rows) if desc else rows)]
+            keys = None if any(value is None for value in leading) else leading
+            cached = self._sorted[key] = (version, rows, keys)
+        return cached[1], cached[2]
+
+
+def sort_rows(rows: Iterable[dict], order: Order) -> List[dict]:
+    """Sort like PostgreSQL: NULLS LAST ascending, NULLS FIRST descending."""
+    rows = list(rows)
+    for column, desc in reversed(order):
+        rows.sort(key=lambda row: (row.get(column) is None, row.get(column) if row.get(column) is not None else 0),
+                  reverse=desc)
+    return rows
+
+
+# Column defaults and indexes from schema.sql / schema_auth.sql
+TABLES = {
+    "users": dict(
+        defaults={
+            "avatar_url": None, "level": "初学者", "total_stars": 0, "email": None, "phone": None,
+            "password_hash": None, "is_verified": False, "created_at": NOW, "updated_at": NOW,
+        },
+        unique=[("email",), ("phone",)],
+    ),
+    "daily_trivia": dict(
+        defaults={
+            "description": None, "image_url": None, "location": None, "region": None,
+            "featured_date": None, "created_at": NOW,
+        },
+    ),
+    "levels": dict(defaults={"description": None, "unlock_requirement": 0, "created_at": NOW}),
+    "user_level_progress": dict(
+        defaults={
+            "status": "locked", "score": 0, "stars": 0, "completion_percentage": 0, "completed_at": None,
+        },
+        indexes=["level_id"],
+        unique=[("user_id", "level_id")],
+    ),
+    "mistakes": dict(
+        defaults={
+            "question": None, "category": None, "mastery_level": None, "image_url": None, "added_at": NOW,
+        },
+        indexes=["user_id"],
+    ),
+    "geographic_features": dict(
+        defaults={
+            "description": None, "feature_type": None, "latitude": None, "longitude": None,
+            "region": None, "image_url": None, "stats": None, "created_at": NOW,
+        },
+    ),
+    "ar_landforms": dict(
+        defaults={"description": None, "type": None, "image_url": None, "elevation": None, "created_at": NOW},
+        indexes=["type"],
+    ),
+    "verification_codes": dict(defaults={"used": False, "created_at": NOW}, indexes=["target"]),
+    "refresh_tokens": dict(
+        defaults={"created_at": NOW, "revoked": False, "jti": None, "family_id": None, "parent_jti": None},
+        indexes=["user_id", "token_hash", "family_id"],
+        unique=[("jti",), ("parent_jti",)],
+    ),
+    "refresh_token_families": dict(defaults={"created_at": NOW, "revoked_at": None}, indexes=["user_id"]),
+    "scheduler_leases": dict(defaults={}, primary_key="name"),
+}
+
+
+# ============================================
+# Filters
+# ============================================
+
+_COMPARATORS = {
+    "eq": operator.eq,
+    "neq": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split a logic-tree body on commas outside parentheses and quotes."""
+    items, depth, quoted, escaped, start = [], 0, False, False, 0
+    for i, char in enumerate(text):
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            items.append(text[start:i])
+            start = i + 1
+    items.append(text[start:])
+    return [item for item in items if item]
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def parse_condition(column: str, expression: str) -> Node:
+    """Parse `op.value` or `not.op.value` for a column."""
+    negated = expression.startswith("not.")
+    if negated:
+        expression = expression[4:]
+    op, _, value = expression.partition(".")
+    return ("cond", column, op, _unquote(value), negated)
+
+
+def parse_logic(kind: str, expression: str, negated: bool = False) -> Node:
+    """Parse an `or=(...)` / `and=(...)` logic tree."""
+    children = []
+    for item in _split_top_level(expression.strip()[1:-1]):
+        nested = re.match(r"(not\.)?(and|or)(\(.*\))$", item, re.S)
+        if nested:
+            children.append(parse_logic(nested.group(2), nested.group(3), bool(nested.group(1))))
+        else:
+            column, _, rest = item.partition(".")
+            children.append(parse_condition(column, rest))
+    return (kind, children, negated)
+
+
+@lru_cache(maxsize=256)
+def _like_pattern(pattern: str, case_insensitive: bool) -> "re.Pattern":
+    regex = "".join(
+        ".*" if char in "%*" else "." if char == "_" else re.escape(char)
+        for char in pattern
+    )
+    return re.compile(regex, re.S | (re.I if case_insensitive else 0))
+
+
+def _coerce(sample: Any, text: str) -> Any:
+    """Convert a filter value to the type of the column value it is compared with."""
+    if isinstance(sample, bool):
+        return text.lower() in ("true", "t", "1")
+    if isinstance(sample, (int, float)):
+        try:
+            return float(text)
+        except ValueError:
+            raise PostgrestError(400, "22P02", f'invalid input syntax for type numeric: "{text}"')
+    return text
+
+
+def _compare(actual: Any, op: str, text: str) -> bool:
+    if op == "is":
+        return {"null": actual is None, "true": actual is True, "false": actual is False}.get(text.lower(), False)
+    if actual is None:
+        return False
+    if op in ("like", "ilike"):
+        return _like_pattern(text, op == "ilike").fullmatch(str(actual)) is not None
+    if op == "in":
+        return any(actual == _coerce(actual, _unquote(item)) for item in _split_top_level(text.strip()[1:-1]))
+    comparator = _COMPARATORS.get(op)
+    if comparator is None:
+        raise PostgrestError(400, "PGRST100", f'"{op}" is not a supported operator')
+    return comparator(actual, _coerce(actual, text))
+
+
+def matches(row: dict, node: Node) -> bool:
+    if node[0] == "cond":
+        _, column, op, value, negated = node
+        result = _compare(row.get(column), op, value)
+    else:
+        kind, children, negated = node
+        combine = all if kind == "and" else any
+        result = combine(matches(row, child) for child in children)
+    return result != negated
+
+
+def implied_range(node: Node, column: str, sample: Any) -> Tuple[Any, Any]:
+    """Inclusive (low, high) bounds on `column` that every row matching `node` satisfies."""
+    if node[0] == "cond":
+        _, cond_column, op, value, negated = node
+        if negated or cond_column != column or op not in ("eq", "gt", "gte", "lt", "lte"):
+            return None, None
+        value = _coerce(sample, value)
+        return (value if op in ("eq", "gt", "gte") else None, value if op in ("eq", "lt", "lte") else None)
+
+    kind, children, negated = node
+    if negated or not children:
+        return None, None
+    bounds = [implied_range(child, column, sample) for child in children]
+    lows = [low for low, _ in bounds]
+    highs = [high for _, high in bounds]
+    if kind == "and":
+        lows = [low for low in lows if low is not None]
+        highs = [high for high in highs if high is not None]
+        return (max(lows) if lows else None, min(highs) if highs else None)
+    # or: only bounds every branch shares
+    return (
+        None if None in lows else min(lows),
+        None if None in highs else max(highs),
+    )
+
+
+def parse_order(text: str) -> Order:
+    order = []
+    for part in text.split(","):
+        column, *modifiers = part.split(".")
+        order.append((column, "desc" in modifiers))
+    return order
+
+
+# ============================================
+# Transport
+# ============================================
+
+class FakePostgREST(httpx.BaseTransport):
+    """
+    httpx transport answering Supabase REST calls from memory.
+
+    Args:
+        latency_ms: Delay added to every request (network + database time)
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_seconds = latency_ms / 1000
+        self.tables = {name: Table(name, **spec) for name, spec in TABLES.items()}
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._geo_index = GridIndex()
+        self._search_index = SearchIndex()
+
+    # Direct access (seeding) -------------------------------------------------
+
+    def insert(self, table: str, values: dict) -> dict:
+        """Insert a row without a round-trip."""
+        with self._lock:
+            return self._insert(self._table(table), values)
+
+    def stats(self) -> dict:
+        """Row counts and round-trips per endpoint since the last reset."""
+        return {
+            "rows": {name: len(table) for name, table in self.tables.items()},
+            "requests": sum(self.calls.values()),
+            "by_endpoint": dict(self.calls.most_common()),
+        }
+
+    def reset_stats(self) -> None:
+        self.calls.clear()
+
+    # httpx.BaseTransport -------------------------------------------------------
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+        path = request.url.path
+        if not path.startswith(REST_PREFIX):
+            return self._respond(404, {"code": "PGRST000", "message": f"Unknown path {path}"})
+        name = path[len(REST_PREFIX):]
+        self.calls[f"{request.method} {name}"] += 1
+
+        try:
+            with self._lock:
+                if name.startswith("rpc/"):
+                    params = json.loads(request.content) if request.content else {}
+                    result = self._call(name[len("rpc/"):], params)
+                    return self._respond(204) if result is VOID else self._respond(200, result)
+                return self._table_request(request, self._table(name))
+        except PostgrestError as e:
+            return self._respond(e.status_code, e.body)
+
+    @staticmethod
+    def _respond(status_code: int, payload: Any = None) -> httpx.Response:
+        if status_code == 204:
+            return httpx.Response(204)
+        return httpx.Response(
+            status_code,
+            content=json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(),
+            headers={"content-type": "application/json; charset=utf-8"},
+        )
+
+    def _table(self, name: str) -> Table:
+        table = self.tables.get(name)
+        if table is None:
+            raise PostgrestError(404, "PGRST205", f"Could not find the table 'public.{name}' in the schema cache")
+        return table
+
+    # Table requests ----------------------------------------------------------
+
+    def _table_request(self, request: httpx.Request, table: Table) -> httpx.Response:
+        params = request.url.params
+        filters = []
+        for key, value in params.multi_items():
+            if key in ("or", "and"):
+                filters.append(parse_logic(key, value))
+            elif key in ("not.or", "not.and"):
+                filters.append(parse_logic(key[4:], value, negated=True))
+            elif key not in ("select", "order", "limit", "offset", "columns", "on_conflict"):
+                filters.append(parse_condition(key, value))
+
+        prefer = request.headers.get("prefer", "")
+        representation = "return=representation" in prefer
+        single = SINGLE_OBJECT_MEDIA_TYPE in request.headers.get("accept", "")
+
+        if request.method == "POST":
+            body = json.loads(request.content)
+            rows = [self._insert(table, values) for values in (body if isinstance(body, list) else [body])]
+            return self._respond(201, self._project(rows, params.get("select"))) if representation \
+                else httpx.Response(201)
+
+        order = parse_order(params["order"]) if "order" in params else []
+        offset = int(params.get("offset", 0))
+        limit = int(params["limit"]) if "limit" in params else None
+
+        if request.method == "GET":
+            rows = self._select(table, filters, order, offset, limit)
+        elif request.method == "PATCH":
+            changes = json.loads(request.content)
+            rows = [table.update(row, changes) for row in self._select(table, filters, order, offset, limit)]
+        elif request.method == "DELETE":
+            rows = self._select(table, filters, order, offset, limit)
+            for row in rows:
+                table.delete(row)
+        else:
+            raise PostgrestError(405, "PGRST117", f"Unsupported HTTP method: {request.method}")
+
+        if request.method != "GET" and not representation:
+            return httpx.Response(204)
+
+        rows = self._project(rows, params.get("select"))
+        if single:
+            if len(rows) != 1:
+                raise PostgrestError(
+                    406, "PGRST116", "JSON object requested, multiple (or no) rows returned",
+                    f"The result contains {len(rows)} rows",
+                )
+            return self._respond(200, rows[0])
+        return self._respond(200, rows)
+
+    def _insert(self, table: Table, values: dict) -> dict:
+        row = table.insert(values)
+        if table.name == "geographic_features":
+            self._geo_index.insert(row)
+            self._search_index.add(row)
+        return row
+
+    @staticmethod
+    def _project(rows: List[dict], select: Optional[str]) -> List[dict]:
+        if not select or select == "*":
+            return [dict(row) for row in rows]
+        columns = [column.strip() for column in select.split(",")]
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    def _select(
+        self,
+        table: Table,
+        filters: List[Node],
+        order: Order,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> List[dict]:
+        candidates: Optional[Iterable[dict]] = None
+        for node in filters:
+            if node[0] == "cond" and node[2] == "eq" and not node[4]:
+                candidates = table.lookup(node[1], node[3])
+                if candidates is not None:
+                    break
+
+        if candidates is not None:
+            if order:
+                candidates = sort_rows(candidates, order)
+        elif order:
+            rows, keys = table.sorted_rows(order)
+            start, stop = 0, len(rows)
+            if keys:
+                # Seek to the range the leading sort column can match, like an index scan
+                column, desc = order[0]
+                low, high = implied_range(("and", filters, False), column, keys[0])
+                first = 0 if low is None else bisect_left(keys, low)
+                last = len(keys) if high is None else bisect_right(keys, high)
+                start, stop = (len(keys) - last, len(keys) - first) if desc else (first, last)
+            candidates = (rows[i] for i in range(start, stop))
+        else:
+            candidates = list(table.rows.values())
+
+        result = []
+        skipped = 0
+        for row in candidates:
+            if all(matches(row, node) for node in filters):
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                result.append(row)
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+    # Functions ---------------------------------------------------------------
+
+    def _call(self, name: str, params: dict) -> Any:
+        function = getattr(self, f"_fn_{name}", None)
+        if function is None:
+            raise PostgrestError(404, "PGRST202", f"Could not find the function public.{name}")
+        try:
+            return function(**params)
+        except TypeError as e:
+            raise PostgrestError(404, "PGRST202", f"Could not find the function public.{name}: {e}")
+
+    def _fn_get_user_level_progress(self, p_user_id: str) -> List[dict]:
+        progress = {row["level_id"]: row for row in self.tables["user_level_progress"].lookup("user_id", p_user_id)}
+        result = []
+        for level in sort_rows(self.tables["levels"].rows.values(), [("order_index", False)]):
+            row = progress.get(level["id"], {})
+            result.append({
+                "id": row.get("id"),
+                "user_id": p_user_id,
+                "level_id": level["id"],
+                "status": row.get("status") or "locked",
+                "score": row.get("score") or 0,
+                "stars": row.get("stars") or 0,
+                "completion_percentage": row.get("completion_percentage") or 0,
+                "completed_at": row.get("completed_at"),
+                "level_name": level["name"],
+                "level_order": level["order_index"],
+            })
+        return result
+
+    def _fn_upsert_user_level_progress(
+        self,
+        p_user_id: str,
+        p_level_id: str,
+        p_status: Optional[str] = None,
+        p_score: Optional[int] = None,
+        p_stars: Optional[int] = None,
+        p_completion_percentage: Optional[int] = None,
+    ) -> List[dict]:
+        users = self.tables["users"]
+        progress = self.tables["user_level_progress"]
+        if p_user_id not in users.rows or p_level_id not in self.tables["levels"].rows:
+            raise PostgrestError(409, "23503", "insert or update on table \"user_level_progress\" violates foreign key constraint")
+
+        existing = next(
+            (row for row in progress.lookup("user_id", p_user_id) if row["level_id"] == p_level_id), None
+        )
+        if existing is None:
+            row = progress.insert({
+                "user_id": p_user_id,
+                "level_id": p_level_id,
+                "status": p_status or "locked",
+                "score": p_score if p_score is not None else 0,
+                "stars": p_stars if p_stars is not None else 0,
+                "completion_percentage": p_completion_percentage if p_completion_percentage is not None else 0,
+                "completed_at": now_iso() if p_status == "completed" else None,
+            })
+            old_stars = 0
+        else:
+            old_stars = existing["stars"] or 0
+            changes = {
+                column: value for column, value in (
+                    ("status", p_status),
+                    ("score", p_score),
+                    ("stars", p_stars),
+                    ("completion_percentage", p_completion_percentage),
+                ) if value is not None
+            }
+            if p_status == "completed" and existing["completed_at"] is None:
+                changes["completed_at"] = now_iso()
+            row = progress.update(existing, changes)
+
+        # trg_user_level_progress_stars
+        delta = (row["stars"] or 0) - old_stars
+        if delta:
+            user = users.rows[p_user_id]
+            users.update(user, {"total_stars": (user["total_stars"] or 0) + delta})
+
+        return [dict(row)]
+
+    def _fn_get_user_progress_summary(self, p_user_id: str, p_include_mistakes: bool = False) -> Optional[dict]:
+        user = self.tables["users"].rows.get(p_user_id)
+        if user is None:
+            return None
+
+        progress = self.tables["user_level_progress"].lookup("user_id", p_user_id)
+        mistake_counts = None
+        if p_include_mistakes:
+            mistake_counts = Counter(
+                row["category"] for row in self.tables["mistakes"].lookup("user_id", p_user_id)
+                if row["category"] is not None
+            )
+
+        return {
+            "user_id": user["id"],
+            "total_stars": user["total_stars"] or 0,
+            "level": user["level"],
+            "completed_levels": sum(1 for row in progress if row["status"] == "completed"),
+            "current_level_id": next((row["level_id"] for row in progress if row["status"] == "active"), None),
+            "mistake_counts": dict(mistake_counts) if mistake_counts is not None else None,
+        }
+
+    def _fn_reconcile_total_stars(self, p_limit: int = 1000) -> List[dict]:
+        users = self.tables["users"]
+        actual = Counter()
+        for row in self.tables["user_level_progress"].rows.values():
+            actual[row["user_id"]] += row["stars"] or 0
+
+        drift = []
+        for user in list(users.rows.values()):
+            stored = user["total_stars"] or 0
+            if stored != actual[user["id"]]:
+                drift.append({"user_id": user["id"], "stored_stars": stored, "actual_stars": actual[user["id"]]})
+                users.update(user, {"total_stars": actual[user["id"]]})
+                if len(drift) >= p_limit:
+                    break
+        return drift
+
+    def _fn_geo_features_in_bbox(
+        self,
+        p_min_lon: float,
+        p_min_lat: float,
+        p_max_lon: float,
+        p_max_lat: float,
+        p_feature_type: Optional[str] = None,
+        p_limit: int = 500,
+    ) -> List[dict]:
+        return self._geo_index.bbox((p_min_lon, p_min_lat, p_max_lon, p_max_lat), p_feature_type, p_limit)
+
+    def _fn_geo_features_nearby(
+        self,
+        p_lat: float,
+        p_lon: float,
+        p_radius_m: float,
+        p_feature_type: Optional[str] = None,
+        p_limit: int = 20,
+    ) -> List[dict]:
+        return [
+            {**row, "distance_m": distance}
+            for distance, row in self._geo_index.nearest(p_lat, p_lon, p_radius_m, p_limit, p_feature_type)
+        ]
+
+    def _fn_geo_feature_clusters(
+        self,
+        p_min_lon: float,
+        p_min_lat: float,
+        p_max_lon: float,
+        p_max_lat: float,
+        p_level: int,
+    ) -> List[dict]:
+        n = 2 ** p_level
+        cells: Dict[Tuple[int, int], dict] = {}
+        for row in self._geo_index.bbox((p_min_lon, p_min_lat, p_max_lon, p_max_lat)):
+            lat, lon = float(row["latitude"]), float(row["longitude"])
+            if abs(lat) > MAX_MERCATOR_LAT:
+                continue
+            lat_rad = math.radians(lat)
+            cx = min(math.floor((lon + 180) / 360 * n), n - 1)
+            cy = min(math.floor((1 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2 * n), n - 1)
+            cell = cells.setdefault((cx, cy), {
+                "cell_x": cx, "cell_y": cy, "count": 0, "lat_sum": 0.0, "lon_sum": 0.0, "type_counts": Counter(),
+            })
+            cell["count"] += 1
+            cell["lat_sum"] += lat
+            cell["lon_sum"] += lon
+            cell["type_counts"][row.get("feature_type") or ""] += 1
+        return [{**cell, "type_counts": dict(cell["type_counts"])} for cell in cells.values()]
+
+    def _fn_search_geo_features(self, p_query: str, p_limit: int = 10) -> List[dict]:
+        return [{**row, "rank": score} for score, row in self._search_index.search(p_query, p_limit)]
+
+    def _fn_issue_refresh_token(
+        self,
+        p_user_id: str,
+        p_family_id: str,
+        p_jti: str,
+        p_token_hash: str,
+        p_expires_at: str,
+    ) -> object:
+        self.tables["refresh_token_families"].insert({"id": p_family_id, "user_id": p_user_id})
+        self.tables["refresh_tokens"].insert({
+            "user_id": p_user_id, "token_hash": p_token_hash, "expires_at": p_expires_at,
+            "jti": p_jti, "family_id": p_family_id,
+        })
+        return VOID
+
+    def _fn_rotate_refresh_token(
+        self,
+        p_user_id: str,
+        p_family_id: str,
+        p_parent_jti: str,
+        p_jti: str,
+        p_token_hash: str,
+        p_expires_at: str,
+    ) -> str:
+        families = self.tables["refresh_token_families"]
+        family = families.rows.get(p_family_id)
+        if family is None or family["revoked_at"] is not None:
+            return "revoked"
+
+        try:
+            self.tables["refresh_tokens"].insert({
+                "user_id": p_user_id, "token_hash": p_token_hash, "expires_at": p_expires_at,
+                "jti": p_jti, "family_id": p_family_id, "parent_jti": p_parent_jti,
+            })
+        except PostgrestError:
+            families.update(family, {"revoked_at": now_iso()})
+            return "reused"
+        return "ok"
+
+    def _fn_purge_expired_auth_data(self, p_batch_size: int = 1000) -> List[dict]:
+        now = now_iso()
+        deleted = {}
+        for table_name, output in (("verification_codes", "codes_deleted"), ("refresh_tokens", "tokens_deleted")):
+            table = self.tables[table_name]
+            expired = [row for row in table.rows.values() if row["expires_at"] < now][:p_batch_size]
+            for row in expired:
+                table.delete(row)
+            deleted[output] = len(expired)
+
+        families = self.tables["refresh_token_families"]
+        tokens = self.tables["refresh_tokens"]
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+        stale = [
+            row for row in families.rows.values()
+            if row["created_at"] < cutoff and not tokens.lookup("family_id", row["id"])
+        ][:p_batch_size]
+        for row in stale:
+            families.delete(row)
+        deleted["families_deleted"] = len(stale)
+
+        return [deleted]
+
+    def _fn_acquire_scheduler_lease(self, p_name: str, p_holder: str, p_ttl_seconds: int) -> bool:
+        leases = self.tables["scheduler_leases"]
+        expires_at = (datetime.now(timezone.utc) + timedelta(seconds=p_ttl_seconds)).isoformat()
+        lease = leases.rows.get(p_name)
+        if lease is None:
+            leases.insert({"name": p_name, "holder": p_holder, "expires_at": expires_at})
+            return True
+        if lease["holder"] == p_holder or lease["expires_at"] < now_iso():
+            leases.update(lease, {"holder": p_holder, "expires_at": expires_at})
+            return True
+        return False
@@ -0,0 +1,194 @@
+"""
+Report
+Latency recording, per-endpoint summaries and run-to-run comparison.
+
+A run is saved as JSON ({"meta": ..., "scenarios": {name: {"endpoints":
+{endpoint: summary}}}}) so two commits can be compared with
+benchmarks.compare.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Statuses that mean the server shed load on purpose (rate limit, busy pool)
+SHED_STATUSES = (429, 503)
+
+_DB_TIMING_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) calls"')
+
+
+@dataclass
+class Sample:
+    latency_seconds: float
+    status_code: int
+    response_bytes: int
+    db_ms: Optional[float]
+    db_calls: Optional[int]
+
+
+def parse_server_timing(header: Optional[str]) -> Tuple[Optional[float], Optional[int]]:
+    """DB time (ms) and round-trips from the Server-Timing header added by MetricsMiddleware."""
+    match = _DB_TIMING_RE.search(header or "")
+    if not match:
+        return None, None
+    return float(match.group(1)), int(match.group(2))
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Collects samples per endpoint name."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[Sample]] = defaultdict(list)
+        self.exceptions: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(
+        self,
+        name: str,
+        latency_seconds: float,
+        status_code: int,
+        response_bytes: int,
+        server_timing: Optional[str] = None
+    ) -> None:
+        db_ms, db_calls = parse_server_timing(server_timing)
+        self.samples[name].append(Sample(latency_seconds, status_code, response_bytes, db_ms, db_calls))
+
+    def record_exception(self, name: str, error: BaseException) -> None:
+        self.exceptions[name][type(error).__name__] += 1
+
+    @property
+    def requests(self) -> int:
+        return sum(len(samples) for samples in self.samples.values())
+
+    def summary(self, wall_seconds: float) -> Dict[str, dict]:
+        """Per-endpoint latency percentiles, throughput and status counts."""
+        result = {}
+        for name in sorted(set(self.samples) | set(self.exceptions)):
+            samples = self.samples.get(name, [])
+            latencies = sorted(sample.latency_seconds * 1000 for sample in samples)
+            statuses = Counter(sample.status_code for sample in samples)
+            shed = sum(statuses[code] for code in SHED_STATUSES)
+            ok = sum(count for code, count in statuses.items() if code < 400)
+            db_samples = [sample for sample in samples if sample.db_calls is not None]
+
+            result[name] = {
+                "count": len(samples),
+                "ok": ok,
+                "shed": shed,
+                "errors": len(samples) - ok - shed + sum(self.exceptions.get(name, {}).values()),
+                "statuses": {str(code): count for code, count in sorted(statuses.items())},
+                "exceptions": dict(self.exceptions.get(name, {})),
+                "rps": len(samples) / wall_seconds if wall_seconds else 0.0,
+                "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": latencies[-1] if latencies else 0.0,
+                "mean_bytes": sum(sample.response_bytes for sample in samples) / len(samples) if samples else 0.0,
+                "mean_db_calls": (
+                    sum(sample.db_calls for sample in db_samples) / len(db_samples) if db_samples else None
+                ),
+                "mean_db_ms": (
+                    sum(sample.db_ms for sample in db_samples) / len(db_samples) if db_samples else None
+                ),
+            }
+        return result
+
+
+def format_scenario(name: str, result: dict) -> str:
+    """Plain-text table of one scenario's endpoints."""
+    lines = [
+        f"\n== {name}: {result['requests']} requests in {result['wall_seconds']:.1f}s "
+        f"({result['rps']:.0f} req/s, {result['db_requests']} DB round-trips)",
+        f"{'endpoint':<46} {'count':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+        f"{'db/req':>6} {'bytes':>8} {'err':>5} {'shed':>5}",
+    ]
+    for endpoint, stats in result["endpoints"].items():
+        db_calls = stats["mean_db_calls"]
+        lines.append(
+            f"{endpoint[:46]:<46} {stats['count']:>7} {stats['rps']:>8.1f} "
+            f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+            f"{db_calls if db_calls is None else round(db_calls, 1)!s:>6} {stats['mean_bytes']:>8.0f} "
+            f"{stats['errors']:>5} {stats['shed']:>5}"
+        )
+    return "\n".join(lines)
+
+
+# Run settings that must match for two reports to be comparable
+COMPARABLE_META = ("scale", "concurrency", "duration_seconds", "db_latency_ms", "settings")
+
+
+def _change(base: float, head: float) -> Optional[float]:
+    return (head - base) / base * 100 if base else None
+
+
+def compare_reports(base: dict, head: dict, threshold_percent: float) -> Tuple[List[str], List[str]]:
+    """
+    Compare two saved runs endpoint by endpoint.
+
+    Returns:
+        (table lines, regressions) where a regression is a p95 increase or
+        a throughput drop larger than `threshold_percent`
+    """
+    lines, regressions = [], []
+
+    for key in COMPARABLE_META:
+        if base["meta"].get(key) != head["meta"].get(key):
+            lines.append(f"warning: {key} differs ({base['meta'].get(key)!r} vs {head['meta'].get(key)!r})")
+
+    lines.append(f"base {base['meta'].get('commit')}  ->  head {head['meta'].get('commit')}")
+
+    for scenario in sorted(set(base["scenarios"]) | set(head["scenarios"])):
+        if scenario not in base["scenarios"] or scenario not in head["scenarios"]:
+            lines.append(f"\n== {scenario} (only in {'head' if scenario in head['scenarios'] else 'base'})")
+            continue
+
+        base_endpoints = base["scenarios"].get(scenario, {}).get("endpoints", {})
+        head_endpoints = head["scenarios"].get(scenario, {}).get("endpoints", {})
+        lines.append(f"\n== {scenario}")
+        lines.append(
+            f"{'endpoint':<46} {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17} {'req/s':>17}"
+        )
+
+        for endpoint in sorted(set(base_endpoints) | set(head_endpoints)):
+            old, new = base_endpoints.get(endpoint), head_endpoints.get(endpoint)
+            if old is None or new is None:
+                lines.append(f"{endpoint[:46]:<46} {'only in ' + ('head' if old is None else 'base'):>17}")
+                continue
+
+            # Latency of a route that only errors (e.g. missing in a baseline commit) says nothing
+            sides = {"base": old, "head": new}
+            failing = [name for name, side in sides.items() if side["count"] and not side["ok"]]
+            if failing:
+                statuses = ", ".join(sorted({status for name in failing for status in sides[name]["statuses"]}))
+                lines.append(f"{endpoint[:46]:<46} {'no successes in ' + ' and '.join(failing):>17} ({statuses})")
+                if failing == ["head"]:
+                    regressions.append(f"{scenario} / {endpoint} (no successes)")
+                continue
+
+            cells = []
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "rps"):
+                change = _change(old[metric], new[metric])
+                cells.append(
+                    f"{new[metric]:>8.1f} {'' if change is None else f'{change:+.0f}%':>8}"
+                )
+            p95_change = _change(old["p95_ms"], new["p95_ms"])
+            rps_change = _change(old["rps"], new["rps"])
+            regressed = (
+                (p95_change is not None and p95_change > threshold_percent)
+                or (rps_change is not None and rps_change < -threshold_percent)
+            )
+            if regressed:
+                regressions.append(f"{scenario} / {endpoint}")
+            lines.append(f"{endpoint[:46]:<46} " + " ".join(cells) + ("  REGRESSION" if regressed else ""))
+
+    return lines, regressions
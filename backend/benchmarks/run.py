@@ -0,0 +1,357 @@
+"""
+Benchmark runner.
+
+    python -m benchmarks.run --scale small --duration 10 --output base.json
+    python -m benchmarks.run --baseline HEAD~3 --output head.json --baseline-output base.json
+
+Seeds the in-memory PostgREST stand-in, points the app's Supabase client
+at it and replays scenarios with concurrent virtual users through the
+ASGI app in-process. Background jobs (scheduler, delivery queue) are not
+started so they do not add noise.
+
+With --baseline, the same run is first made against another commit,
+checked out into a temporary git worktree, and the two reports are
+compared. The worktree gets this tree's benchmarks package, so both
+sides replay identical scenarios against an identical fake. Endpoints
+the older commit lacks show up as errors, and --set keys or harness
+settings that the older config lacks are skipped there.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from config import settings
+from benchmarks.fake_postgrest import FakePostgREST
+from benchmarks.report import Recorder, compare_reports, format_scenario
+from benchmarks.scenarios import SCENARIOS, Scenario, Session, client_ip
+from benchmarks.support import SUPPORT_ROOT_ENV
+from benchmarks.seed import BENCH_PASSWORD, SCALES, World, scale_for, seed
+
+# Settings every run needs; applied before the app modules read them at import
+BENCH_SETTINGS = {
+    "supabase_url": "http://postgrest.bench",
+    "supabase_key": "bench-service-key",
+    # Virtual users are told apart by X-Forwarded-For
+    "rate_limit_trust_forwarded_for": True,
+    "rate_limit_auth_per_minute": 1_000_000,
+    "server_timing_enabled": True,
+}
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Dataset size")
+    parser.add_argument("--users", type=int, help="Override the number of users")
+    parser.add_argument("--mistakes-per-user", type=int, help="Override mistakes per user")
+    parser.add_argument("--geo-features", type=int, help="Override the number of geo features")
+    parser.add_argument(
+        "--scenario", action="append",
+        help=f"Scenario(s) to run, comma-separated or repeated (default: all of {', '.join(SCENARIOS)})",
+    )
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds per scenario")
+    parser.add_argument(
+        "--db-latency-ms", type=float, default=2.0,
+        help="Delay added to every PostgREST round-trip",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and traffic")
+    parser.add_argument(
+        "--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+        help="Override an app setting, e.g. --set db_pool_size=32 --set geo_index_backend=memory",
+    )
+    parser.add_argument("--output", help="Write the JSON report here (for benchmarks.compare)")
+    parser.add_argument(
+        "--baseline", metavar="GIT_REF",
+        help="Also run the same benchmark against this commit and compare (e.g. HEAD~1, main)",
+    )
+    parser.add_argument("--baseline-output", help="Write the baseline's JSON report here")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0,
+        help="With --baseline: percent p95 increase or req/s drop counted as a regression",
+    )
+    parser.add_argument(
+        "--skip-unknown-settings", action="store_true",
+        help="Ignore --set keys this tree's config does not have (used for baseline runs)",
+    )
+    return parser.parse_args(argv)
+
+
+def parse_overrides(pairs: List[str], skip_unknown: bool = False) -> Dict[str, Any]:
+    """Parse KEY=VALUE pairs, coercing each value to the setting's current type."""
+    overrides = {}
+    for pair in pairs:
+        key, sep, raw = pair.partition("=")
+        if sep and skip_unknown and not hasattr(settings, key):
+            print(f"Skipping setting override unknown to this tree: {key}")
+            continue
+        if not sep or not hasattr(settings, key):
+            raise SystemExit(f"Unknown setting override: {pair!r}")
+
+        current = getattr(settings, key)
+        if isinstance(current, bool):
+            value = raw.lower() in ("1", "true", "yes", "on")
+        elif isinstance(current, (int, float)):
+            value = type(current)(raw)
+        elif isinstance(current, list):
+            value = [item for item in raw.split(",") if item]
+        else:
+            value = raw
+        overrides[key] = value
+    return overrides
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def baseline_argv(args: argparse.Namespace, output: str) -> List[str]:
+    """Command-line arguments repeating this run for the baseline commit."""
+    argv = [
+        "--scale", args.scale,
+        "--concurrency", str(args.concurrency),
+        "--duration", str(args.duration),
+        "--warmup", str(args.warmup),
+        "--db-latency-ms", str(args.db_latency_ms),
+        "--seed", str(args.seed),
+        "--output", output,
+        "--skip-unknown-settings",
+    ]
+    for flag, value in (
+        ("--users", args.users),
+        ("--mistakes-per-user", args.mistakes_per_user),
+        ("--geo-features", args.geo_features),
+    ):
+        if value is not None:
+            argv += [flag, str(value)]
+    for value in args.scenario or []:
+        argv += ["--scenario", value]
+    for pair in args.overrides:
+        argv += ["--set", pair]
+    return argv
+
+
+def run_baseline(args: argparse.Namespace) -> dict:
+    """
+    Run the benchmark against `args.baseline` in a temporary git worktree.
+
+    Returns:
+        The baseline report
+    """
+    backend = Path(__file__).resolve().parents[1]
+
+    def git(*command: str, cwd: Path = backend) -> str:
+        return subprocess.run(["git", *command], cwd=cwd, capture_output=True, text=True, check=True).stdout.strip()
+
+    try:
+        prefix = git("rev-parse", "--show-prefix")
+        commit = git("rev-parse", "--verify", f"{args.baseline}^{{commit}}")
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise SystemExit(f"Cannot resolve baseline {args.baseline!r}: {getattr(e, 'stderr', '') or e}")
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-baseline-"))
+    worktree = workdir / "tree"
+    output = args.baseline_output or str(workdir / "baseline.json")
+    try:
+        git("worktree", "add", "--detach", str(worktree), commit)
+        tree = worktree / prefix
+        shutil.copytree(
+            backend / "benchmarks", tree / "benchmarks",
+            dirs_exist_ok=True, ignore=shutil.ignore_patterns("__pycache__"),
+        )
+
+        print(f"Running baseline {args.baseline} ({commit[:10]}) in {tree}")
+        # A separate process, so the baseline's modules and settings are imported fresh
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", *baseline_argv(args, os.path.abspath(output))],
+            cwd=tree, check=True, env={**os.environ, SUPPORT_ROOT_ENV: str(backend)},
+        )
+        with open(output, encoding="utf-8") as f:
+            return json.load(f)
+    except subprocess.CalledProcessError as e:
+        raise SystemExit(f"Baseline run failed: {e}")
+    finally:
+        subprocess.run(
+            ["git", "worktree", "remove", "--force", str(worktree)], cwd=backend, capture_output=True
+        )
+        if not args.baseline_output:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    world: World,
+    concurrency: int,
+    duration: float,
+    random_seed: int
+) -> Recorder:
+    """Run `scenario` with `concurrency` virtual users for `duration` seconds."""
+    recorder = Recorder()
+    sessions, states, rngs = [], [], []
+    for vu in range(concurrency):
+        sessions.append(Session(client, recorder, client_ip(len(world.emails) + vu)))
+        states.append({})
+        rngs.append(random.Random(random_seed * 1_000 + vu))
+
+    if scenario.setup:
+        await asyncio.gather(*(
+            scenario.setup(sessions[vu], world, rngs[vu], states[vu]) for vu in range(concurrency)
+        ))
+        # Setup traffic is not part of the measurement
+        recorder = Recorder()
+        for session in sessions:
+            session.recorder = recorder
+
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user(vu: int) -> None:
+        while time.perf_counter() < deadline:
+            try:
+                await scenario.step(sessions[vu], world, rngs[vu], states[vu])
+            except Exception as e:
+                recorder.record_exception(f"{scenario.name} step", e)
+
+    await asyncio.gather(*(virtual_user(vu) for vu in range(concurrency)))
+    return recorder
+
+
+async def main(args: argparse.Namespace) -> dict:
+    baseline: Optional[dict] = run_baseline(args) if args.baseline else None
+
+    overrides = parse_overrides(args.overrides, skip_unknown=args.skip_unknown_settings)
+    # Older commits (baseline runs) may lack some of the harness settings
+    bench_settings = {key: value for key, value in BENCH_SETTINGS.items() if hasattr(settings, key)}
+    for key, value in {**bench_settings, **overrides}.items():
+        setattr(settings, key, value)
+
+    # Imported only now so module-level pools, limiters and caches see the overrides
+    import main as app_main
+    from services import auth_service, supabase_client
+    from supabase import ClientOptions, create_client
+
+    pwd_context = auth_service.pwd_context
+    shutdown_password_pool = getattr(auth_service, "shutdown_password_pool", lambda: None)
+    shutdown_supabase = getattr(supabase_client, "shutdown_supabase", lambda: None)
+    try:
+        from services.token_revocation import sync_revoked_families
+    except ImportError:
+        sync_revoked_families = None
+
+    names = [name for value in (args.scenario or [",".join(SCENARIOS)]) for name in value.split(",") if name]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}")
+
+    scale = scale_for(
+        args.scale,
+        users=args.users,
+        mistakes_per_user=args.mistakes_per_user,
+        geo_features=args.geo_features,
+    )
+    fake = FakePostgREST(latency_ms=args.db_latency_ms)
+
+    started = time.perf_counter()
+    world = seed(fake, scale, pwd_context.hash(BENCH_PASSWORD), random_seed=args.seed)
+    seed_seconds = time.perf_counter() - started
+    print(f"Seeded {scale} in {seed_seconds:.1f}s")
+
+    http_client = httpx.Client(transport=fake)
+    supabase_client._http_client = http_client
+    supabase_client.supabase = create_client(
+        settings.supabase_url, settings.supabase_key, options=ClientOptions(httpx_client=http_client)
+    )
+    if sync_revoked_families is not None:
+        await sync_revoked_families()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "scale": asdict(scale),
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "db_latency_ms": args.db_latency_ms,
+            "settings": overrides,
+            "seed": args.seed,
+            "seed_seconds": seed_seconds,
+            "rows": fake.stats()["rows"],
+        },
+        "scenarios": {},
+    }
+
+    transport = httpx.ASGITransport(app=app_main.app, raise_app_exceptions=False)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name in names:
+                scenario = SCENARIOS[name]
+                if args.warmup > 0:
+                    await run_scenario(client, scenario, world, args.concurrency, args.warmup, args.seed + 1)
+
+                fake.reset_stats()
+                started = time.perf_counter()
+                recorder = await run_scenario(
+                    client, scenario, world, args.concurrency, args.duration, args.seed
+                )
+                wall_seconds = time.perf_counter() - started
+                db = fake.stats()
+
+                result = {
+                    "description": scenario.description,
+                    "wall_seconds": wall_seconds,
+                    "requests": recorder.requests,
+                    "rps": recorder.requests / wall_seconds if wall_seconds else 0.0,
+                    "db_requests": db["requests"],
+                    "db_by_endpoint": db["by_endpoint"],
+                    "endpoints": recorder.summary(wall_seconds),
+                }
+                report["scenarios"][name] = result
+                print(format_scenario(name, result))
+    finally:
+        shutdown_supabase()
+        shutdown_password_pool()
+        http_client.close()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if baseline is not None:
+        lines, regressions = compare_reports(baseline, report, args.threshold)
+        print("\n" + "\n".join(lines))
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:g}%" if regressions else "\nNo regressions.")
+        for regression in regressions:
+            print(f"  {regression}")
+
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
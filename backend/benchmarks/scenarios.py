@@ -0,0 +1,301 @@
+"""
+Scenarios
+Client journeys the benchmark runner replays with many virtual users.
+
+Each scenario has an optional per-user `setup` (not measured) and a
+`step` run in a loop until the time is up. Requests are recorded under a
+stable endpoint name (the route template), so reports line up between
+runs even though ids and coordinates differ.
+"""
+
+import random
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from benchmarks.report import Recorder
+from benchmarks.seed import World
+from benchmarks.support import geo_index, pagination
+
+tile_for_point = geo_index.tile_for_point
+NEXT_CURSOR_HEADER = pagination.NEXT_CURSOR_HEADER
+
+
+def client_ip(index: int) -> str:
+    """A stable fake client address per user, so per-IP limits apply per user."""
+    return f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+
+
+class Session:
+    """One virtual user's view of the app: records every request it makes."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, ip: str):
+        self.client = client
+        self.recorder = recorder
+        self.ip = ip
+
+    async def request(
+        self,
+        name: str,
+        method: str,
+        url: str,
+        ip: Optional[str] = None,
+        **kwargs
+    ) -> Optional[httpx.Response]:
+        """Send a request and record it under `name`; None if it raised."""
+        headers = {"X-Forwarded-For": ip or self.ip, **kwargs.pop("headers", {})}
+        started = perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except Exception as e:
+            self.recorder.record_exception(name, e)
+            return None
+
+        self.recorder.record(
+            name,
+            perf_counter() - started,
+            response.status_code,
+            len(response.content),
+            response.headers.get("server-timing"),
+        )
+        return response
+
+
+Step = Callable[[Session, World, random.Random, dict], Awaitable[None]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    step: Step
+    setup: Optional[Step] = None
+
+
+async def _login(session: Session, world: World, index: int) -> Optional[dict]:
+    response = await session.request(
+        "POST /api/auth/login/password", "POST", "/api/auth/login/password",
+        ip=client_ip(index),
+        json={"email": world.emails[index], "password": world.password},
+    )
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()
+
+
+def _bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+# ============================================
+# Login storm: many users signing in at once (bcrypt pool, user lookups)
+# ============================================
+
+async def login_storm(session: Session, world: World, rng: random.Random, state: dict) -> None:
+    index = rng.randrange(len(world.emails))
+    tokens = await _login(session, world, index)
+    if tokens:
+        await session.request(
+            "GET /api/auth/me", "GET", "/api/auth/me",
+            ip=client_ip(index), headers=_bearer(tokens["access_token"]),
+        )
+
+
+# ============================================
+# Token refresh: rotation throughput (one RPC per refresh, revocation filter)
+# ============================================
+
+async def token_refresh_setup(session: Session, world: World, rng: random.Random, state: dict) -> None:
+    state["index"] = rng.randrange(len(world.emails))
+    state["tokens"] = await _login(session, world, state["index"])
+
+
+async def token_refresh(session: Session, world: World, rng: random.Random, state: dict) -> None:
+    if not state.get("tokens"):
+        await token_refresh_setup(session, world, rng, state)
+        return
+
+    ip = client_ip(state["index"])
+    response = await session.request(
+        "POST /api/auth/refresh", "POST", "/api/auth/refresh",
+        ip=ip, json={"refresh_token": state["tokens"]["refresh_token"]},
+    )
+    if response is None or response.status_code != 200:
+        state["tokens"] = None
+        return
+
+    state["tokens"] = response.json()
+    await session.request(
+        "GET /api/auth/me", "GET", "/api/auth/me",
+        ip=ip, headers=_bearer(state["tokens"]["access_token"]),
+    )
+
+
+# ============================================
+# Progress updates: the level map screen and finishing a level
+# ============================================
+
+async def progress_updates(session: Session, world: World, rng: random.Random, state: dict) -> None:
+    user_id = rng.choice(world.user_ids)
+
+    # Clients revalidate the level catalog with the ETag they already have
+    headers = {"If-None-Match": state["levels_etag"]} if state.get("levels_etag") else {}
+    response = await session.request("GET /api/levels/", "GET", "/api/levels/", headers=headers)
+    if response is not None and response.headers.get("etag"):
+        state["levels_etag"] = response.headers["etag"]
+
+    await session.request(
+        "GET /api/levels/user/{id}/progress", "GET", f"/api/levels/user/{user_id}/progress"
+    )
+
+    stars = rng.randint(0, 3)
+    await session.request(
+        "PUT /api/levels/user/{id}/progress/{level_id}", "PUT",
+        f"/api/levels/user/{user_id}/progress/{rng.choice(world.level_ids)}",
+        json={
+            "status": "completed" if stars else "active",
+            "score": rng.randint(0, 500),
+            "stars": stars,
+            "completion_percentage": 100 if stars else rng.randint(0, 99),
+        },
+    )
+
+    await session.request(
+        "GET /api/users/{id}/progress", "GET", f"/api/users/{user_id}/progress",
+        params={"include_mistakes": "true"},
+    )
+
+
+# ============================================
+# Map browsing: panning and zooming around a landmark
+# ============================================
+
+async def map_browsing(session: Session, world: World, rng: random.Random, state: dict) -> None:
+    lat, lon = rng.choice(world.feature_points)
+
+    z = rng.randint(2, 6)
+    x, y = tile_for_point(lat, lon, z)
+    await session.request(
+        "GET /api/geo-features/clusters/{z}/{x}/{y}", "GET", f"/api/geo-features/clusters/{z}/{x}/{y}"
+    )
+
+    z = rng.randint(8, 11)
+    x, y = tile_for_point(lat, lon, z)
+    await session.request(
+        "GET /api/geo-features/tiles/{z}/{x}/{y}", "GET", f"/api/geo-features/tiles/{z}/{x}/{y}"
+    )
+
+    await session.request(
+        "GET /api/geo-features/bbox", "GET", "/api/geo-features/bbox",
+        params={
+            "min_lon": max(-180.0, lon - 1), "min_lat": max(-90.0, lat - 1),
+            "max_lon": min(180.0, lon + 1), "max_lat": min(90.0, lat + 1),
+        },
+    )
+
+    await session.request(
+        "GET /api/geo-features/nearby", "GET", "/api/geo-features/nearby",
+        params={"lat": lat, "lon": lon, "radius_m": 100_000},
+    )
+
+    await session.request(
+        "GET /api/geo-features/search/{query}", "GET",
+        f"/api/geo-features/search/{rng.choice(world.search_terms)}",
+    )
+
+    await session.request(
+        "GET /api/geo-features/{id}", "GET", f"/api/geo-features/{rng.choice(world.feature_ids)}"
+    )
+
+    response = await session.request(
+        "GET /api/geo-features/", "GET", "/api/geo-features/", params={"limit": 50}
+    )
+    if response is not None and response.headers.get(NEXT_CURSOR_HEADER):
+        await session.request(
+            "GET /api/geo-features/ (cursor)", "GET", "/api/geo-features/",
+            params={"limit": 50, "cursor": response.headers[NEXT_CURSOR_HEADER]},
+        )
+
+
+# ============================================
+# Mistake review: paging through one user's mistakes and grading one
+# ============================================
+
+async def mistake_review(session: Session, world: World, rng: random.Random, state: dict) -> None:
+    user_id = rng.choice(world.user_ids)
+
+    response = await session.request(
+        "GET /api/mistakes/", "GET", "/api/mistakes/", params={"user_id": user_id, "limit": 20}
+    )
+    rows = response.json() if response is not None and response.status_code == 200 else []
+
+    for _ in range(2):
+        cursor = response.headers.get(NEXT_CURSOR_HEADER) if response is not None else None
+        if not cursor:
+            break
+        response = await session.request(
+            "GET /api/mistakes/ (cursor)", "GET", "/api/mistakes/",
+            params={"user_id": user_id, "limit": 20, "cursor": cursor},
+        )
+
+    if rows:
+        mistake_id = rng.choice(rows)["id"]
+        await session.request("GET /api/mistakes/{id}", "GET", f"/api/mistakes/{mistake_id}")
+        await session.request(
+            "PUT /api/mistakes/{id}", "PUT", f"/api/mistakes/{mistake_id}",
+            json={"mastery_level": rng.choice(["low", "medium", "critical"])},
+        )
+
+    await session.request("GET /api/trivia/today", "GET", "/api/trivia/today")
+
+
+# ============================================
+# Page depth: keyset cursor vs offset paging deep into the mistakes feed
+# ============================================
+
+PAGE_DEPTH_LIMIT = 100
+PAGE_DEPTH_MAX_PAGES = 1000
+
+
+def _depth_bucket(page: int) -> str:
+    for upper in (10, 100, 1000):
+        if page <= upper:
+            return f"{upper // 10 + 1 if upper > 10 else 1}-{upper}"
+    return "1001+"
+
+
+async def page_depth(session: Session, world: World, rng: random.Random, state: dict) -> None:
+    page = state.get("page", 1)
+    bucket = _depth_bucket(page)
+
+    params = {"limit": PAGE_DEPTH_LIMIT}
+    if state.get("cursor"):
+        params["cursor"] = state["cursor"]
+    response = await session.request(
+        f"GET /api/mistakes/ cursor pages {bucket}", "GET", "/api/mistakes/", params=params
+    )
+
+    await session.request(
+        f"GET /api/mistakes/ offset pages {bucket}", "GET", "/api/mistakes/",
+        params={"limit": PAGE_DEPTH_LIMIT, "offset": (page - 1) * PAGE_DEPTH_LIMIT},
+    )
+
+    cursor = response.headers.get(NEXT_CURSOR_HEADER) if response is not None else None
+    if cursor and page < PAGE_DEPTH_MAX_PAGES:
+        state["cursor"], state["page"] = cursor, page + 1
+    else:
+        state["cursor"], state["page"] = None, 1
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario for scenario in (
+        Scenario("login_storm", "Password logins followed by /me", login_storm),
+        Scenario("token_refresh", "Refresh-token rotation chains", token_refresh, token_refresh_setup),
+        Scenario("progress_updates", "Level map, progress writes and summaries", progress_updates),
+        Scenario("map_browsing", "Clusters, tiles, bbox, nearby, search and lists", map_browsing),
+        Scenario("mistake_review", "Paging, reading and grading mistakes", mistake_review),
+        Scenario("page_depth", "Cursor vs offset paging of the mistakes feed", page_depth),
+    )
+}
@@ -0,0 +1,203 @@
+"""
+Seed
+Deterministic benchmark datasets scaled from the schema.sql sample data.
+
+Every user gets the sample user's shape (progress on the sample levels,
+mistakes in the sample categories) and a shared benchmark password; geo
+features are scattered around real landmark coordinates so map tiles
+have realistic density differences.
+"""
+
+import random
+import uuid
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from benchmarks.fake_postgrest import FakePostgREST
+
+BENCH_PASSWORD = "bench-password-1"
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Dataset size."""
+    users: int
+    mistakes_per_user: int
+    geo_features: int
+    trivia_days: int
+    levels: int
+
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale(users=200, mistakes_per_user=20, geo_features=5_000, trivia_days=90, levels=10),
+    "medium": Scale(users=2_000, mistakes_per_user=50, geo_features=20_000, trivia_days=365, levels=20),
+    # 1M mistakes and 100k features; needs a few GB of memory
+    "large": Scale(users=10_000, mistakes_per_user=100, geo_features=100_000, trivia_days=1_000, levels=50),
+}
+
+
+def scale_for(name: str, **overrides) -> Scale:
+    """A named scale with individual sizes overridden (None values are ignored)."""
+    return replace(SCALES[name], **{key: value for key, value in overrides.items() if value is not None})
+
+
+@dataclass
+class World:
+    """What scenarios need to know about the seeded data."""
+    scale: Scale
+    user_ids: List[str] = field(default_factory=list)
+    emails: List[str] = field(default_factory=list)
+    level_ids: List[str] = field(default_factory=list)
+    feature_ids: List[str] = field(default_factory=list)
+    feature_points: List[Tuple[float, float]] = field(default_factory=list)  # (lat, lon)
+    search_terms: List[str] = field(default_factory=list)
+    password: str = BENCH_PASSWORD
+
+
+# From schema.sql
+SAMPLE_LEVELS = [
+    ("太阳系", "探索太阳系的行星和卫星", 0),
+    ("板块构造", "地球板块运动与地质变化", 0),
+    ("岩石圈循环", "岩浆岩、沉积岩和变质岩的转化过程", 2),
+    ("全球贸易网络", "国际贸易与经济地理", 3),
+    ("气候系统", "全球气候模式与变化", 4),
+]
+
+SAMPLE_MISTAKES = [
+    ("大气环流", "解释北半球风向偏转的主要原因及其对气旋形成的影响。", "physical"),
+    ("城市化", "北美标准城市的中心商务区（CBD）与欧洲模式有何主要区别？", "human"),
+    ("板块构造", "识别大西洋中脊的板块边界类型，并描述相关的火山活动特征。", "physical"),
+    ("季风气候", "比较南亚季风与东亚季风的成因差异。", "regional"),
+]
+
+SAMPLE_LANDFORMS = [
+    ("盆地", "洼地地形", "basin", 1240),
+    ("山峰", "高海拔", "peak", 4500),
+    ("山谷", "河流路径", "valley", 800),
+    ("悬崖", "垂直落差", "cliff", 2000),
+]
+
+# (name, region, lat, lon) landmarks the features are scattered around
+LANDMARKS = [
+    ("火环", "太平洋海盆", 35.6762, 139.6503),
+    ("阿塔卡马沙漠", "南美洲", -24.5, -69.25),
+    ("喜马拉雅山脉", "亚洲", 27.9881, 86.925),
+    ("撒哈拉沙漠", "非洲", 23.4162, 25.6628),
+    ("亚马逊雨林", "南美洲", -3.4653, -62.2159),
+    ("阿尔卑斯山脉", "欧洲", 46.4908, 9.8355),
+    ("大峡谷", "北美洲", 36.1069, -112.1129),
+    ("大堡礁", "大洋洲", -18.2871, 147.6992),
+    ("青藏高原", "亚洲", 33.0, 88.0),
+    ("冰岛火山带", "欧洲", 64.9631, -19.0208),
+]
+
+FEATURE_TYPES = ["volcano", "mountain", "desert", "river", "lake", "glacier", "canyon", "volcanic_belt"]
+MASTERY_LEVELS = ["low", "medium", "critical"]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat()
+
+
+def seed(db: FakePostgREST, scale: Scale, password_hash: str, random_seed: int = 42) -> World:
+    """
+    Fill the fake database and describe what was created.
+
+    Args:
+        db: Fake to seed
+        scale: Dataset size
+        password_hash: Hash of BENCH_PASSWORD stored for every user
+        random_seed: Seed for reproducible data
+    """
+    rng = random.Random(random_seed)
+    world = World(scale=scale)
+    now = datetime.now(timezone.utc)
+
+    for i in range(scale.levels):
+        name, description, unlock = SAMPLE_LEVELS[i % len(SAMPLE_LEVELS)]
+        if i >= len(SAMPLE_LEVELS):
+            name = f"{name} {i // len(SAMPLE_LEVELS) + 1}"
+        level = db.insert("levels", {
+            "id": _uuid(rng), "name": name, "description": description,
+            "order_index": i + 1, "unlock_requirement": unlock,
+        })
+        world.level_ids.append(level["id"])
+
+    for i in range(scale.users):
+        user_id = _uuid(rng)
+        email = f"explorer{i}@bench.geoexplorer.test"
+        completed = rng.randint(0, scale.levels - 1)
+        total_stars = 0
+
+        for order, level_id in enumerate(world.level_ids[:completed + 1]):
+            stars = rng.randint(1, 3) if order < completed else 0
+            total_stars += stars
+            db.insert("user_level_progress", {
+                "id": _uuid(rng), "user_id": user_id, "level_id": level_id,
+                "status": "completed" if order < completed else "active",
+                "score": rng.randint(200, 500) if order < completed else 0,
+                "stars": stars,
+                "completion_percentage": 100 if order < completed else rng.randint(0, 90),
+                "completed_at": _iso(now - timedelta(days=rng.randint(1, 365))) if order < completed else None,
+            })
+
+        db.insert("users", {
+            "id": user_id, "name": f"Explorer {i}", "email": email, "level": "初学者",
+            "total_stars": total_stars, "password_hash": password_hash, "is_verified": True,
+        })
+        world.user_ids.append(user_id)
+        world.emails.append(email)
+
+        for _ in range(scale.mistakes_per_user):
+            title, question, category = rng.choice(SAMPLE_MISTAKES)
+            db.insert("mistakes", {
+                "id": _uuid(rng), "user_id": user_id, "title": title, "question": question,
+                "category": category, "mastery_level": rng.choice(MASTERY_LEVELS),
+                "added_at": _iso(now - timedelta(seconds=rng.randint(0, 365 * 86400))),
+            })
+
+    for i in range(scale.geo_features):
+        landmark, region, lat, lon = rng.choice(LANDMARKS)
+        feature_type = rng.choice(FEATURE_TYPES)
+        # Most features cluster around landmarks, the rest are spread worldwide
+        if rng.random() < 0.8:
+            lat = max(-85.0, min(85.0, rng.gauss(lat, 3.0)))
+            lon = (rng.gauss(lon, 3.0) + 180.0) % 360.0 - 180.0
+        else:
+            lat, lon = rng.uniform(-70.0, 70.0), rng.uniform(-180.0, 180.0)
+        feature = db.insert("geographic_features", {
+            "id": _uuid(rng),
+            "name": f"{landmark} {feature_type} {i}",
+            "description": f"{region}的{landmark}附近的地理特征",
+            "feature_type": feature_type,
+            "latitude": round(lat, 6),
+            "longitude": round(lon, 6),
+            "region": region,
+            "stats": {"elevation_m": rng.randint(-400, 8800)},
+        })
+        world.feature_ids.append(feature["id"])
+        world.feature_points.append((feature["latitude"], feature["longitude"]))
+    world.search_terms = [landmark for landmark, _, _, _ in LANDMARKS] + FEATURE_TYPES
+
+    today = date.today()
+    for offset in range(-scale.trivia_days + 8, 8):
+        landmark, region, _, _ = LANDMARKS[offset % len(LANDMARKS)]
+        db.insert("daily_trivia", {
+            "id": _uuid(rng), "title": landmark, "description": f"关于{landmark}的每日百科",
+            "location": landmark, "region": region,
+            "featured_date": (today + timedelta(days=offset)).isoformat(),
+            "created_at": _iso(now - timedelta(days=8 - offset)),
+        })
+
+    for name, description, landform_type, elevation in SAMPLE_LANDFORMS:
+        db.insert("ar_landforms", {
+            "id": _uuid(rng), "name": name, "description": description,
+            "type": landform_type, "elevation": elevation,
+        })
+
+    return world
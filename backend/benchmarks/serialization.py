@@ -0,0 +1,126 @@
+"""
+Serialization microbenchmark.
+
+    python -m benchmarks.serialization --rows 100 --iterations 200
+
+Times turning one endpoint's worth of seeded rows into a JSON body, per
+strategy, with no HTTP or database in the way:
+
+- validated: FastAPI's path for a response_model route (validate every row
+  into the model, then dump to JSON in pydantic-core)
+- validated + stdlib: the same validation dumped to Python and rendered by
+  JSONResponse (json.dumps), as with a custom response class
+- validated + orjson: as above, rendered by orjson
+- trusted: services.serialization.trusted_rows() projection + pydantic-core
+- trusted + orjson: the projection rendered by orjson
+
+orjson strategies are skipped when the package is not installed.
+"""
+
+import argparse
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Type
+
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_model_field
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from benchmarks.fake_postgrest import FakePostgREST
+from benchmarks.seed import scale_for, seed
+from models.geo_feature import GeographicFeature, GeographicFeatureNearby
+from models.level import UserLevelProgress
+from models.mistake import Mistake
+from models.trivia import DailyTrivia
+from services.geo_service import GEO_FEATURE_COLUMNS
+from services.serialization import trusted_rows
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def endpoint_rows(rows: int) -> Dict[str, tuple]:
+    """(response model, rows as PostgREST returns them) per list endpoint."""
+    fake = FakePostgREST()
+    scale = scale_for("small", users=max(1, rows // 20 + 1), mistakes_per_user=20, geo_features=max(rows, 500), levels=50)
+    world = seed(fake, scale, password_hash="-")
+    columns = GEO_FEATURE_COLUMNS.split(",")
+
+    features = [
+        {column: row.get(column) for column in columns}
+        for row in list(fake.tables["geographic_features"].rows.values())[:rows]
+    ]
+    nearby = [{**feature, "distance_m": 1234.5 * i} for i, feature in enumerate(features)]
+
+    return {
+        "GET /api/geo-features/": (GeographicFeature, features),
+        "GET /api/geo-features/nearby": (GeographicFeatureNearby, nearby),
+        "GET /api/mistakes/": (Mistake, list(fake.tables["mistakes"].rows.values())[:rows]),
+        "GET /api/trivia/": (DailyTrivia, list(fake.tables["daily_trivia"].rows.values())[:rows]),
+        "GET /api/levels/user/{id}/progress": (
+            UserLevelProgress, fake._fn_get_user_level_progress(world.user_ids[0])
+        ),
+    }
+
+
+def strategies(model: Type[BaseModel]) -> Dict[str, Callable[[List[dict]], bytes]]:
+    field = create_model_field(name="Response", type_=List[model], mode="serialization")
+
+    def validate(rows: List[dict]) -> Any:
+        value, errors = field.validate(rows, {}, loc=("response",))
+        assert not errors, errors
+        return value
+
+    result = {
+        "validated": lambda rows: field.serialize_json(validate(rows)),
+        "validated + stdlib": lambda rows: JSONResponse(field.serialize(validate(rows))).body,
+        "trusted": lambda rows: to_json(trusted_rows(rows, model)),
+    }
+    if orjson is not None:
+        result["validated + orjson"] = lambda rows: orjson.dumps(field.serialize(validate(rows)))
+        result["trusted + orjson"] = lambda rows: orjson.dumps(trusted_rows(rows, model))
+    return result
+
+
+def measure(func: Callable[[List[dict]], bytes], rows: List[dict], iterations: int, repeats: int) -> float:
+    """Median microseconds per call over `repeats` batches of `iterations`."""
+    func(rows)
+    batches = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func(rows)
+        batches.append((time.perf_counter() - started) / iterations * 1e6)
+    return statistics.median(batches)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100, help="Rows per response (list endpoints)")
+    parser.add_argument("--iterations", type=int, default=200, help="Serializations per timed batch")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed batches; the median is reported")
+    args = parser.parse_args(argv)
+
+    names = ["validated", "validated + stdlib", "validated + orjson", "trusted", "trusted + orjson"]
+    print(f"{'endpoint':<36} {'rows':>5} {'bytes':>7} " + " ".join(f"{name:>19}" for name in names))
+    print(f"{'':<36} {'':>5} {'':>7} " + " ".join(f"{'us (speedup)':>19}" for _ in names))
+
+    for endpoint, (model, rows) in endpoint_rows(args.rows).items():
+        funcs = strategies(model)
+        baseline = measure(funcs["validated"], rows, args.iterations, args.repeats)
+        cells = []
+        for name in names:
+            if name not in funcs:
+                cells.append(f"{'-':>19}")
+                continue
+            micros = baseline if name == "validated" else measure(funcs[name], rows, args.iterations, args.repeats)
+            cells.append(f"{f'{micros:.0f} ({baseline / micros:.1f}x)':>19}")
+        size = len(funcs["validated"](rows))
+        print(f"{endpoint[:36]:<36} {len(rows):>5} {size:>7} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Support
+App modules the harness itself depends on (tile math, the spatial and
+search indexes behind the fake's RPCs, the cursor header).
+
+They have no app dependencies. A baseline run (run.py --baseline) points
+BENCH_SUPPORT_ROOT at the backend directory it was launched from, so an
+older commit, whose copies of these modules differ or do not exist yet,
+still gets the same fake and scenarios.
+"""
+
+import importlib
+import importlib.util
+import os
+from pathlib import Path
+from types import ModuleType
+
+SUPPORT_ROOT_ENV = "BENCH_SUPPORT_ROOT"
+
+
+def _load(name: str) -> ModuleType:
+    root = os.environ.get(SUPPORT_ROOT_ENV)
+    if not root:
+        return importlib.import_module(f"services.{name}")
+
+    spec = importlib.util.spec_from_file_location(
+        f"benchmarks._support_{name}", Path(root) / "services" / f"{name}.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+geo_index = _load("geo_index")
+search_index = _load("search_index")
+pagination = _load("pagination")
@@ -11,6 +11,16 @@ class Settings(BaseSettings):
     supabase_url: str = os.getenv("SUPABASE_URL", "")
     supabase_key: str = os.getenv("SUPABASE_KEY", "")
     
+    # Data Access Configuration
+    db_pool_size: int = 16  # worker threads running blocking PostgREST calls
+    db_http2: bool = False  # requires the h2 package (httpx[http2]); falls back to HTTP/1.1 without it
+    db_max_connections: int = 32  # per worker process
+    db_max_keepalive_connections: int = 16
+    db_keepalive_expiry_seconds: float = 30.0
+    db_connect_timeout_seconds: float = 5.0
+    db_read_timeout_seconds: float = 30.0
+    db_pool_timeout_seconds: float = 5.0  # wait for a free connection before failing
+    
     # App Configuration
     app_name: str = "GeoExplorer API"
     debug: bool = True
@@ -22,6 +32,122 @@ class Settings(BaseSettings):
     refresh_token_expire_days: int = 7
     verification_code_expire_minutes: int = 5
     
+    # Refresh token revocation filter (per worker), synced from refresh_token_families
+    refresh_token_revocation_sync_seconds: int = 30
+    refresh_token_bloom_capacity: int = 100000
+    refresh_token_bloom_error_rate: float = 0.001
+    
+    # Rate limiting (token buckets); "memory" is per worker, "redis" is shared
+    rate_limit_backend: str = "memory"
+    rate_limit_redis_url: str = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")  # local:// for an in-process stand-in
+    rate_limit_max_keys: int = 100000  # memory backend only
+    rate_limit_trust_forwarded_for: bool = False  # enable behind a trusted reverse proxy
+    rate_limit_auth_per_minute: int = 30  # per IP: send-code, register and login
+    rate_limit_send_code_ip_per_hour: int = 20
+    rate_limit_send_code_target_per_hour: int = 5
+    rate_limit_send_code_cooldown_seconds: int = 60  # between codes to one email/phone
+    
+    # Verification code delivery: senders are "console", "smtp" (email) or "fake_sms" (sms)
+    delivery_email_sender: str = "console"
+    delivery_sms_sender: str = "console"
+    delivery_queue_size: int = 10000
+    delivery_batch_size: int = 50
+    delivery_batch_window_ms: int = 50  # wait for more messages before sending a batch
+    delivery_max_attempts: int = 5
+    delivery_retry_base_seconds: float = 1.0  # doubled per attempt
+    delivery_dead_letter_size: int = 1000
+    delivery_shutdown_timeout_seconds: float = 5.0
+    smtp_host: str = os.getenv("SMTP_HOST", "localhost")
+    smtp_port: int = 587
+    smtp_username: str = os.getenv("SMTP_USERNAME", "")
+    smtp_password: str = os.getenv("SMTP_PASSWORD", "")
+    smtp_from: str = os.getenv("SMTP_FROM", "GeoExplorer <no-reply@localhost>")
+    smtp_starttls: bool = True
+    smtp_timeout_seconds: float = 10.0
+    fake_sms_latency_seconds: float = 0.0
+    fake_sms_failure_rate: float = 0.0
+    
+    # Password Hashing Configuration
+    bcrypt_rounds: int = 12  # existing hashes are upgraded on next login
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 16  # queued + running jobs before shedding with 503; keep below concurrency_limit_auth
+    password_hash_retry_after_seconds: int = 2
+    
+    # Authenticated user cache (bounded by the access token lifetime)
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: int = 60
+    
+    # Catalog cache (levels, AR landforms, trivia); writes invalidate immediately
+    catalog_cache_size: int = 256  # entries per catalog
+    catalog_cache_ttl_seconds: int = 300  # bounds staleness across workers
+    catalog_cache_control: str = "public, no-cache"  # clients revalidate via If-None-Match
+    
+    # Geographic feature index: "postgis" (schema.sql functions) or "memory" (in-process grid)
+    geo_index_backend: str = "postgis"
+    geo_index_cell_degrees: float = 1.0
+    geo_index_load_page_size: int = 1000
+    
+    # Geographic feature search: "postgres" (tsvector + pg_trgm) or "memory" (CJK-aware inverted index)
+    geo_search_backend: str = "postgres"
+    
+    # Map clustering: tiles up to this zoom are clustered into at most 4^precision cells
+    geo_cluster_max_zoom: int = 12
+    geo_cluster_precision: int = 3
+    geo_cluster_cache_size: int = 4096
+    geo_cluster_cache_ttl_seconds: int = 300  # bounds how long inserts on other workers are missing from tiles
+    
+    # Bulk ingestion
+    bulk_insert_chunk_size: int = 500  # rows per insert statement
+    bulk_max_reported_errors: int = 1000
+    bulk_max_body_bytes: int = 64 * 1024 * 1024  # larger uploads fail with 413
+    bulk_max_line_length: int = 1024 * 1024  # characters per NDJSON line / CSV record
+    
+    # User data export
+    export_page_size: int = 1000  # rows fetched per keyset page
+    
+    # Daily trivia schedule
+    trivia_timezone: str = "Asia/Shanghai"  # decides when "today" rolls over
+    trivia_schedule_days: int = 7  # days precomputed per refresh
+    trivia_refresh_interval_seconds: int = 900  # picks up writes made on other workers
+    
+    # Background jobs
+    stars_reconcile_interval_seconds: int = 3600
+    stars_reconcile_batch_size: int = 1000
+    auth_purge_interval_seconds: int = 3600
+    auth_purge_batch_size: int = 1000  # rows per table per delete statement
+    auth_purge_max_batches: int = 100  # per run; the rest waits for the next run
+    scheduler_lease_grace_seconds: int = 300  # before another worker takes over a dead leader's jobs
+    
+    # Admin endpoints (/api/admin); disabled while empty
+    admin_token: str = os.getenv("ADMIN_TOKEN", "")
+    
+    # Metrics (/metrics in Prometheus format, Server-Timing response header)
+    metrics_enabled: bool = True
+    server_timing_enabled: bool = True
+    loop_lag_interval_seconds: float = 0.5
+    loop_lag_warn_seconds: float = 0.1
+    
+    # Readiness (/health/ready): not ready while the DB probe fails or the worker is overloaded
+    health_db_probe_interval_seconds: float = 5.0  # probe result reused for this long
+    health_db_probe_timeout_seconds: float = 2.0
+    health_max_db_queue: int = 64  # PostgREST calls waiting for a pool thread
+    health_max_loop_lag_seconds: float = 0.5
+    
+    # Overload protection: in-flight requests per route class per worker, then shed with 503
+    overload_protection_enabled: bool = True
+    concurrency_limit_auth: int = 32
+    concurrency_limit_catalog: int = 64
+    concurrency_limit_progress: int = 32
+    concurrency_limit_mistakes: int = 32
+    concurrency_queue_size: int = 64  # waiting requests per class before shedding immediately
+    concurrency_queue_timeout_seconds: float = 1.0  # wait for a slot before shedding
+    overload_retry_after_seconds: int = 1
+    request_deadline_seconds: float = 10.0  # data-access calls past this fail with 504
+    
+    # Trusted rows: list endpoints serialize DB rows without re-validating them
+    trusted_rows_enabled: bool = False
+    json_response_backend: str = "default"  # or "orjson" for those bodies (requires the orjson package)
+    
     # CORS Configuration
     cors_origins: list[str] = [
         "http://localhost:5173",
@@ -3,11 +3,25 @@ GeoExplorer FastAPI Backend
 地理探索学习应用后端服务
 """
 
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from config import settings
-from services.supabase_client import init_supabase
+from services.supabase_client import init_supabase, shutdown_supabase
+from services.auth_service import shutdown_password_pool
+from services.progress_service import reconcile_total_stars
+from services.scheduler import scheduler
+from services.trivia_scheduler import refresh_trivia_schedule
+from services.token_revocation import sync_revoked_families
+from services.maintenance import purge_expired_auth_data
+from services.delivery import delivery_queue
+from services.metrics import MetricsMiddleware, monitor_loop_lag, render_metrics
+from services.health import readiness
+from services.overload import DeadlineExceeded, OverloadMiddleware
+from services.pagination import NEXT_CURSOR_HEADER
 from routes import (
     users_router,
     trivia_router,
@@ -16,6 +30,7 @@ from routes import (
     geo_features_router,
     ar_landforms_router,
     auth_router,
+    admin_router,
 )
 
 # Create FastAPI application
@@ -27,6 +42,9 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
+# Per-route-class concurrency limits and request deadlines (inside CORS so 503s stay readable)
+app.add_middleware(OverloadMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -34,8 +52,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing"],
 )
 
+# Request latency, sizes and DB round-trips per route (/metrics, Server-Timing)
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    """A request that ran out of time waiting on the database."""
+    return JSONResponse(
+        status_code=504,
+        content={"detail": "请求超时，请稍后重试 / Request timed out, please retry later"},
+    )
+
 # Register routers
 app.include_router(auth_router)
 app.include_router(users_router)
@@ -44,13 +74,64 @@ app.include_router(levels_router)
 app.include_router(mistakes_router)
 app.include_router(geo_features_router)
 app.include_router(ar_landforms_router)
+app.include_router(admin_router)
+
+_loop_lag_task = None
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on application startup."""
     init_supabase()
+    
+    scheduler.add_job(
+        "reconcile_total_stars",
+        settings.stars_reconcile_interval_seconds,
+        reconcile_total_stars,
+        leader_only=True,
+    )
+    scheduler.add_job(
+        "purge_expired_auth_data",
+        settings.auth_purge_interval_seconds,
+        purge_expired_auth_data,
+        leader_only=True,
+    )
+    scheduler.add_job(
+        "refresh_trivia_schedule",
+        settings.trivia_refresh_interval_seconds,
+        refresh_trivia_schedule,
+    )
+    scheduler.add_job(
+        "sync_revoked_token_families",
+        settings.refresh_token_revocation_sync_seconds,
+        sync_revoked_families,
+    )
+    
+    # Load revocations before serving so signed-out sessions are rejected immediately
+    try:
+        await sync_revoked_families()
+    except Exception as e:
+        print(f"⚠️ Warning: could not load revoked token families: {e}")
+    
+    scheduler.start()
+    delivery_queue.start()
+    
+    global _loop_lag_task
+    _loop_lag_task = asyncio.create_task(
+        monitor_loop_lag(settings.loop_lag_interval_seconds), name="loop-lag-monitor"
+    )
+    
     print(f"🚀 {settings.app_name} started successfully!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release services on application shutdown."""
+    if _loop_lag_task is not None:
+        _loop_lag_task.cancel()
+    await scheduler.stop()
+    await delivery_queue.stop()
+    shutdown_supabase()
+    shutdown_password_pool()
+
 @app.get("/")
 async def root():
     """Root endpoint - API health check."""
@@ -62,9 +143,34 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """
+    Health for checks that predate /health/live and /health/ready: runs the
+    readiness checks, keeping the original "healthy" status when they pass.
+    """
+    report = await readiness()
+    ready = report["status"] == "ready"
+    return JSONResponse(
+        {**report, "status": "healthy" if ready else "unhealthy"},
+        status_code=200 if ready else 503,
+    )
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving. Does not touch dependencies."""
     return {"status": "healthy"}
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: database reachable and worker not overloaded; 503 otherwise."""
+    report = await readiness()
+    return JSONResponse(report, status_code=200 if report["status"] == "ready" else 503)
+
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus scrape endpoint."""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -3,5 +3,6 @@ from .user import User, UserCreate, UserUpdate, UserProgress
 from .trivia import DailyTrivia, DailyTriviaCreate
 from .level import Level, LevelCreate, UserLevelProgress, UserLevelProgressUpdate
 from .mistake import Mistake, MistakeCreate, MistakeUpdate
-from .geo_feature import GeographicFeature, GeographicFeatureCreate
+from .geo_feature import GeographicFeature, GeographicFeatureCreate, GeographicFeatureNearby, GeoFeatureCluster, GeoFeatureClusterTile
 from .ar_landform import ARLandform, ARLandformCreate
+from .bulk import BulkRowError, BulkIngestResult
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List
+
+class BulkRowError(BaseModel):
+    """Validation or insert failure for one uploaded row (1-based)."""
+    row: int
+    errors: List[str]
+
+class BulkIngestResult(BaseModel):
+    """Summary of a bulk upload."""
+    received: int
+    inserted: int
+    failed: int
+    errors: List[BulkRowError] = []
+    errors_truncated: bool = False  # more rows failed than are listed
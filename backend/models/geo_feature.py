@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from uuid import UUID
 
@@ -25,3 +25,23 @@ class GeographicFeature(GeographicFeatureBase):
     
     class Config:
         from_attributes = True
+
+class GeographicFeatureNearby(GeographicFeature):
+    """Geographic feature with its distance from the query point."""
+    distance_m: float
+
+class GeoFeatureCluster(BaseModel):
+    """Aggregate of the features in one cell of a map tile."""
+    count: int
+    latitude: float  # centroid
+    longitude: float
+    feature_type: Optional[str] = None  # dominant type in the cell
+    feature_type_counts: Dict[str, int] = {}
+
+class GeoFeatureClusterTile(BaseModel):
+    """Clusters for one Web Mercator (XYZ) tile."""
+    z: int
+    x: int
+    y: int
+    total: int
+    clusters: List[GeoFeatureCluster]
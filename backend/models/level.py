@@ -38,7 +38,7 @@ class UserLevelProgressUpdate(BaseModel):
 
 class UserLevelProgress(UserLevelProgressBase):
     """Complete user level progress schema."""
-    id: UUID
+    id: Optional[UUID] = None  # None for levels the user has not started
     user_id: UUID
     level_id: UUID
     completed_at: Optional[datetime] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Dict
 from datetime import datetime
 from uuid import UUID
 
@@ -36,6 +36,7 @@ class UserProgress(BaseModel):
     level: str
     completed_levels: int
     current_level_id: Optional[UUID] = None
+    mistake_counts: Optional[Dict[str, int]] = None  # per category, when requested
     
     class Config:
         from_attributes = True
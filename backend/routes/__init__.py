@@ -6,6 +6,7 @@ from .mistakes import router as mistakes_router
 from .geo_features import router as geo_features_router
 from .ar_landforms import router as ar_landforms_router
 from .auth import router as auth_router
+from .admin import router as admin_router
 
 __all__ = [
     "users_router",
@@ -15,4 +16,5 @@ __all__ = [
     "geo_features_router",
     "ar_landforms_router",
     "auth_router",
+    "admin_router",
 ]
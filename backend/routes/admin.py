@@ -0,0 +1,75 @@
+"""
+Admin Routes
+Operational endpoints for background jobs, guarded by the X-Admin-Token header.
+"""
+
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from config import settings
+from services.scheduler import scheduler
+from services.delivery import delivery_queue
+
+
+async def require_admin_token(x_admin_token: str = Header("", alias="X-Admin-Token")) -> None:
+    """Reject requests without the configured admin token (all requests when none is set)."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    
+    # Compared as bytes: compare_digest rejects non-ASCII str, which a client could send
+    if not secrets.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin_token)],
+)
+
+
+@router.get("/jobs")
+async def list_jobs():
+    """Status of every background job on this worker (last run, duration, result)."""
+    return scheduler.status()
+
+
+@router.post("/jobs/{name}/run")
+async def run_job(name: str):
+    """
+    Run a job now on this worker and return its result.
+    
+    Leader-only jobs run here regardless of who holds the lease; the jobs
+    are idempotent, and a concurrent scheduled run of the same job on this
+    worker waits for this one to finish.
+    """
+    job = scheduler.get_job(name)
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    try:
+        await job.run()
+    except Exception:
+        raise HTTPException(status_code=500, detail=job.status())
+    
+    return job.status()
+
+
+@router.get("/delivery")
+async def delivery_status():
+    """Delivery queue counters and the most recent dead letters (message bodies omitted)."""
+    return {
+        **delivery_queue.stats(),
+        "dead_letters": [
+            {
+                "channel": message.channel,
+                "target": message.target,
+                "attempts": message.attempts,
+                "last_error": message.last_error,
+                "created_at": message.created_at.isoformat(),
+            }
+            for message in reversed(delivery_queue.dead_letters)
+        ],
+    }
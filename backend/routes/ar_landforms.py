@@ -1,32 +1,43 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from typing import List, Optional
 from uuid import UUID
 from supabase import Client
 
 from models.ar_landform import ARLandform, ARLandformCreate
-from services.supabase_client import get_db
+from models.bulk import BulkIngestResult
+from services.supabase_client import get_db, execute
+from services.catalog_cache import catalog_cache, conditional_response
+from services.bulk_ingest import ingest
+from routes.admin import require_admin_token
+from services.serialization import trusted_response
 
 router = APIRouter(prefix="/api/ar-landforms", tags=["ar-landforms"])
 
 @router.get("/", response_model=List[ARLandform])
 async def get_ar_landforms(
+    request: Request,
+    response: Response,
     landform_type: Optional[str] = Query(None, description="Filter by type: basin, peak, valley, cliff"),
     db: Client = Depends(get_db)
 ):
     """Get all AR landforms with optional type filter."""
-    query = db.table("ar_landforms").select("*")
+    async def load():
+        query = db.table("ar_landforms").select("*")
+        
+        if landform_type:
+            query = query.eq("type", landform_type)
+        
+        landforms_response = await execute(query.order("name"))
+        return landforms_response.data or []
     
-    if landform_type:
-        query = query.eq("type", landform_type)
+    entry = await catalog_cache.get_or_load("ar_landforms", landform_type, load)
     
-    response = query.order("name").execute()
-    
-    return response.data or []
+    return trusted_response(conditional_response(request, response, entry), ARLandform, response, entry.bodies)
 
 @router.get("/{landform_id}", response_model=ARLandform)
 async def get_ar_landform(landform_id: UUID, db: Client = Depends(get_db)):
     """Get a specific AR landform by ID."""
-    response = db.table("ar_landforms").select("*").eq("id", str(landform_id)).single().execute()
+    response = await execute(db.table("ar_landforms").select("*").eq("id", str(landform_id)).single())
     
     if not response.data:
         raise HTTPException(status_code=404, detail="AR landform not found")
@@ -36,9 +47,26 @@ async def get_ar_landform(landform_id: UUID, db: Client = Depends(get_db)):
 @router.post("/", response_model=ARLandform)
 async def create_ar_landform(landform: ARLandformCreate, db: Client = Depends(get_db)):
     """Create a new AR landform."""
-    response = db.table("ar_landforms").insert(landform.model_dump()).execute()
+    response = await execute(db.table("ar_landforms").insert(landform.model_dump()))
     
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to create AR landform")
     
+    catalog_cache.invalidate("ar_landforms")
+    
     return response.data[0]
+
+@router.post("/bulk", response_model=BulkIngestResult, dependencies=[Depends(require_admin_token)])
+async def bulk_create_ar_landforms(request: Request, db: Client = Depends(get_db)):
+    """
+    Bulk-create AR landforms from a JSON array, NDJSON or CSV body.
+    
+    Rows are validated individually and inserted in batches; failures are
+    reported per row without aborting the upload. Requires X-Admin-Token.
+    """
+    result = await ingest(request, db, "ar_landforms", ARLandformCreate)
+    
+    if result["inserted"]:
+        catalog_cache.invalidate("ar_landforms")
+    
+    return result
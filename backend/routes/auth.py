@@ -3,7 +3,7 @@ Authentication Routes
 API endpoints for user registration, login, and token management.
 """
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from supabase import Client
 
 from config import settings
@@ -17,33 +17,50 @@ from models.auth import (
     UserAuthResponse,
     MessageResponse,
 )
-from services.supabase_client import get_db
+from services.supabase_client import get_db, execute
 from services.auth_service import (
     hash_password,
-    verify_password,
+    verify_and_update_password,
     create_access_token,
-    create_refresh_token,
-    store_refresh_token,
-    verify_refresh_token,
+    issue_refresh_token,
+    rotate_refresh_token,
     revoke_refresh_token,
     get_current_user,
     get_user_by_email_or_phone,
+    invalidate_cached_user,
 )
 from services.verification_service import (
     send_verification_code,
     verify_code,
 )
+from services.rate_limit import (
+    auth_ip_limiter,
+    send_code_ip_limiter,
+    send_code_target_limiter,
+    send_code_cooldown_limiter,
+    client_ip,
+    limit_by_ip,
+)
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
+# Per-IP throttle for the endpoints that check or hand out credentials
+credential_rate_limit = [Depends(limit_by_ip(auth_ip_limiter))]
+
 
-@router.post("/send-code", response_model=MessageResponse)
-async def send_code(request: SendCodeRequest, db: Client = Depends(get_db)):
+@router.post("/send-code", response_model=MessageResponse, dependencies=credential_rate_limit)
+async def send_code(request: SendCodeRequest, http_request: Request, db: Client = Depends(get_db)):
     """
     Send a verification code to email or phone.
     
-    Used for both registration and login.
+    Used for both registration and login. Throttled per client IP and per
+    target before any database work is done.
     """
+    target_key = request.target.replace(" ", "").replace("-", "").lower()
+    await send_code_ip_limiter.hit(client_ip(http_request))
+    await send_code_cooldown_limiter.hit(target_key)
+    await send_code_target_limiter.hit(target_key)
+    
     # Check if user exists for login, or doesn't exist for register
     user = await get_user_by_email_or_phone(
         db,
@@ -72,7 +89,7 @@ async def send_code(request: SendCodeRequest, db: Client = Depends(get_db)):
     )
 
 
-@router.post("/register", response_model=TokenResponse)
+@router.post("/register", response_model=TokenResponse, dependencies=credential_rate_limit)
 async def register(request: RegisterRequest, db: Client = Depends(get_db)):
     """
     Register a new user with verification code.
@@ -96,7 +113,7 @@ async def register(request: RegisterRequest, db: Client = Depends(get_db)):
         )
     
     # Hash password
-    password_hash = hash_password(request.password)
+    password_hash = await hash_password(request.password)
     
     # Create user
     user_data = {
@@ -110,7 +127,7 @@ async def register(request: RegisterRequest, db: Client = Depends(get_db)):
         "total_stars": 0
     }
     
-    response = db.table("users").insert(user_data).execute()
+    response = await execute(db.table("users").insert(user_data))
     
     if not response.data:
         raise HTTPException(
@@ -121,12 +138,9 @@ async def register(request: RegisterRequest, db: Client = Depends(get_db)):
     user = response.data[0]
     user_id = user["id"]
     
-    # Generate tokens
-    access_token = create_access_token(user_id)
-    refresh_token = create_refresh_token()
-    
-    # Store refresh token
-    await store_refresh_token(db, user_id, refresh_token)
+    # Generate tokens (a new refresh token family per login)
+    refresh_token, family_id = await issue_refresh_token(db, user_id)
+    access_token = create_access_token(user_id, family_id=family_id)
     
     return TokenResponse(
         access_token=access_token,
@@ -135,7 +149,7 @@ async def register(request: RegisterRequest, db: Client = Depends(get_db)):
     )
 
 
-@router.post("/login/password", response_model=TokenResponse)
+@router.post("/login/password", response_model=TokenResponse, dependencies=credential_rate_limit)
 async def login_with_password(request: LoginPasswordRequest, db: Client = Depends(get_db)):
     """
     Login with email/phone and password.
@@ -156,7 +170,8 @@ async def login_with_password(request: LoginPasswordRequest, db: Client = Depend
             detail="该账号未设置密码，请使用验证码登录 / No password set, please use code login"
         )
     
-    if not verify_password(request.password, user["password_hash"]):
+    is_valid, new_hash = await verify_and_update_password(request.password, user["password_hash"])
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="账号或密码错误 / Invalid credentials"
@@ -164,12 +179,14 @@ async def login_with_password(request: LoginPasswordRequest, db: Client = Depend
     
     user_id = user["id"]
     
-    # Generate tokens
-    access_token = create_access_token(user_id)
-    refresh_token = create_refresh_token()
+    # Transparently upgrade hashes created with a different cost
+    if new_hash:
+        await execute(db.table("users").update({"password_hash": new_hash}).eq("id", user_id))
+        invalidate_cached_user(user_id)
     
-    # Store refresh token
-    await store_refresh_token(db, user_id, refresh_token)
+    # Generate tokens (a new refresh token family per login)
+    refresh_token, family_id = await issue_refresh_token(db, user_id)
+    access_token = create_access_token(user_id, family_id=family_id)
     
     return TokenResponse(
         access_token=access_token,
@@ -178,7 +195,7 @@ async def login_with_password(request: LoginPasswordRequest, db: Client = Depend
     )
 
 
-@router.post("/login/code", response_model=TokenResponse)
+@router.post("/login/code", response_model=TokenResponse, dependencies=credential_rate_limit)
 async def login_with_code(request: LoginCodeRequest, db: Client = Depends(get_db)):
     """
     Login with email/phone and verification code.
@@ -204,12 +221,9 @@ async def login_with_code(request: LoginCodeRequest, db: Client = Depends(get_db
     
     user_id = user["id"]
     
-    # Generate tokens
-    access_token = create_access_token(user_id)
-    refresh_token = create_refresh_token()
-    
-    # Store refresh token
-    await store_refresh_token(db, user_id, refresh_token)
+    # Generate tokens (a new refresh token family per login)
+    refresh_token, family_id = await issue_refresh_token(db, user_id)
+    access_token = create_access_token(user_id, family_id=family_id)
     
     return TokenResponse(
         access_token=access_token,
@@ -223,24 +237,17 @@ async def refresh_token(request: RefreshRequest, db: Client = Depends(get_db)):
     """
     Refresh the access token using a refresh token.
     """
-    # Verify refresh token
-    user_id = await verify_refresh_token(db, request.refresh_token)
+    # Validate and rotate; replaying an already-rotated token revokes its family
+    rotated = await rotate_refresh_token(db, request.refresh_token)
     
-    if not user_id:
+    if not rotated:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="无效的刷新令牌 / Invalid refresh token"
         )
     
-    # Revoke old refresh token
-    await revoke_refresh_token(db, request.refresh_token)
-    
-    # Generate new tokens
-    access_token = create_access_token(user_id)
-    new_refresh_token = create_refresh_token()
-    
-    # Store new refresh token
-    await store_refresh_token(db, user_id, new_refresh_token)
+    user_id, family_id, new_refresh_token = rotated
+    access_token = create_access_token(user_id, family_id=family_id)
     
     return TokenResponse(
         access_token=access_token,
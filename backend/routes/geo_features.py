@@ -1,23 +1,44 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from typing import List, Optional
 from uuid import UUID
 from supabase import Client
 
-from models.geo_feature import GeographicFeature, GeographicFeatureCreate
-from services.supabase_client import get_db
+from models.geo_feature import (
+    GeographicFeature,
+    GeographicFeatureCreate,
+    GeographicFeatureNearby,
+    GeoFeatureClusterTile,
+)
+from models.bulk import BulkIngestResult
+from services.supabase_client import get_db, execute
+from services.bulk_ingest import ingest
+from routes.admin import require_admin_token
+from services.geo_index import tile_bbox
+from services.pagination import apply_cursor, set_next_cursor
+from services.serialization import trusted_response
+from services.geo_service import (
+    GEO_FEATURE_COLUMNS,
+    features_in_bbox,
+    features_nearby,
+    feature_clusters,
+    index_feature,
+    search_features,
+)
 
 router = APIRouter(prefix="/api/geo-features", tags=["geographic-features"])
 
 @router.get("/", response_model=List[GeographicFeature])
 async def get_geo_features(
+    response: Response,
     feature_type: Optional[str] = Query(None, description="Filter by type: volcano, mountain, desert, etc."),
     region: Optional[str] = Query(None, description="Filter by region"),
-    limit: int = Query(50, le=100),
+    limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header; replaces offset"),
     db: Client = Depends(get_db)
 ):
-    """Get geographic features with optional filters."""
-    query = db.table("geographic_features").select("*")
+    """Get geographic features with optional filters, ordered by name."""
+    query = db.table("geographic_features").select(GEO_FEATURE_COLUMNS)
     
     if feature_type:
         query = query.eq("feature_type", feature_type)
@@ -25,14 +46,81 @@ async def get_geo_features(
     if region:
         query = query.ilike("region", f"%{region}%")
     
-    response = query.order("name").range(offset, offset + limit - 1).execute()
+    query = apply_cursor(query, cursor, "name")
     
-    return response.data or []
+    if cursor:
+        features_response = await execute(query.limit(limit))
+    else:
+        features_response = await execute(query.range(offset, offset + limit - 1))
+    
+    rows = features_response.data or []
+    set_next_cursor(response, rows, limit, "name")
+    
+    return trusted_response(rows, GeographicFeature, response)
+
+@router.get("/bbox", response_model=List[GeographicFeature])
+async def get_geo_features_in_bbox(
+    response: Response,
+    min_lon: float = Query(..., ge=-180, le=180),
+    min_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180, description="May be less than min_lon to cross the antimeridian"),
+    max_lat: float = Query(..., ge=-90, le=90),
+    feature_type: Optional[str] = Query(None, description="Filter by type"),
+    limit: int = Query(500, ge=1, le=2000),
+    db: Client = Depends(get_db)
+):
+    """Get geographic features inside a bounding box."""
+    if min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="min_lat must not exceed max_lat")
+    
+    rows = await features_in_bbox(db, (min_lon, min_lat, max_lon, max_lat), feature_type, limit)
+    return trusted_response(rows, GeographicFeature, response)
+
+@router.get("/nearby", response_model=List[GeographicFeatureNearby])
+async def get_geo_features_nearby(
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(50_000, gt=0, le=20_000_000, description="Search radius in meters"),
+    feature_type: Optional[str] = Query(None, description="Filter by type"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Client = Depends(get_db)
+):
+    """Get the nearest geographic features within a radius, closest first."""
+    rows = await features_nearby(db, lat, lon, radius_m, feature_type, limit)
+    return trusted_response(rows, GeographicFeatureNearby, response)
+
+@router.get("/tiles/{z}/{x}/{y}", response_model=List[GeographicFeature])
+async def get_geo_features_in_tile(
+    response: Response,
+    z: int,
+    x: int,
+    y: int,
+    feature_type: Optional[str] = Query(None, description="Filter by type"),
+    limit: int = Query(500, ge=1, le=2000),
+    db: Client = Depends(get_db)
+):
+    """Get geographic features inside a Web Mercator (XYZ) map tile."""
+    try:
+        bbox = tile_bbox(z, x, y)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    rows = await features_in_bbox(db, bbox, feature_type, limit)
+    return trusted_response(rows, GeographicFeature, response)
+
+@router.get("/clusters/{z}/{x}/{y}", response_model=GeoFeatureClusterTile)
+async def get_geo_feature_clusters(z: int, x: int, y: int, db: Client = Depends(get_db)):
+    """Get pre-aggregated feature clusters for a map tile (low zoom levels)."""
+    try:
+        return await feature_clusters(db, z, x, y)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{feature_id}", response_model=GeographicFeature)
 async def get_geo_feature(feature_id: UUID, db: Client = Depends(get_db)):
     """Get a specific geographic feature by ID."""
-    response = db.table("geographic_features").select("*").eq("id", str(feature_id)).single().execute()
+    response = await execute(db.table("geographic_features").select(GEO_FEATURE_COLUMNS).eq("id", str(feature_id)).single())
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Geographic feature not found")
@@ -42,16 +130,39 @@ async def get_geo_feature(feature_id: UUID, db: Client = Depends(get_db)):
 @router.post("/", response_model=GeographicFeature)
 async def create_geo_feature(feature: GeographicFeatureCreate, db: Client = Depends(get_db)):
     """Create a new geographic feature."""
-    response = db.table("geographic_features").insert(feature.model_dump()).execute()
+    response = await execute(db.table("geographic_features").insert(feature.model_dump()))
     
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to create geographic feature")
     
+    index_feature(response.data[0])
+    
     return response.data[0]
 
-@router.get("/search/{query}", response_model=List[GeographicFeature])
-async def search_geo_features(query: str, limit: int = 10, db: Client = Depends(get_db)):
-    """Search geographic features by name or description."""
-    response = db.table("geographic_features").select("*").or_(f"name.ilike.%{query}%,description.ilike.%{query}%").limit(limit).execute()
+@router.post("/bulk", response_model=BulkIngestResult, dependencies=[Depends(require_admin_token)])
+async def bulk_create_geo_features(request: Request, db: Client = Depends(get_db)):
+    """
+    Bulk-create geographic features from a JSON array, NDJSON or CSV body.
     
-    return response.data or []
+    Rows are validated individually and inserted in batches; failures are
+    reported per row without aborting the upload. Requires X-Admin-Token.
+    """
+    return await ingest(
+        request,
+        db,
+        "geographic_features",
+        GeographicFeatureCreate,
+        json_fields=("stats",),
+        on_inserted=index_feature,
+    )
+
+@router.get("/search/{query}", response_model=List[GeographicFeature])
+async def search_geo_features(
+    response: Response,
+    query: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: Client = Depends(get_db)
+):
+    """Search geographic features by name, region or description, best match first."""
+    rows = await search_features(db, query, limit)
+    return trusted_response(rows, GeographicFeature, response)
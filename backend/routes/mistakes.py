@@ -1,23 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
 from uuid import UUID
 from supabase import Client
 
 from models.mistake import Mistake, MistakeCreate, MistakeUpdate
-from services.supabase_client import get_db
+from services.supabase_client import get_db, execute
+from services.pagination import apply_cursor, set_next_cursor
+from services.serialization import trusted_response
 
 router = APIRouter(prefix="/api/mistakes", tags=["mistakes"])
 
 @router.get("/", response_model=List[Mistake])
 async def get_mistakes(
+    response: Response,
     user_id: Optional[UUID] = Query(None, description="Filter by user ID"),
     category: Optional[str] = Query(None, description="Filter by category: physical, human, regional"),
     mastery_level: Optional[str] = Query(None, description="Filter by mastery: low, medium, critical"),
-    limit: int = Query(50, le=100),
+    limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header; replaces offset"),
     db: Client = Depends(get_db)
 ):
-    """Get mistakes with optional filters."""
+    """Get mistakes with optional filters, newest first."""
     query = db.table("mistakes").select("*")
     
     if user_id:
@@ -29,14 +33,22 @@ async def get_mistakes(
     if mastery_level:
         query = query.eq("mastery_level", mastery_level)
     
-    response = query.order("added_at", desc=True).range(offset, offset + limit - 1).execute()
+    query = apply_cursor(query, cursor, "added_at", desc=True)
     
-    return response.data or []
+    if cursor:
+        mistakes_response = await execute(query.limit(limit))
+    else:
+        mistakes_response = await execute(query.range(offset, offset + limit - 1))
+    
+    rows = mistakes_response.data or []
+    set_next_cursor(response, rows, limit, "added_at")
+    
+    return trusted_response(rows, Mistake, response)
 
 @router.get("/{mistake_id}", response_model=Mistake)
 async def get_mistake(mistake_id: UUID, db: Client = Depends(get_db)):
     """Get a specific mistake by ID."""
-    response = db.table("mistakes").select("*").eq("id", str(mistake_id)).single().execute()
+    response = await execute(db.table("mistakes").select("*").eq("id", str(mistake_id)).single())
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Mistake not found")
@@ -49,7 +61,7 @@ async def create_mistake(mistake: MistakeCreate, db: Client = Depends(get_db)):
     data = mistake.model_dump()
     data["user_id"] = str(data["user_id"])
     
-    response = db.table("mistakes").insert(data).execute()
+    response = await execute(db.table("mistakes").insert(data))
     
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to create mistake")
@@ -64,7 +76,7 @@ async def update_mistake(mistake_id: UUID, mistake: MistakeUpdate, db: Client =
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    response = db.table("mistakes").update(update_data).eq("id", str(mistake_id)).execute()
+    response = await execute(db.table("mistakes").update(update_data).eq("id", str(mistake_id)))
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Mistake not found")
@@ -74,7 +86,7 @@ async def update_mistake(mistake_id: UUID, mistake: MistakeUpdate, db: Client =
 @router.delete("/{mistake_id}")
 async def delete_mistake(mistake_id: UUID, db: Client = Depends(get_db)):
     """Delete a mistake entry."""
-    response = db.table("mistakes").delete().eq("id", str(mistake_id)).execute()
+    response = await execute(db.table("mistakes").delete().eq("id", str(mistake_id)))
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Mistake not found")
@@ -1,43 +1,59 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
-from datetime import date
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from typing import List, Optional
 from uuid import UUID
 from supabase import Client
 
 from models.trivia import DailyTrivia, DailyTriviaCreate
-from services.supabase_client import get_db
+from models.bulk import BulkIngestResult
+from services.supabase_client import get_db, execute
+from services.catalog_cache import catalog_cache, conditional_response
+from services.pagination import apply_cursor, set_next_cursor
+from services.bulk_ingest import ingest
+from routes.admin import require_admin_token
+from services.serialization import trusted_response
+from services.trivia_scheduler import trivia_scheduler
 
 router = APIRouter(prefix="/api/trivia", tags=["trivia"])
 
 @router.get("/today", response_model=DailyTrivia)
-async def get_today_trivia(db: Client = Depends(get_db)):
-    """Get today's featured trivia."""
-    today = date.today().isoformat()
+async def get_today_trivia(request: Request, response: Response, db: Client = Depends(get_db)):
+    """Get today's featured trivia, or the latest one when none is featured."""
+    entry = await trivia_scheduler.get_today(db)
     
-    response = db.table("daily_trivia").select("*").eq("featured_date", today).single().execute()
+    if entry is None:
+        raise HTTPException(status_code=404, detail="No trivia available")
     
-    if not response.data:
-        # If no trivia for today, get the latest one
-        response = db.table("daily_trivia").select("*").order("created_at", desc=True).limit(1).execute()
+    return trusted_response(conditional_response(request, response, entry), DailyTrivia, response, entry.bodies)
+
+@router.get("/", response_model=List[DailyTrivia])
+async def get_all_trivia(
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header; replaces offset"),
+    db: Client = Depends(get_db)
+):
+    """Get all trivia entries with pagination, newest first."""
+    async def load():
+        query = apply_cursor(db.table("daily_trivia").select("*"), cursor, "created_at", desc=True)
         
-        if not response.data:
-            raise HTTPException(status_code=404, detail="No trivia available")
+        if cursor:
+            trivia_response = await execute(query.limit(limit))
+        else:
+            trivia_response = await execute(query.range(offset, offset + limit - 1))
         
-        return response.data[0]
+        return trivia_response.data or []
     
-    return response.data
-
-@router.get("/", response_model=List[DailyTrivia])
-async def get_all_trivia(limit: int = 20, offset: int = 0, db: Client = Depends(get_db)):
-    """Get all trivia entries with pagination."""
-    response = db.table("daily_trivia").select("*").order("created_at", desc=True).range(offset, offset + limit - 1).execute()
+    entry = await catalog_cache.get_or_load("trivia", ("list", limit, offset, cursor), load)
+    set_next_cursor(response, entry.payload, limit, "created_at")
     
-    return response.data or []
+    return trusted_response(conditional_response(request, response, entry), DailyTrivia, response, entry.bodies)
 
 @router.get("/{trivia_id}", response_model=DailyTrivia)
 async def get_trivia(trivia_id: UUID, db: Client = Depends(get_db)):
     """Get a specific trivia by ID."""
-    response = db.table("daily_trivia").select("*").eq("id", str(trivia_id)).single().execute()
+    response = await execute(db.table("daily_trivia").select("*").eq("id", str(trivia_id)).single())
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Trivia not found")
@@ -47,9 +63,28 @@ async def get_trivia(trivia_id: UUID, db: Client = Depends(get_db)):
 @router.post("/", response_model=DailyTrivia)
 async def create_trivia(trivia: DailyTriviaCreate, db: Client = Depends(get_db)):
     """Create a new trivia entry."""
-    response = db.table("daily_trivia").insert(trivia.model_dump()).execute()
+    response = await execute(db.table("daily_trivia").insert(trivia.model_dump()))
     
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to create trivia")
     
+    catalog_cache.invalidate("trivia")
+    trivia_scheduler.invalidate()
+    
     return response.data[0]
+
+@router.post("/bulk", response_model=BulkIngestResult, dependencies=[Depends(require_admin_token)])
+async def bulk_create_trivia(request: Request, db: Client = Depends(get_db)):
+    """
+    Bulk-create trivia entries from a JSON array, NDJSON or CSV body.
+    
+    Rows are validated individually and inserted in batches; failures are
+    reported per row without aborting the upload. Requires X-Admin-Token.
+    """
+    result = await ingest(request, db, "daily_trivia", DailyTriviaCreate)
+    
+    if result["inserted"]:
+        catalog_cache.invalidate("trivia")
+        trivia_scheduler.invalidate()
+    
+    return result
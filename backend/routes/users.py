@@ -1,17 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 from uuid import UUID
 from supabase import Client
 
 from models.user import User, UserCreate, UserUpdate, UserProgress
-from services.supabase_client import get_db
+from services.supabase_client import get_db, execute
+from services.auth_service import invalidate_cached_user
+from services.export_service import EXPORT_RESOURCES, stream_csv, stream_ndjson
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
 @router.get("/{user_id}", response_model=User)
 async def get_user(user_id: UUID, db: Client = Depends(get_db)):
     """Get a user by ID."""
-    response = db.table("users").select("*").eq("id", str(user_id)).single().execute()
+    response = await execute(db.table("users").select("*").eq("id", str(user_id)).single())
     
     if not response.data:
         raise HTTPException(status_code=404, detail="User not found")
@@ -21,7 +24,7 @@ async def get_user(user_id: UUID, db: Client = Depends(get_db)):
 @router.post("/", response_model=User)
 async def create_user(user: UserCreate, db: Client = Depends(get_db)):
     """Create a new user."""
-    response = db.table("users").insert(user.model_dump()).execute()
+    response = await execute(db.table("users").insert(user.model_dump()))
     
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to create user")
@@ -36,34 +39,69 @@ async def update_user(user_id: UUID, user: UserUpdate, db: Client = Depends(get_
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    response = db.table("users").update(update_data).eq("id", str(user_id)).execute()
+    response = await execute(db.table("users").update(update_data).eq("id", str(user_id)))
     
     if not response.data:
         raise HTTPException(status_code=404, detail="User not found")
     
+    invalidate_cached_user(user_id)
+    
     return response.data[0]
 
 @router.get("/{user_id}/progress", response_model=UserProgress)
-async def get_user_progress(user_id: UUID, db: Client = Depends(get_db)):
+async def get_user_progress(
+    user_id: UUID,
+    include_mistakes: bool = Query(False, description="Include mistake counts per category"),
+    db: Client = Depends(get_db)
+):
     """Get user's overall learning progress."""
-    # Get user info
-    user_response = db.table("users").select("*").eq("id", str(user_id)).single().execute()
+    response = await execute(db.rpc("get_user_progress_summary", {
+        "p_user_id": str(user_id),
+        "p_include_mistakes": include_mistakes
+    }))
+    
+    if not response.data:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return response.data
+
+@router.get("/{user_id}/export")
+async def export_user_data(
+    user_id: UUID,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="ndjson or csv"),
+    resource: Optional[Literal["mistakes", "level_progress"]] = Query(
+        None, description="Export a single resource; required for csv"
+    ),
+    db: Client = Depends(get_db)
+):
+    """
+    Stream a user's mistakes and level progress.
+
+    NDJSON lines look like {"type": "mistake" | "level_progress", "data": {...}};
+    CSV exports one resource with a header row.
+    """
+    if format == "csv" and resource is None:
+        raise HTTPException(status_code=400, detail="CSV export needs a resource")
+    
+    # Check up front: once streaming starts the status code can no longer change
+    response = await execute(db.table("users").select("id").eq("id", str(user_id)).limit(1))
     
-    if not user_response.data:
+    if not response.data:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get completed levels count
-    progress_response = db.table("user_level_progress").select("*").eq("user_id", str(user_id)).eq("status", "completed").execute()
-    completed_levels = len(progress_response.data) if progress_response.data else 0
-    
-    # Get current active level
-    active_response = db.table("user_level_progress").select("level_id").eq("user_id", str(user_id)).eq("status", "active").execute()
-    current_level_id = active_response.data[0]["level_id"] if active_response.data else None
-    
-    return {
-        "user_id": user_id,
-        "total_stars": user_response.data["total_stars"],
-        "level": user_response.data["level"],
-        "completed_levels": completed_levels,
-        "current_level_id": current_level_id
-    }
+    resources = [resource] if resource else list(EXPORT_RESOURCES)
+    filename = f"{user_id}-{resource or 'history'}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    
+    if format == "csv":
+        return StreamingResponse(
+            stream_csv(db, str(user_id), resource),
+            media_type="text/csv; charset=utf-8",
+            headers=headers
+        )
+    
+    return StreamingResponse(
+        stream_ndjson(db, str(user_id), resources),
+        media_type="application/x-ndjson",
+        headers=headers
+    )
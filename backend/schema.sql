@@ -4,6 +4,12 @@
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Enable PostGIS for spatial queries on geographic features
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+-- Enable trigram matching for substring, CJK and typo-tolerant search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- ============================================
 -- Users table
 -- ============================================
@@ -107,11 +113,380 @@ CREATE INDEX IF NOT EXISTS idx_daily_trivia_date ON daily_trivia(featured_date);
 CREATE INDEX IF NOT EXISTS idx_levels_order ON levels(order_index);
 CREATE INDEX IF NOT EXISTS idx_user_progress_user ON user_level_progress(user_id);
 CREATE INDEX IF NOT EXISTS idx_user_progress_level ON user_level_progress(level_id);
+CREATE INDEX IF NOT EXISTS idx_user_progress_user_status ON user_level_progress(user_id, status);
 CREATE INDEX IF NOT EXISTS idx_mistakes_user ON mistakes(user_id);
 CREATE INDEX IF NOT EXISTS idx_mistakes_category ON mistakes(category);
 CREATE INDEX IF NOT EXISTS idx_geo_features_type ON geographic_features(feature_type);
 CREATE INDEX IF NOT EXISTS idx_ar_landforms_type ON ar_landforms(type);
 
+-- Composite indexes matching the keyset (cursor) pagination order
+CREATE INDEX IF NOT EXISTS idx_mistakes_user_added ON mistakes(user_id, added_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_mistakes_added ON mistakes(added_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_geo_features_name ON geographic_features(name, id);
+CREATE INDEX IF NOT EXISTS idx_daily_trivia_created ON daily_trivia(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_user_progress_user_id ON user_level_progress(user_id, id);
+
+-- ============================================
+-- Spatial index for geographic features (地理特征空间索引)
+-- ============================================
+ALTER TABLE geographic_features ADD COLUMN IF NOT EXISTS location GEOGRAPHY(Point, 4326)
+    GENERATED ALWAYS AS (
+        CASE WHEN latitude IS NOT NULL AND longitude IS NOT NULL
+            THEN ST_SetSRID(ST_MakePoint(longitude::float8, latitude::float8), 4326)::geography
+        END
+    ) STORED;
+
+-- Geography index serves radius / nearest-N, geometry expression index serves bounding boxes
+CREATE INDEX IF NOT EXISTS idx_geo_features_location ON geographic_features USING GIST(location);
+CREATE INDEX IF NOT EXISTS idx_geo_features_location_geom ON geographic_features USING GIST((location::geometry));
+
+-- Features inside a lon/lat box (callers split boxes that cross the antimeridian)
+CREATE OR REPLACE FUNCTION geo_features_in_bbox(
+    p_min_lon DOUBLE PRECISION,
+    p_min_lat DOUBLE PRECISION,
+    p_max_lon DOUBLE PRECISION,
+    p_max_lat DOUBLE PRECISION,
+    p_feature_type TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 500
+)
+RETURNS TABLE (
+    id UUID,
+    name VARCHAR,
+    description TEXT,
+    feature_type VARCHAR,
+    latitude DECIMAL,
+    longitude DECIMAL,
+    region VARCHAR,
+    image_url TEXT,
+    stats JSONB,
+    created_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    SELECT f.id, f.name, f.description, f.feature_type, f.latitude, f.longitude,
+           f.region, f.image_url, f.stats, f.created_at
+    FROM geographic_features f
+    WHERE f.location::geometry && ST_MakeEnvelope(p_min_lon, p_min_lat, p_max_lon, p_max_lat, 4326)
+      AND (p_feature_type IS NULL OR f.feature_type = p_feature_type)
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Nearest features within a radius (meters), closest first
+CREATE OR REPLACE FUNCTION geo_features_nearby(
+    p_lat DOUBLE PRECISION,
+    p_lon DOUBLE PRECISION,
+    p_radius_m DOUBLE PRECISION,
+    p_feature_type TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20
+)
+RETURNS TABLE (
+    id UUID,
+    name VARCHAR,
+    description TEXT,
+    feature_type VARCHAR,
+    latitude DECIMAL,
+    longitude DECIMAL,
+    region VARCHAR,
+    image_url TEXT,
+    stats JSONB,
+    created_at TIMESTAMP WITH TIME ZONE,
+    distance_m DOUBLE PRECISION
+) AS $$
+    SELECT f.id, f.name, f.description, f.feature_type, f.latitude, f.longitude,
+           f.region, f.image_url, f.stats, f.created_at,
+           ST_Distance(f.location, ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4326)::geography)
+    FROM geographic_features f
+    WHERE ST_DWithin(f.location, ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4326)::geography, p_radius_m)
+      AND (p_feature_type IS NULL OR f.feature_type = p_feature_type)
+    ORDER BY f.location <-> ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4326)::geography
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Per-cell aggregates for map clustering: features in the box grouped by
+-- the XYZ tile of zoom p_level that contains them
+CREATE OR REPLACE FUNCTION geo_feature_clusters(
+    p_min_lon DOUBLE PRECISION,
+    p_min_lat DOUBLE PRECISION,
+    p_max_lon DOUBLE PRECISION,
+    p_max_lat DOUBLE PRECISION,
+    p_level INTEGER
+)
+RETURNS TABLE (
+    cell_x INTEGER,
+    cell_y INTEGER,
+    count BIGINT,
+    lat_sum DOUBLE PRECISION,
+    lon_sum DOUBLE PRECISION,
+    type_counts JSONB
+) AS $$
+    WITH points AS (
+        SELECT
+            COALESCE(f.feature_type, '') AS feature_type,
+            f.latitude::float8 AS lat,
+            f.longitude::float8 AS lon,
+            LEAST(
+                floor((f.longitude::float8 + 180) / 360 * 2 ^ p_level),
+                2 ^ p_level - 1
+            )::INTEGER AS cx,
+            LEAST(
+                floor((1 - ln(tan(radians(f.latitude::float8)) + 1 / cos(radians(f.latitude::float8))) / pi()) / 2 * 2 ^ p_level),
+                2 ^ p_level - 1
+            )::INTEGER AS cy
+        FROM geographic_features f
+        WHERE f.location::geometry && ST_MakeEnvelope(p_min_lon, p_min_lat, p_max_lon, p_max_lat, 4326)
+          AND abs(f.latitude) <= 85.05112878
+    ), by_type AS (
+        SELECT cx, cy, feature_type, COUNT(*) AS n, SUM(lat) AS lat_sum, SUM(lon) AS lon_sum
+        FROM points
+        GROUP BY cx, cy, feature_type
+    )
+    SELECT cx, cy, SUM(n)::BIGINT, SUM(lat_sum), SUM(lon_sum), jsonb_object_agg(feature_type, n)
+    FROM by_type
+    GROUP BY cx, cy;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- Full-text search for geographic features (地理特征全文检索)
+-- ============================================
+
+-- Weighted word index (name > region > description) for ranked, prefix matches
+ALTER TABLE geographic_features ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', COALESCE(name, '')), 'A') ||
+        setweight(to_tsvector('simple', COALESCE(region, '')), 'B') ||
+        setweight(to_tsvector('simple', COALESCE(description, '')), 'C')
+    ) STORED;
+
+-- Lower-cased text for trigram matching; covers CJK, which has no word boundaries
+ALTER TABLE geographic_features ADD COLUMN IF NOT EXISTS search_text TEXT
+    GENERATED ALWAYS AS (
+        lower(COALESCE(name, '') || ' ' || COALESCE(region, '') || ' ' || COALESCE(description, ''))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_geo_features_search_vector ON geographic_features USING GIN(search_vector);
+CREATE INDEX IF NOT EXISTS idx_geo_features_search_text ON geographic_features USING GIN(search_text gin_trgm_ops);
+
+-- Ranked search: every word as a prefix match, substring match (CJK), or
+-- trigram word similarity (typos). The query is a bound parameter.
+CREATE OR REPLACE FUNCTION search_geo_features(p_query TEXT, p_limit INTEGER DEFAULT 10)
+RETURNS TABLE (
+    id UUID,
+    name VARCHAR,
+    description TEXT,
+    feature_type VARCHAR,
+    latitude DECIMAL,
+    longitude DECIMAL,
+    region VARCHAR,
+    image_url TEXT,
+    stats JSONB,
+    created_at TIMESTAMP WITH TIME ZONE,
+    rank REAL
+) AS $$
+    WITH q AS (
+        SELECT
+            lower(trim(p_query)) AS text,
+            '%' || replace(replace(replace(lower(trim(p_query)), '\', '\\'), '%', '\%'), '_', '\_') || '%' AS pattern,
+            (
+                SELECT to_tsquery('simple', string_agg(quote_literal(word) || ':*', ' & '))
+                FROM regexp_split_to_table(
+                    regexp_replace(lower(p_query), '[^[:alnum:]]+', ' ', 'g'), '\s+'
+                ) AS word
+                WHERE word <> ''
+            ) AS tsq
+    )
+    SELECT f.id, f.name, f.description, f.feature_type, f.latitude, f.longitude,
+           f.region, f.image_url, f.stats, f.created_at,
+           (
+               COALESCE(ts_rank(f.search_vector, q.tsq), 0)
+               + similarity(lower(f.name), q.text)
+               + word_similarity(q.text, f.search_text)
+           )::REAL AS rank
+    FROM geographic_features f, q
+    WHERE q.text <> ''
+      AND (
+          f.search_vector @@ q.tsq
+          OR f.search_text LIKE q.pattern
+          OR q.text <% f.search_text
+      )
+    ORDER BY rank DESC, f.name
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- Level progress functions (关卡进度, one round-trip per call)
+-- ============================================
+
+-- Every level joined with the user's progress; unstarted levels come back locked
+CREATE OR REPLACE FUNCTION get_user_level_progress(p_user_id UUID)
+RETURNS TABLE (
+    id UUID,
+    user_id UUID,
+    level_id UUID,
+    status VARCHAR,
+    score INTEGER,
+    stars INTEGER,
+    completion_percentage INTEGER,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    level_name VARCHAR,
+    level_order INTEGER
+) AS $$
+    SELECT
+        p.id,
+        p_user_id,
+        l.id,
+        COALESCE(p.status, 'locked'),
+        COALESCE(p.score, 0),
+        COALESCE(p.stars, 0),
+        COALESCE(p.completion_percentage, 0),
+        p.completed_at,
+        l.name,
+        l.order_index
+    FROM levels l
+    LEFT JOIN user_level_progress p
+        ON p.level_id = l.id AND p.user_id = p_user_id
+    ORDER BY l.order_index;
+$$ LANGUAGE sql STABLE;
+
+-- Partial upsert (NULL = leave unchanged); users.total_stars follows via trigger
+CREATE OR REPLACE FUNCTION upsert_user_level_progress(
+    p_user_id UUID,
+    p_level_id UUID,
+    p_status VARCHAR DEFAULT NULL,
+    p_score INTEGER DEFAULT NULL,
+    p_stars INTEGER DEFAULT NULL,
+    p_completion_percentage INTEGER DEFAULT NULL
+)
+RETURNS SETOF user_level_progress AS $$
+BEGIN
+    RETURN QUERY
+    WITH upserted AS (
+        INSERT INTO user_level_progress AS ulp
+            (user_id, level_id, status, score, stars, completion_percentage, completed_at)
+        VALUES (
+            p_user_id,
+            p_level_id,
+            COALESCE(p_status, 'locked'),
+            COALESCE(p_score, 0),
+            COALESCE(p_stars, 0),
+            COALESCE(p_completion_percentage, 0),
+            CASE WHEN p_status = 'completed' THEN NOW() END
+        )
+        ON CONFLICT (user_id, level_id) DO UPDATE SET
+            status = COALESCE(p_status, ulp.status),
+            score = COALESCE(p_score, ulp.score),
+            stars = COALESCE(p_stars, ulp.stars),
+            completion_percentage = COALESCE(p_completion_percentage, ulp.completion_percentage),
+            completed_at = CASE
+                WHEN p_status = 'completed' AND ulp.completed_at IS NULL THEN NOW()
+                ELSE ulp.completed_at
+            END
+        RETURNING ulp.*
+    )
+    SELECT * FROM upserted;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- User progress summary (用户学习概况, one round-trip)
+-- ============================================
+CREATE OR REPLACE FUNCTION get_user_progress_summary(
+    p_user_id UUID,
+    p_include_mistakes BOOLEAN DEFAULT FALSE
+)
+RETURNS JSON AS $$
+    SELECT json_build_object(
+        'user_id', u.id,
+        'total_stars', COALESCE(u.total_stars, 0),
+        'level', u.level,
+        'completed_levels', (
+            SELECT COUNT(*) FROM user_level_progress
+            WHERE user_id = u.id AND status = 'completed'
+        ),
+        'current_level_id', (
+            SELECT level_id FROM user_level_progress
+            WHERE user_id = u.id AND status = 'active'
+            LIMIT 1
+        ),
+        'mistake_counts', CASE WHEN p_include_mistakes THEN (
+            SELECT COALESCE(json_object_agg(category, total), '{}'::json)
+            FROM (
+                SELECT category, COUNT(*) AS total FROM mistakes
+                WHERE user_id = u.id AND category IS NOT NULL
+                GROUP BY category
+            ) counts
+        ) END
+    )
+    FROM users u
+    WHERE u.id = p_user_id;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- Total stars maintenance (总星数增量维护)
+-- ============================================
+
+-- Apply old/new star deltas to users.total_stars, O(1) per progress write
+CREATE OR REPLACE FUNCTION apply_total_stars_delta()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Same user: one net update (the UPDATE trigger only fires when stars changed)
+    IF TG_OP = 'UPDATE' AND OLD.user_id = NEW.user_id THEN
+        UPDATE users
+        SET total_stars = COALESCE(total_stars, 0) + COALESCE(NEW.stars, 0) - COALESCE(OLD.stars, 0)
+        WHERE id = NEW.user_id;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND COALESCE(OLD.stars, 0) <> 0 THEN
+        UPDATE users
+        SET total_stars = COALESCE(total_stars, 0) - OLD.stars
+        WHERE id = OLD.user_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND COALESCE(NEW.stars, 0) <> 0 THEN
+        UPDATE users
+        SET total_stars = COALESCE(total_stars, 0) + NEW.stars
+        WHERE id = NEW.user_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_user_level_progress_stars ON user_level_progress;
+CREATE TRIGGER trg_user_level_progress_stars
+    AFTER INSERT OR DELETE ON user_level_progress
+    FOR EACH ROW EXECUTE FUNCTION apply_total_stars_delta();
+
+-- upsert_user_level_progress always assigns stars; skip the users row lock when nothing changed
+DROP TRIGGER IF EXISTS trg_user_level_progress_stars_update ON user_level_progress;
+CREATE TRIGGER trg_user_level_progress_stars_update
+    AFTER UPDATE OF stars, user_id ON user_level_progress
+    FOR EACH ROW
+    WHEN (OLD.stars IS DISTINCT FROM NEW.stars OR OLD.user_id IS DISTINCT FROM NEW.user_id)
+    EXECUTE FUNCTION apply_total_stars_delta();
+
+-- Verify total_stars against the progress rows and repair up to p_limit drifted users.
+-- The fix is applied as a delta so concurrent trigger updates are not lost.
+CREATE OR REPLACE FUNCTION reconcile_total_stars(p_limit INTEGER DEFAULT 1000)
+RETURNS TABLE (user_id UUID, stored_stars INTEGER, actual_stars INTEGER) AS $$
+    WITH drift AS (
+        SELECT
+            u.id,
+            COALESCE(u.total_stars, 0) AS stored,
+            COALESCE(SUM(p.stars), 0)::INTEGER AS actual
+        FROM users u
+        LEFT JOIN user_level_progress p ON p.user_id = u.id
+        GROUP BY u.id
+        HAVING COALESCE(u.total_stars, 0) <> COALESCE(SUM(p.stars), 0)
+        LIMIT p_limit
+    ), repaired AS (
+        UPDATE users u
+        SET total_stars = COALESCE(u.total_stars, 0) + (d.actual - d.stored)
+        FROM drift d
+        WHERE u.id = d.id
+        RETURNING u.id
+    )
+    SELECT d.id, d.stored, d.actual FROM drift d;
+$$ LANGUAGE sql;
+
 -- ============================================
 -- Insert sample data
 -- ============================================
@@ -123,7 +498,7 @@ VALUES (
     'Alex',
     'https://lh3.googleusercontent.com/aida-public/AB6AXuCJlC6i-GX8uG7cjiRQSTfVaEJIZn3Gso0HxkCA4ttXcyCvdT7GybSqY1yhQGMn7L1LsM_W0amrWj6WGwFjjZKlh7nZEjt_e0GvrKTfDNHO5bvEO7Y4DN00qSs4Uzte6ZgqBS0NSsD5fyUKGePGwpWltJCnL6ItWwPf9WqjObykoz1swallvLNQc4MZL_8_XQxfWCpvscMKYox9GKuWrK8Yqm_3cNtvY7N4rkHIHKsZxDcVXz8-1I9bD2JHPBRp_FOpuslPtQ5USRDZ',
     '初学者',
-    45
+    0  -- filled in by trg_user_level_progress_stars from the sample progress below
 ) ON CONFLICT (id) DO NOTHING;
 
 -- Sample daily trivia
@@ -35,6 +35,35 @@ CREATE TABLE IF NOT EXISTS refresh_tokens (
     revoked BOOLEAN DEFAULT FALSE
 );
 
+-- ============================================
+-- Refresh token families (刷新令牌轮换族)
+-- Every login starts a family; each refresh rotates to a new token in it.
+-- Revoking the family invalidates every token (and access token) it issued.
+-- ============================================
+CREATE TABLE IF NOT EXISTS refresh_token_families (
+    id UUID PRIMARY KEY,
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    revoked_at TIMESTAMP WITH TIME ZONE
+);
+
+-- jti / family_id / parent_jti are set for JWT refresh tokens; NULL for legacy opaque tokens.
+-- parent_jti is unique: a token can be rotated once, a second use is a replay.
+ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS jti UUID UNIQUE;
+ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS family_id UUID REFERENCES refresh_token_families(id) ON DELETE CASCADE;
+ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS parent_jti UUID UNIQUE;
+
+-- ============================================
+-- Scheduler leases (定时任务租约)
+-- Leader election for maintenance jobs: only the worker holding a job's
+-- lease runs it.
+-- ============================================
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
 -- ============================================
 -- Indexes for performance
 -- ============================================
@@ -44,12 +73,18 @@ CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user ON refresh_tokens(user_id);
 CREATE INDEX IF NOT EXISTS idx_refresh_tokens_hash ON refresh_tokens(token_hash);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_phone ON users(phone);
+CREATE INDEX IF NOT EXISTS idx_token_families_user_active ON refresh_token_families(user_id) WHERE revoked_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_token_families_revoked ON refresh_token_families(revoked_at) WHERE revoked_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family ON refresh_tokens(family_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_expires ON refresh_tokens(expires_at);
 
 -- ============================================
 -- Row Level Security
 -- ============================================
 ALTER TABLE verification_codes ENABLE ROW LEVEL SECURITY;
 ALTER TABLE refresh_tokens ENABLE ROW LEVEL SECURITY;
+ALTER TABLE refresh_token_families ENABLE ROW LEVEL SECURITY;
+ALTER TABLE scheduler_leases ENABLE ROW LEVEL SECURITY;
 
 -- Policies for verification_codes (server-side only)
 CREATE POLICY "Server access only" ON verification_codes FOR ALL USING (true);
@@ -57,6 +92,8 @@ CREATE POLICY "Server access only" ON verification_codes FOR ALL USING (true);
 -- Policies for refresh_tokens
 CREATE POLICY "Users can only see own tokens" ON refresh_tokens FOR SELECT USING (true);
 CREATE POLICY "Server can manage tokens" ON refresh_tokens FOR ALL USING (true);
+CREATE POLICY "Server can manage token families" ON refresh_token_families FOR ALL USING (true);
+CREATE POLICY "Server can manage leases" ON scheduler_leases FOR ALL USING (true);
 
 -- ============================================
 -- Function to clean up expired tokens and codes
@@ -68,5 +105,124 @@ BEGIN
     DELETE FROM verification_codes WHERE expires_at < NOW();
     -- Delete expired refresh tokens
     DELETE FROM refresh_tokens WHERE expires_at < NOW();
+    -- Delete families whose tokens have all expired
+    DELETE FROM refresh_token_families f
+    WHERE f.created_at < NOW() - INTERVAL '1 day'
+      AND NOT EXISTS (SELECT 1 FROM refresh_tokens t WHERE t.family_id = f.id);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- Refresh token issue / rotation (one round-trip each)
+-- ============================================
+CREATE OR REPLACE FUNCTION issue_refresh_token(
+    p_user_id UUID,
+    p_family_id UUID,
+    p_jti UUID,
+    p_token_hash TEXT,
+    p_expires_at TIMESTAMP WITH TIME ZONE
+)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO refresh_token_families (id, user_id) VALUES (p_family_id, p_user_id);
+    INSERT INTO refresh_tokens (user_id, token_hash, expires_at, jti, family_id)
+    VALUES (p_user_id, p_token_hash, p_expires_at, p_jti, p_family_id);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Returns 'ok', 'revoked' (family already revoked) or 'reused' (parent was
+-- already rotated: a replayed token, so the whole family is revoked).
+CREATE OR REPLACE FUNCTION rotate_refresh_token(
+    p_user_id UUID,
+    p_family_id UUID,
+    p_parent_jti UUID,
+    p_jti UUID,
+    p_token_hash TEXT,
+    p_expires_at TIMESTAMP WITH TIME ZONE
+)
+RETURNS TEXT AS $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM refresh_token_families
+        WHERE id = p_family_id AND revoked_at IS NULL
+    ) THEN
+        RETURN 'revoked';
+    END IF;
+
+    BEGIN
+        INSERT INTO refresh_tokens (user_id, token_hash, expires_at, jti, family_id, parent_jti)
+        VALUES (p_user_id, p_token_hash, p_expires_at, p_jti, p_family_id, p_parent_jti);
+    EXCEPTION WHEN unique_violation THEN
+        UPDATE refresh_token_families SET revoked_at = NOW()
+        WHERE id = p_family_id AND revoked_at IS NULL;
+        RETURN 'reused';
+    END;
+
+    RETURN 'ok';
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- Batched purge of expired auth data
+-- Deletes at most p_batch_size rows per table per call so each statement
+-- stays short; the caller repeats until a batch comes back partial.
+-- ============================================
+CREATE OR REPLACE FUNCTION purge_expired_auth_data(p_batch_size INTEGER DEFAULT 1000)
+RETURNS TABLE (
+    codes_deleted INTEGER,
+    tokens_deleted INTEGER,
+    families_deleted INTEGER
+) AS $$
+DECLARE
+    v_codes INTEGER;
+    v_tokens INTEGER;
+    v_families INTEGER;
+BEGIN
+    DELETE FROM verification_codes
+    WHERE id IN (
+        SELECT c.id FROM verification_codes c
+        WHERE c.expires_at < NOW()
+        LIMIT p_batch_size
+    );
+    GET DIAGNOSTICS v_codes = ROW_COUNT;
+
+    DELETE FROM refresh_tokens
+    WHERE id IN (
+        SELECT t.id FROM refresh_tokens t
+        WHERE t.expires_at < NOW()
+        LIMIT p_batch_size
+    );
+    GET DIAGNOSTICS v_tokens = ROW_COUNT;
+
+    DELETE FROM refresh_token_families
+    WHERE id IN (
+        SELECT f.id FROM refresh_token_families f
+        WHERE f.created_at < NOW() - INTERVAL '1 day'
+          AND NOT EXISTS (SELECT 1 FROM refresh_tokens t WHERE t.family_id = f.id)
+        LIMIT p_batch_size
+    );
+    GET DIAGNOSTICS v_families = ROW_COUNT;
+
+    RETURN QUERY SELECT v_codes, v_tokens, v_families;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- Scheduler lease acquisition
+-- Takes (or renews) a lease if it is free, expired, or already ours.
+-- ============================================
+CREATE OR REPLACE FUNCTION acquire_scheduler_lease(
+    p_name TEXT,
+    p_holder TEXT,
+    p_ttl_seconds INTEGER
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    INSERT INTO scheduler_leases AS l (name, holder, expires_at)
+    VALUES (p_name, p_holder, NOW() + make_interval(secs => p_ttl_seconds))
+    ON CONFLICT (name) DO UPDATE
+        SET holder = EXCLUDED.holder, expires_at = EXCLUDED.expires_at
+        WHERE l.holder = EXCLUDED.holder OR l.expires_at < NOW();
+    RETURN FOUND;
 END;
 $$ LANGUAGE plpgsql;
@@ -3,11 +3,13 @@ Authentication Service
 Core authentication logic including JWT token management and password hashing.
 """
 
+import asyncio
 import hashlib
-import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
-from uuid import UUID
+from typing import Optional, Tuple
+from uuid import uuid4
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -16,32 +18,145 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from supabase import Client
 
 from config import settings
-from services.supabase_client import get_db
-
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from services.supabase_client import get_db, execute
+from services.cache import TTLCache
+from services.singleflight import singleflight
+from services.token_revocation import revoked_families
+from services.metrics import register_collector
+from services.overload import remaining_seconds
+
+# Password hashing context; hashes with fewer rounds are flagged for rehash
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+)
+
+# Dedicated pool for bcrypt work (bcrypt releases the GIL, so threads use all cores)
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="bcrypt",
+)
+_password_jobs_pending = 0
+_password_jobs_shed = 0  # rejected on arrival (pool full or no time left)
+_password_jobs_expired = 0  # dropped by a worker after the request's deadline passed
 
 # HTTP Bearer token security
 security = HTTPBearer()
 
+# Authenticated user rows keyed by user id
+user_cache = TTLCache(
+    maxsize=settings.user_cache_size,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+)
+
+register_collector("user_cache", user_cache.stats)
+
+
+class _PasswordJobExpired(Exception):
+    """A queued bcrypt job whose request ran out of time before a worker took it."""
+
+
+def _password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="服务繁忙，请稍后重试 / Server busy, please retry later",
+        headers={"Retry-After": str(settings.password_hash_retry_after_seconds)},
+    )
+
+
+async def _run_password_job(func, *args):
+    """
+    Run a bcrypt operation on the password pool with admission control.
+    
+    Inside a request with a deadline, a job still queued when the deadline
+    passes is skipped by the worker instead of burning a core on a hash
+    nobody will use.
+    
+    Raises:
+        HTTPException: 503 with Retry-After when too many jobs are queued or
+            the request's deadline passes before hashing starts
+    """
+    global _password_jobs_pending, _password_jobs_shed, _password_jobs_expired
+    
+    remaining = remaining_seconds()
+    if _password_jobs_pending >= settings.password_hash_max_pending or (remaining is not None and remaining <= 0):
+        _password_jobs_shed += 1
+        raise _password_pool_busy()
+    
+    deadline = None if remaining is None else time.monotonic() + remaining
+    
+    def job():
+        if deadline is not None and time.monotonic() >= deadline:
+            raise _PasswordJobExpired()
+        return func(*args)
+    
+    _password_jobs_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, job)
+    except _PasswordJobExpired:
+        _password_jobs_expired += 1
+        raise _password_pool_busy()
+    finally:
+        _password_jobs_pending -= 1
+
 
-def hash_password(password: str) -> str:
+async def hash_password(password: str) -> str:
     """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
+    return await _run_password_job(pwd_context.hash, password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return await _run_password_job(pwd_context.verify, plain_password, hashed_password)
 
 
-def create_access_token(user_id: str, expires_delta: Optional[timedelta] = None) -> str:
+async def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if its cost no longer matches settings.
+    
+    Returns:
+        (is_valid, new_hash) where new_hash is None unless a rehash is due
+    """
+    return await _run_password_job(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+def password_pool_stats() -> dict:
+    """Return the current password pool load."""
+    return {
+        "workers": settings.password_hash_workers,
+        "pending": _password_jobs_pending,
+        "max_pending": settings.password_hash_max_pending,
+        "shed": _password_jobs_shed,
+        "expired": _password_jobs_expired,
+    }
+
+
+register_collector("password_pool", password_pool_stats)
+
+
+def shutdown_password_pool() -> None:
+    """Release the password hashing pool."""
+    _password_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_access_token(
+    user_id: str,
+    expires_delta: Optional[timedelta] = None,
+    family_id: Optional[str] = None
+) -> str:
     """
     Create a JWT access token.
     
     Args:
         user_id: The user's UUID
         expires_delta: Optional custom expiry time
+        family_id: Refresh token family the session belongs to; revoking the
+            family also rejects its access tokens
     
     Returns:
         Encoded JWT token
@@ -56,18 +171,64 @@ def create_access_token(user_id: str, expires_delta: Optional[timedelta] = None)
         "exp": expire,
         "type": "access"
     }
+    if family_id:
+        to_encode["fam"] = str(family_id)
     
     return jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
 
 
-def create_refresh_token() -> str:
+def create_refresh_token(
+    user_id: str,
+    family_id: str,
+    jti: str,
+    expires_delta: Optional[timedelta] = None
+) -> str:
     """
-    Create a cryptographically secure refresh token.
+    Create a signed JWT refresh token belonging to a rotation family.
+    
+    Args:
+        user_id: The user's UUID
+        family_id: Rotation family (one per login)
+        jti: Unique id of this token; its successor records it as parent
+        expires_delta: Optional custom expiry time
     
     Returns:
-        Random token string
+        Encoded JWT token
     """
-    return secrets.token_urlsafe(64)
+    if expires_delta is None:
+        expires_delta = timedelta(days=settings.refresh_token_expire_days)
+    
+    to_encode = {
+        "sub": str(user_id),
+        "exp": datetime.now(timezone.utc) + expires_delta,
+        "type": "refresh",
+        "fam": str(family_id),
+        "jti": str(jti),
+    }
+    
+    return jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+
+
+def decode_refresh_token(token: str) -> Optional[dict]:
+    """
+    Validate a JWT refresh token's signature, expiry and type without a database call.
+    
+    Returns:
+        Token payload if valid, None otherwise
+    """
+    try:
+        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+    except JWTError:
+        return None
+    
+    if payload.get("type") != "refresh" or not payload.get("fam") or not payload.get("jti"):
+        return None
+    
+    return payload
+
+
+def _is_jwt(token: str) -> bool:
+    return token.count(".") == 2
 
 
 def hash_token(token: str) -> str:
@@ -75,71 +236,156 @@ def hash_token(token: str) -> str:
     return hashlib.sha256(token.encode()).hexdigest()
 
 
-async def store_refresh_token(
-    db: Client,
-    user_id: str,
-    token: str,
-    expires_delta: Optional[timedelta] = None
-) -> None:
+async def issue_refresh_token(db: Client, user_id: str) -> Tuple[str, str]:
     """
-    Store a refresh token in the database.
+    Start a new rotation family for a login and issue its first refresh token.
+    
+    Returns:
+        (refresh_token, family_id)
+    """
+    family_id = str(uuid4())
+    jti = str(uuid4())
+    expires_at = datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
+    token = create_refresh_token(user_id, family_id, jti)
+    
+    await execute(db.rpc("issue_refresh_token", {
+        "p_user_id": str(user_id),
+        "p_family_id": family_id,
+        "p_jti": jti,
+        "p_token_hash": hash_token(token),
+        "p_expires_at": expires_at.isoformat(),
+    }))
+    
+    return token, family_id
+
+
+async def rotate_refresh_token(db: Client, token: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Exchange a refresh token for its successor in the same family.
+    
+    The token is validated statelessly and the revocation filter is consulted
+    in memory, so the common path is a single write (the rotate RPC). Using a
+    token a second time revokes its whole family. Legacy opaque tokens are
+    verified against the table once and migrated to a new family.
     
     Args:
         db: Supabase client
-        user_id: The user's UUID
-        token: The refresh token to store
-        expires_delta: Optional custom expiry time
+        token: The refresh token presented by the client
+    
+    Returns:
+        (user_id, family_id, new_refresh_token), or None if the token is invalid
     """
-    if expires_delta is None:
-        expires_delta = timedelta(days=settings.refresh_token_expire_days)
+    if not _is_jwt(token):
+        user_id = await claim_legacy_refresh_token(db, token)
+        if not user_id:
+            return None
+        new_token, family_id = await issue_refresh_token(db, user_id)
+        return user_id, family_id, new_token
     
-    expires_at = datetime.now(timezone.utc) + expires_delta
-    token_hash = hash_token(token)
+    payload = decode_refresh_token(token)
+    if payload is None:
+        return None
+    
+    user_id = payload["sub"]
+    family_id = payload["fam"]
+    
+    if await revoked_families.is_revoked(db, family_id):
+        return None
+    
+    jti = str(uuid4())
+    expires_at = datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
+    new_token = create_refresh_token(user_id, family_id, jti)
+    
+    response = await execute(db.rpc("rotate_refresh_token", {
+        "p_user_id": user_id,
+        "p_family_id": family_id,
+        "p_parent_jti": payload["jti"],
+        "p_jti": jti,
+        "p_token_hash": hash_token(new_token),
+        "p_expires_at": expires_at.isoformat(),
+    }))
+    
+    if response.data != "ok":
+        # 'reused' means a replayed token: the RPC has revoked the family
+        revoked_families.add(family_id)
+        invalidate_cached_user(user_id)
+        return None
     
-    db.table("refresh_tokens").insert({
-        "user_id": str(user_id),
-        "token_hash": token_hash,
-        "expires_at": expires_at.isoformat(),
-        "revoked": False
-    }).execute()
+    return user_id, family_id, new_token
 
 
-async def verify_refresh_token(db: Client, token: str) -> Optional[str]:
+async def revoke_token_family(db: Client, family_id: str) -> bool:
+    """
+    Revoke every refresh token (and access token) issued in a family.
+    
+    Returns:
+        True if the family was active, False otherwise
     """
-    Verify a refresh token and return the associated user ID.
+    response = await execute(
+        db.table("refresh_token_families")
+        .update({"revoked_at": datetime.now(timezone.utc).isoformat()})
+        .eq("id", str(family_id)).is_("revoked_at", "null")
+    )
+    
+    revoked_families.add(family_id)
+    for row in response.data or []:
+        invalidate_cached_user(row["user_id"])
+    
+    return bool(response.data)
+
+
+async def claim_legacy_refresh_token(db: Client, token: str) -> Optional[str]:
+    """
+    Revoke a live legacy opaque refresh token and return its user ID.
+    
+    The check and the revocation are one conditional update, so of several
+    concurrent refreshes with the same token only one gets its user back.
     
     Args:
         db: Supabase client
-        token: The refresh token to verify
+        token: The refresh token to claim
     
     Returns:
-        User ID if valid, None otherwise
+        User ID if this call revoked a valid token, None otherwise
     """
-    token_hash = hash_token(token)
     now = datetime.now(timezone.utc).isoformat()
     
-    response = db.table("refresh_tokens").select("user_id").eq("token_hash", token_hash).eq("revoked", False).gte("expires_at", now).execute()
+    response = await execute(
+        db.table("refresh_tokens").update({"revoked": True})
+        .eq("token_hash", hash_token(token)).eq("revoked", False).gte("expires_at", now)
+    )
     
     if not response.data:
         return None
     
-    return response.data[0]["user_id"]
+    user_id = response.data[0]["user_id"]
+    invalidate_cached_user(user_id)
+    return user_id
 
 
 async def revoke_refresh_token(db: Client, token: str) -> bool:
     """
-    Revoke a refresh token.
+    Revoke a refresh token (for JWT tokens, its whole family).
     
     Args:
         db: Supabase client
         token: The refresh token to revoke
     
     Returns:
-        True if revoked, False if not found
+        True if revoked, False if not found or already revoked
     """
+    if _is_jwt(token):
+        payload = decode_refresh_token(token)
+        return await revoke_token_family(db, payload["fam"]) if payload else False
+    
     token_hash = hash_token(token)
     
-    response = db.table("refresh_tokens").update({"revoked": True}).eq("token_hash", token_hash).execute()
+    response = await execute(
+        db.table("refresh_tokens").update({"revoked": True}).eq("token_hash", token_hash).eq("revoked", False)
+    )
+    
+    for row in response.data or []:
+        invalidate_cached_user(row["user_id"])
     
     return len(response.data) > 0 if response.data else False
 
@@ -153,11 +399,26 @@ async def revoke_all_user_tokens(db: Client, user_id: str) -> int:
         user_id: The user's UUID
     
     Returns:
-        Number of tokens revoked
+        Number of token families (plus legacy tokens) revoked
     """
-    response = db.table("refresh_tokens").update({"revoked": True}).eq("user_id", str(user_id)).eq("revoked", False).execute()
+    families_response, legacy_response = await asyncio.gather(
+        execute(
+            db.table("refresh_token_families")
+            .update({"revoked_at": datetime.now(timezone.utc).isoformat()})
+            .eq("user_id", str(user_id)).is_("revoked_at", "null")
+        ),
+        execute(
+            db.table("refresh_tokens").update({"revoked": True})
+            .eq("user_id", str(user_id)).eq("revoked", False).is_("family_id", "null")
+        ),
+    )
     
-    return len(response.data) if response.data else 0
+    for row in families_response.data or []:
+        revoked_families.add(row["id"])
+    
+    invalidate_cached_user(user_id)
+    
+    return len(families_response.data or []) + len(legacy_response.data or [])
 
 
 def decode_access_token(token: str) -> Optional[dict]:
@@ -218,24 +479,48 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
     
-    # Fetch user from database
-    response = db.table("users").select("*").eq("id", user_id).single().execute()
+    # Signed-out sessions; a filter miss (the common case) needs no query
+    family_id = payload.get("fam")
+    if family_id and await revoked_families.is_revoked(db, family_id):
+        raise credentials_exception
+    
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return dict(cached)
     
-    if not response.data:
+    # A profile update, logout or rehash that lands while we load must not be overwritten
+    generation = user_cache.generation()
+    
+    async def load_user() -> Optional[dict]:
+        response = await execute(db.table("users").select("*").eq("id", user_id).single())
+        if response.data:
+            user_cache.set(user_id, response.data, generation=generation)
+        return response.data
+    
+    # Fetch user from database; concurrent requests from one user share the lookup
+    user = await singleflight.do(("user", user_id), load_user)
+    
+    if not user:
         raise credentials_exception
     
-    return response.data
+    return dict(user)
+
+
+def invalidate_cached_user(user_id) -> None:
+    """Drop a user from the authenticated user cache after it changes."""
+    user_cache.invalidate(str(user_id))
+    singleflight.forget(("user", str(user_id)))
 
 
 async def get_user_by_email(db: Client, email: str) -> Optional[dict]:
     """Get a user by email."""
-    response = db.table("users").select("*").eq("email", email).execute()
+    response = await execute(db.table("users").select("*").eq("email", email))
     return response.data[0] if response.data else None
 
 
 async def get_user_by_phone(db: Client, phone: str) -> Optional[dict]:
     """Get a user by phone number."""
-    response = db.table("users").select("*").eq("phone", phone).execute()
+    response = await execute(db.table("users").select("*").eq("phone", phone))
     return response.data[0] if response.data else None
 
 
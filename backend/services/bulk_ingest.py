@@ -0,0 +1,321 @@
+"""
+Bulk Ingestion Service
+Streams JSON / NDJSON / CSV uploads into a table in validated, batched inserts.
+
+NDJSON and CSV bodies are parsed as they arrive, so memory use is bounded
+by the insert chunk size and the longest line rather than the upload size.
+A JSON array body has to be read whole before it can be parsed. Bodies
+over `bulk_max_body_bytes` and lines (or CSV records) over
+`bulk_max_line_length` are rejected with 413; rows inserted before the
+limit was hit are kept.
+"""
+
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request, status
+from postgrest.exceptions import APIError
+from pydantic import BaseModel, ValidationError
+from supabase import Client
+
+from config import settings
+from services.supabase_client import execute
+
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+CSV_CONTENT_TYPES = {"text/csv", "application/csv"}
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=detail)
+
+
+async def _iter_body(request: Request) -> AsyncIterator[bytes]:
+    """Yield the raw body, rejecting it once it exceeds `bulk_max_body_bytes`."""
+    limit = settings.bulk_max_body_bytes
+    body_too_large = f"Request body exceeds {limit} bytes"
+
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise _too_large(body_too_large)
+
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise _too_large(body_too_large)
+        yield chunk
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    """Decode the request body incrementally and yield complete lines."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    limit = settings.bulk_max_line_length
+    # Pieces of the line still waiting for its newline; only new text is ever split
+    pending: List[str] = []
+    pending_length = 0
+
+    async for chunk in _iter_body(request):
+        *lines, rest = decoder.decode(chunk).split("\n")
+        for line in lines:
+            if pending:
+                line = "".join(pending) + line
+                pending, pending_length = [], 0
+            if len(line) > limit:
+                raise _too_large(f"Line exceeds {limit} characters")
+            yield line.rstrip("\r")
+
+        if rest:
+            pending.append(rest)
+            pending_length += len(rest)
+            if pending_length > limit:
+                raise _too_large(f"Line exceeds {limit} characters")
+
+    pending.append(decoder.decode(b"", final=True))
+    line = "".join(pending)
+    if len(line) > limit:
+        raise _too_large(f"Line exceeds {limit} characters")
+    if line:
+        yield line.rstrip("\r")
+
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[Tuple[Optional[dict], Optional[str]]]:
+    async for line in _iter_lines(request):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(record, dict):
+            yield record, None
+        else:
+            yield None, "Each line must be a JSON object"
+
+
+async def _iter_csv(
+    request: Request,
+    json_fields: Iterable[str]
+) -> AsyncIterator[Tuple[Optional[dict], Optional[str]]]:
+    header: Optional[List[str]] = None
+    record_lines: List[str] = []
+    record_length = 0
+    quotes = 0
+
+    async for line in _iter_lines(request):
+        # A quoted field may span lines; a record is complete once its quotes balance
+        record_lines.append(line)
+        record_length += len(line) + 1
+        quotes += line.count('"')
+        if record_length > settings.bulk_max_line_length:
+            raise _too_large(f"CSV record exceeds {settings.bulk_max_line_length} characters")
+        if quotes % 2:
+            continue
+        text = "\n".join(record_lines)
+        record_lines, record_length, quotes = [], 0, 0
+
+        if not text.strip():
+            continue
+
+        values = next(csv.reader(io.StringIO(text)))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        if len(values) != len(header):
+            yield None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+
+        record = {name: (value if value != "" else None) for name, value in zip(header, values)}
+        try:
+            for field in json_fields:
+                if record.get(field) is not None:
+                    record[field] = json.loads(record[field])
+        except ValueError as e:
+            yield None, f"Invalid JSON in column: {e}"
+            continue
+
+        yield record, None
+
+    if record_lines:
+        yield None, "Unterminated quoted field"
+
+
+async def _iter_json_array(request: Request) -> AsyncIterator[Tuple[Optional[dict], Optional[str]]]:
+    body = bytearray()
+    async for chunk in _iter_body(request):
+        body += chunk
+
+    try:
+        records = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Request body is not valid JSON")
+
+    if not isinstance(records, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Request body must be a JSON array")
+
+    for record in records:
+        if isinstance(record, dict):
+            yield record, None
+        else:
+            yield None, "Each item must be a JSON object"
+
+
+def iter_records(
+    request: Request,
+    json_fields: Iterable[str] = ()
+) -> AsyncIterator[Tuple[Optional[dict], Optional[str]]]:
+    """
+    Parse an upload into (record, error) pairs according to its Content-Type.
+
+    Raises:
+        HTTPException: 415 for unsupported content types; 413 (while iterating)
+            for bodies, lines or CSV records over the configured limits
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_CONTENT_TYPES:
+        return _iter_ndjson(request)
+    if content_type in CSV_CONTENT_TYPES:
+        return _iter_csv(request, json_fields)
+    if content_type in ("application/json", ""):
+        return _iter_json_array(request)
+
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Use application/json, application/x-ndjson or text/csv"
+    )
+
+
+def _format_validation_error(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    ]
+
+
+class BulkIngestor:
+    """Validates records with a Create model and inserts them in chunks."""
+
+    def __init__(self, db: Client, table: str, model: Type[BaseModel], return_rows: bool = False):
+        self.db = db
+        self.table = table
+        self.model = model
+        self.return_rows = return_rows
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self.errors_truncated = False
+        self.inserted_rows: List[dict] = []
+        self._chunk: List[Tuple[int, dict]] = []
+
+    def _record_error(self, row: int, messages: List[str]) -> None:
+        self.failed += 1
+        if len(self.errors) < settings.bulk_max_reported_errors:
+            self.errors.append({"row": row, "errors": messages})
+        else:
+            self.errors_truncated = True
+
+    async def _insert(self, rows: List[dict]) -> List[dict]:
+        returning = "representation" if self.return_rows else "minimal"
+        response = await execute(self.db.table(self.table).insert(rows, returning=returning))
+        return response.data or []
+
+    async def _flush(self) -> None:
+        chunk, self._chunk = self._chunk, []
+        if not chunk:
+            return
+
+        try:
+            inserted = await self._insert([data for _, data in chunk])
+            self.inserted += len(chunk)
+            if self.return_rows:
+                self.inserted_rows.extend(inserted)
+            return
+        except APIError:
+            pass
+
+        # One bad row fails the whole statement; retry row by row to pinpoint it
+        for row, data in chunk:
+            try:
+                inserted = await self._insert([data])
+                self.inserted += 1
+                if self.return_rows:
+                    self.inserted_rows.extend(inserted)
+            except APIError as e:
+                self._record_error(row, [e.message or "Insert failed"])
+
+    async def add(self, record: Optional[dict], parse_error: Optional[str] = None) -> None:
+        """Validate one parsed record and queue it for insertion."""
+        self.received += 1
+        row = self.received
+
+        if parse_error is not None:
+            self._record_error(row, [parse_error])
+            return
+
+        try:
+            item = self.model.model_validate(record)
+        except ValidationError as e:
+            self._record_error(row, _format_validation_error(e))
+            return
+
+        self._chunk.append((row, item.model_dump(mode="json")))
+        if len(self._chunk) >= settings.bulk_insert_chunk_size:
+            await self._flush()
+
+    async def finish(self) -> dict:
+        """Insert any remaining rows and return the ingestion summary."""
+        await self._flush()
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+async def ingest(
+    request: Request,
+    db: Client,
+    table: str,
+    model: Type[BaseModel],
+    json_fields: Iterable[str] = (),
+    on_inserted=None
+) -> dict:
+    """
+    Stream an upload into a table.
+
+    Args:
+        request: Incoming request whose body holds the records
+        db: Supabase client
+        table: Target table
+        model: Pydantic *Create model used to validate each record
+        json_fields: CSV columns holding JSON values (e.g. `stats`)
+        on_inserted: Optional callback receiving each inserted row
+
+    Returns:
+        Ingestion summary with per-row errors (1-based row numbers)
+    """
+    ingestor = BulkIngestor(db, table, model, return_rows=on_inserted is not None)
+
+    async for record, parse_error in iter_records(request, json_fields):
+        await ingestor.add(record, parse_error)
+        if on_inserted is not None and ingestor.inserted_rows:
+            for row in ingestor.inserted_rows:
+                on_inserted(row)
+            ingestor.inserted_rows.clear()
+
+    summary = await ingestor.finish()
+
+    if on_inserted is not None:
+        for row in ingestor.inserted_rows:
+            on_inserted(row)
+        ingestor.inserted_rows.clear()
+
+    return summary
@@ -0,0 +1,104 @@
+"""
+In-Process Cache
+Small TTL + LRU cache used for hot lookups that tolerate brief staleness.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Least-recently-used cache whose entries also expire after a fixed TTL.
+
+    Not thread-safe; it is meant to be used from the event loop only.
+
+    A loader that may race with invalidate() takes generation() before it
+    reads and passes it to set(), which then drops the value if the key
+    was invalidated in the meantime.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0
+        # key -> generation of its last invalidation, oldest first (bounded by maxsize)
+        self._invalidated: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._forgotten_generation = 0  # newest generation dropped from _invalidated
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if absent or expired."""
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return a live value without touching LRU order or counters."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def generation(self) -> int:
+        """Current invalidation generation, to pass to set() after a load."""
+        return self._generation
+
+    def _invalidated_since(self, key: Hashable, generation: int) -> bool:
+        # Invalidations we no longer track individually count against every key
+        return max(self._forgotten_generation, self._invalidated.get(key, 0)) > generation
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        With `generation` (from generation() before loading), the value is
+        dropped if `key` was invalidated since.
+        """
+        if self.maxsize <= 0:
+            return
+        if generation is not None and self._invalidated_since(key, generation):
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry; loads already in flight for it will not be stored."""
+        self._entries.pop(key, None)
+        self._generation += 1
+        self._invalidated[key] = self._generation
+        self._invalidated.move_to_end(key)
+        while len(self._invalidated) > max(self.maxsize, 1):
+            _, generation = self._invalidated.popitem(last=False)
+            self._forgotten_generation = max(self._forgotten_generation, generation)
+
+    def clear(self) -> None:
+        """Drop every entry; loads already in flight will not be stored."""
+        self._entries.clear()
+        self._generation += 1
+        self._invalidated.clear()
+        self._forgotten_generation = self._generation
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
@@ -0,0 +1,129 @@
+"""
+Catalog Cache
+Read-through cache for near-static catalog endpoints with strong ETags.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from fastapi import Request, Response
+
+from config import settings
+from services.cache import TTLCache
+from services.singleflight import singleflight
+from services.metrics import register_collector
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """A cached payload together with its precomputed ETag."""
+    payload: Any
+    etag: str
+    bodies: Dict[type, bytes] = field(default_factory=dict, compare=False, repr=False)  # trusted_response()
+
+
+def make_entry(payload: Any) -> CatalogEntry:
+    """Build a cache entry, deriving a strong ETag from the payload content."""
+    body = json.dumps(
+        payload,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    ).encode()
+    return CatalogEntry(payload=payload, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+class CatalogCache:
+    """
+    Namespaced read-through cache.
+
+    Each namespace (e.g. "levels") is invalidated as a whole by the write
+    endpoint that changes it. The TTL only bounds staleness across workers.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._namespaces: Dict[str, TTLCache] = {}
+        self._generations: Dict[str, int] = {}
+
+    def _namespace(self, namespace: str) -> TTLCache:
+        if namespace not in self._namespaces:
+            self._namespaces[namespace] = TTLCache(self.maxsize, self.ttl_seconds)
+        return self._namespaces[namespace]
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]]
+    ) -> CatalogEntry:
+        """
+        Return the cached entry for a key, loading it on a miss.
+
+        Concurrent misses for the same key share a single load. A load that
+        races with an invalidation is returned but not stored, and callers
+        arriving after the invalidation start a fresh one.
+        """
+        cache = self._namespace(namespace)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+
+        generation = self._generations.get(namespace, 0)
+
+        async def load() -> CatalogEntry:
+            entry = make_entry(await loader())
+            if self._generations.get(namespace, 0) == generation:
+                cache.set(key, entry)
+            return entry
+
+        return await singleflight.do(("catalog", namespace, generation, key), load)
+
+    def invalidate(self, namespace: str) -> None:
+        """Drop every entry in a namespace."""
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        self._namespace(namespace).clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters per namespace."""
+        return {name: cache.stats() for name, cache in self._namespaces.items()}
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison as required for If-None-Match (RFC 9110)."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def conditional_response(request: Request, response: Response, entry: CatalogEntry) -> Any:
+    """
+    Serve a catalog entry, answering 304 when the client already has it.
+
+    Returns:
+        A bodiless 304 Response, or the payload with ETag headers set
+    """
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": settings.catalog_cache_control,
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return entry.payload
+
+
+# Global catalog cache instance
+catalog_cache = CatalogCache(
+    maxsize=settings.catalog_cache_size,
+    ttl_seconds=settings.catalog_cache_ttl_seconds,
+)
+register_collector("catalog_cache", catalog_cache.stats, label="namespace")
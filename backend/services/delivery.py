@@ -0,0 +1,310 @@
+"""
+Delivery Queue
+Sends verification codes (email / SMS) off the request path.
+
+Endpoints enqueue a message and return immediately. A background worker
+drains the queue in small batches (one SMTP session per batch), retries
+failures with exponential backoff and moves messages that keep failing
+to a dead-letter store.
+"""
+
+import asyncio
+import logging
+import random
+import smtplib
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from typing import Deque, Dict, List, Optional, Protocol
+
+from config import settings
+from services.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboundMessage:
+    """A message waiting for delivery."""
+    channel: str  # "email" or "sms"
+    target: str
+    subject: str
+    body: str
+    attempts: int = 0
+    last_error: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class Sender(Protocol):
+    async def send_batch(self, messages: List[OutboundMessage]) -> List[Optional[str]]:
+        """Deliver messages; returns an error string (or None on success) per message."""
+        ...
+
+
+class ConsoleSender:
+    """Development sender that prints messages to stdout."""
+
+    async def send_batch(self, messages: List[OutboundMessage]) -> List[Optional[str]]:
+        for message in messages:
+            print("\n" + "=" * 50)
+            print(f"📧 发送至 ({message.channel}): {message.target}")
+            print(f"📝 {message.subject}")
+            print(message.body)
+            print("=" * 50 + "\n")
+        return [None] * len(messages)
+
+
+class SmtpSender:
+    """Sends email over SMTP, reusing one connection per batch."""
+
+    def _send_sync(self, messages: List[OutboundMessage]) -> List[Optional[str]]:
+        errors: List[Optional[str]] = []
+        with smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout_seconds) as smtp:
+            if settings.smtp_starttls:
+                smtp.starttls()
+            if settings.smtp_username:
+                smtp.login(settings.smtp_username, settings.smtp_password)
+
+            for message in messages:
+                email = EmailMessage()
+                email["From"] = settings.smtp_from
+                email["To"] = message.target
+                email["Subject"] = message.subject
+                email.set_content(message.body)
+                try:
+                    smtp.send_message(email)
+                    errors.append(None)
+                except smtplib.SMTPException as e:
+                    errors.append(repr(e))
+
+        return errors
+
+    async def send_batch(self, messages: List[OutboundMessage]) -> List[Optional[str]]:
+        try:
+            return await asyncio.to_thread(self._send_sync, messages)
+        except (OSError, smtplib.SMTPException) as e:
+            # Connection-level failure: every message in the batch is retried
+            return [repr(e)] * len(messages)
+
+
+class FakeSmsSender:
+    """
+    Local stand-in for an SMS gateway.
+
+    Records sent messages and can simulate gateway latency and failures,
+    so retries and dead-lettering can be exercised without a provider.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0, failure_rate: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.failure_rate = failure_rate
+        self.sent: Deque[OutboundMessage] = deque(maxlen=1000)
+
+    async def send_batch(self, messages: List[OutboundMessage]) -> List[Optional[str]]:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+        errors: List[Optional[str]] = []
+        for message in messages:
+            if random.random() < self.failure_rate:
+                errors.append("Simulated gateway failure")
+            else:
+                self.sent.append(message)
+                print(f"📱 [fake sms] {message.target}: {message.body}")
+                errors.append(None)
+        return errors
+
+
+def create_sender(name: str) -> Sender:
+    """Sender by name: "console", "smtp" or "fake_sms"."""
+    if name == "smtp":
+        return SmtpSender()
+    if name == "fake_sms":
+        return FakeSmsSender(
+            latency_seconds=settings.fake_sms_latency_seconds,
+            failure_rate=settings.fake_sms_failure_rate,
+        )
+    return ConsoleSender()
+
+
+class DeliveryQueue:
+    """Bounded in-process queue with batching, retries and a dead-letter store."""
+
+    def __init__(self, senders: Dict[str, Sender]):
+        self.senders = senders
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._retries: Dict[asyncio.Task, OutboundMessage] = {}  # backoff timers, by the message they requeue
+        self._stopping = False  # failures dead-letter instead of retrying while stop() drains
+        self.dead_letters: Deque[OutboundMessage] = deque(maxlen=settings.delivery_dead_letter_size)
+        self.enqueued = 0
+        self.sent = 0
+        self.retried = 0
+        self.dead_lettered = 0
+
+    def start(self) -> None:
+        """Start the background worker."""
+        self._queue = asyncio.Queue(maxsize=settings.delivery_queue_size)
+        self._stopping = False
+        self._worker = asyncio.create_task(self._run(), name="delivery-queue")
+
+    async def stop(self) -> None:
+        """
+        Deliver what is already queued (bounded by a timeout), then stop.
+
+        Messages still waiting for a retry, failing during the drain, or
+        left in the queue when the timeout expires, are dead-lettered rather
+        than dropped.
+        """
+        if self._worker is None:
+            return
+
+        self._stopping = True
+        for task, message in list(self._retries.items()):
+            # False when the timer already fired and requeued the message
+            if task.cancel():
+                self._dead_letter(message, f"Delivery queue stopped before retry ({message.last_error})")
+        self._retries.clear()
+
+        try:
+            await asyncio.wait_for(self._queue.join(), settings.delivery_shutdown_timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.warning("Delivery queue stopped with %d messages undelivered", self._queue.qsize())
+
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+        while not self._queue.empty():
+            self._dead_letter(self._queue.get_nowait(), "Delivery queue stopped before delivery")
+
+    def enqueue(self, message: OutboundMessage) -> bool:
+        """
+        Queue a message without waiting.
+
+        Returns:
+            False if the queue is full or not running (the message is dead-lettered)
+        """
+        if self._queue is None:
+            self._dead_letter(message, "Delivery queue is not running")
+            return False
+
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self._dead_letter(message, "Delivery queue is full")
+            return False
+
+        self.enqueued += 1
+        return True
+
+    async def _next_batch(self) -> List[OutboundMessage]:
+        """Wait for one message, then gather more for up to the batch window."""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + settings.delivery_batch_window_ms / 1000
+
+        while len(batch) < settings.delivery_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                by_channel: Dict[str, List[OutboundMessage]] = {}
+                for message in batch:
+                    by_channel.setdefault(message.channel, []).append(message)
+
+                for channel, messages in by_channel.items():
+                    await self._deliver(channel, messages)
+            except Exception:
+                logger.exception("Delivery worker failed on a batch")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _deliver(self, channel: str, messages: List[OutboundMessage]) -> None:
+        sender = self.senders.get(channel)
+        if sender is None:
+            for message in messages:
+                self._dead_letter(message, f"No sender for channel {channel!r}")
+            return
+
+        try:
+            errors = await sender.send_batch(messages)
+        except Exception as e:
+            errors = [repr(e)] * len(messages)
+
+        if len(errors) != len(messages):
+            # Without a result a message may or may not have gone out; retrying is the safe side
+            logger.error("%s sender returned %d results for %d messages", channel, len(errors), len(messages))
+            errors = list(errors[:len(messages)]) + ["Sender returned no result"] * (len(messages) - len(errors))
+
+        for message, error in zip(messages, errors):
+            message.attempts += 1
+            if error is None:
+                self.sent += 1
+            elif message.attempts >= settings.delivery_max_attempts:
+                self._dead_letter(message, error)
+            else:
+                message.last_error = error
+                self._schedule_retry(message)
+
+    def _schedule_retry(self, message: OutboundMessage) -> None:
+        if self._stopping:
+            # A backoff timer started during shutdown would be cancelled with the loop
+            self._dead_letter(message, f"Delivery queue stopped before retry ({message.last_error})")
+            return
+
+        # Exponential backoff with jitter: base * 2^(attempt-1), +/- 20%
+        delay = settings.delivery_retry_base_seconds * 2 ** (message.attempts - 1)
+        delay *= random.uniform(0.8, 1.2)
+        self.retried += 1
+
+        async def retry():
+            await asyncio.sleep(delay)
+            try:
+                self._queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._dead_letter(message, "Delivery queue is full")
+
+        task = asyncio.create_task(retry())
+        self._retries[task] = message
+        task.add_done_callback(lambda done: self._retries.pop(done, None))
+
+    def _dead_letter(self, message: OutboundMessage, error: str) -> None:
+        message.last_error = error
+        self.dead_letters.append(message)
+        self.dead_lettered += 1
+        logger.error(
+            "Giving up on %s delivery to %s after %d attempts: %s",
+            message.channel, message.target, message.attempts, error
+        )
+
+    def stats(self) -> dict:
+        """Queue depth and delivery counters."""
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "retrying": len(self._retries),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+        }
+
+
+# Global delivery queue instance
+delivery_queue = DeliveryQueue({
+    "email": create_sender(settings.delivery_email_sender),
+    "sms": create_sender(settings.delivery_sms_sender),
+})
+register_collector("delivery", delivery_queue.stats)
@@ -0,0 +1,84 @@
+"""
+Export Service
+Streams a user's learning history (mistakes, level progress) as NDJSON or CSV.
+
+Tables are walked page by page with keyset cursors and every page is
+written out before the next one is fetched, so memory stays constant
+however many rows a user has.
+"""
+
+import csv
+import io
+import json
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from supabase import Client
+
+from config import settings
+from services.supabase_client import execute
+from services.pagination import apply_cursor, encode_cursor
+
+# Exportable resources: (table, sort column, NDJSON record type, CSV columns)
+EXPORT_RESOURCES: Dict[str, Tuple[str, str, str, List[str]]] = {
+    "mistakes": (
+        "mistakes", "added_at", "mistake",
+        ["id", "user_id", "title", "question", "category", "mastery_level", "image_url", "added_at"],
+    ),
+    "level_progress": (
+        "user_level_progress", "id", "level_progress",
+        ["id", "user_id", "level_id", "status", "score", "stars", "completion_percentage", "completed_at"],
+    ),
+}
+
+
+async def iter_user_pages(db: Client, resource: str, user_id: str) -> AsyncIterator[List[dict]]:
+    """Yield the rows of a resource belonging to a user a page at a time, oldest first."""
+    table, column, _, _ = EXPORT_RESOURCES[resource]
+    page_size = settings.export_page_size
+    cursor: Optional[str] = None
+
+    while True:
+        query = db.table(table).select("*").eq("user_id", user_id)
+        if column == "id":
+            if cursor:
+                query = query.gt("id", cursor)
+            query = query.order("id")
+        else:
+            query = apply_cursor(query, cursor, column)
+
+        response = await execute(query.limit(page_size))
+        rows = response.data or []
+        if rows:
+            yield rows
+
+        if len(rows) < page_size:
+            return
+        cursor = rows[-1]["id"] if column == "id" else encode_cursor(rows[-1], (column, "id"))
+
+
+async def stream_ndjson(db: Client, user_id: str, resources: Iterable[str]) -> AsyncIterator[bytes]:
+    """One `{"type": ..., "data": {...}}` line per row, resource by resource."""
+    for resource in resources:
+        record_type = EXPORT_RESOURCES[resource][2]
+        async for rows in iter_user_pages(db, resource, user_id):
+            yield "".join(
+                json.dumps({"type": record_type, "data": row}, ensure_ascii=False, default=str) + "\n"
+                for row in rows
+            ).encode()
+
+
+async def stream_csv(db: Client, user_id: str, resource: str) -> AsyncIterator[bytes]:
+    """A header line followed by one CSV line per row."""
+    columns = EXPORT_RESOURCES[resource][3]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+
+    # BOM so spreadsheet applications open Chinese text as UTF-8
+    writer.writeheader()
+    yield ("\ufeff" + buffer.getvalue()).encode()
+
+    async for rows in iter_user_pages(db, resource, user_id):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
@@ -0,0 +1,127 @@
+"""
+Geo Clusters
+Per-tile cluster aggregates for rendering geographic features at low zoom.
+
+A tile at zoom z is divided into the 2^p x 2^p sub-tiles of zoom z + p
+(p = GEO_CLUSTER_PRECISION), and features are aggregated per sub-tile.
+A tile response therefore never exceeds 4^p clusters, however large the
+catalog grows.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+from services.cache import TTLCache
+from services.geo_index import MAX_MERCATOR_LAT, tile_for_point
+from services.metrics import register_collector
+
+# (cell_x, cell_y) -> [count, lat_sum, lon_sum, {feature_type: count}]
+TileCells = Dict[Tuple[int, int], list]
+
+
+def aggregate_rows(rows: Iterable[dict], level: int) -> TileCells:
+    """Aggregate feature rows into cells of the given zoom level."""
+    cells: TileCells = {}
+    for row in rows:
+        add_to_cells(cells, row, level)
+    return cells
+
+
+def add_to_cells(cells: TileCells, row: dict, level: int) -> None:
+    """Add one feature row to a tile's cell aggregates."""
+    if row.get("latitude") is None or row.get("longitude") is None:
+        return
+
+    lat, lon = float(row["latitude"]), float(row["longitude"])
+    if abs(lat) > MAX_MERCATOR_LAT:
+        return  # outside every Web Mercator tile
+
+    cell = cells.setdefault(tile_for_point(lat, lon, level), [0, 0.0, 0.0, {}])
+    cell[0] += 1
+    cell[1] += lat
+    cell[2] += lon
+    feature_type = row.get("feature_type") or ""
+    cell[3][feature_type] = cell[3].get(feature_type, 0) + 1
+
+
+def cells_from_rpc(rows: Iterable[dict]) -> TileCells:
+    """Convert geo_feature_clusters() rows into tile cells."""
+    return {
+        (row["cell_x"], row["cell_y"]): [
+            row["count"], row["lat_sum"], row["lon_sum"], dict(row["type_counts"] or {})
+        ]
+        for row in rows
+    }
+
+
+def render_clusters(cells: TileCells) -> List[dict]:
+    """Turn cell aggregates into the cluster payload."""
+    clusters = []
+    for count, lat_sum, lon_sum, type_counts in cells.values():
+        dominant = max(type_counts.items(), key=lambda item: item[1])[0] if type_counts else ""
+        clusters.append({
+            "count": count,
+            "latitude": lat_sum / count,
+            "longitude": lon_sum / count,
+            "feature_type": dominant or None,
+            "feature_type_counts": {name: n for name, n in type_counts.items() if name},
+        })
+    clusters.sort(key=lambda cluster: cluster["count"], reverse=True)
+    return clusters
+
+
+class ClusterTileCache:
+    """
+    Cached cell aggregates per tile.
+
+    New features are folded into every cached tile that contains them,
+    so inserts never force a tile to be recomputed. A tile being computed
+    while a feature lands in it is not stored (see generation()), so the
+    insert is not lost from it. Inserts made by other workers only show
+    up once a tile expires, i.e. within `geo_cluster_cache_ttl_seconds`.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self._tiles = TTLCache(maxsize, ttl_seconds)
+
+    def get(self, z: int, x: int, y: int):
+        return self._tiles.get((z, x, y))
+
+    def generation(self) -> int:
+        """Take before computing a tile; pass to set() to drop it if a feature landed meanwhile."""
+        return self._tiles.generation()
+
+    def set(self, z: int, x: int, y: int, cells: TileCells, generation: Optional[int] = None) -> None:
+        self._tiles.set((z, x, y), cells, generation=generation)
+
+    def add_feature(self, row: dict) -> None:
+        """Fold a newly created feature into every cached tile containing it."""
+        if row.get("latitude") is None or row.get("longitude") is None:
+            return
+
+        lat, lon = float(row["latitude"]), float(row["longitude"])
+        if abs(lat) > MAX_MERCATOR_LAT:
+            return
+
+        for z in range(settings.geo_cluster_max_zoom + 1):
+            x, y = tile_for_point(lat, lon, z)
+            cells = self._tiles.peek((z, x, y))
+            if cells is not None:
+                add_to_cells(cells, row, z + settings.geo_cluster_precision)
+            else:
+                # Not cached, but it may be being computed from rows read before this insert
+                self._tiles.invalidate((z, x, y))
+
+    def clear(self) -> None:
+        self._tiles.clear()
+
+    def stats(self) -> dict:
+        return self._tiles.stats()
+
+
+# Global cluster tile cache instance
+cluster_cache = ClusterTileCache(
+    maxsize=settings.geo_cluster_cache_size,
+    ttl_seconds=settings.geo_cluster_cache_ttl_seconds,
+)
+register_collector("cluster_cache", cluster_cache.stats)
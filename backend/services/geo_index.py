@@ -0,0 +1,182 @@
+"""
+Geo Index
+Tile math and an in-process grid index for geographic feature lookups.
+
+The grid index mirrors the PostGIS queries in schema.sql so bbox, radius
+and tile endpoints also work against a local dataset (tests, benchmarks).
+"""
+
+import heapq
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_M = 6_371_008.8
+METERS_PER_DEGREE_LAT = 111_320.0
+MAX_TILE_ZOOM = 22
+MAX_MERCATOR_LAT = 85.05112878
+
+BBox = Tuple[float, float, float, float]  # (min_lon, min_lat, max_lon, max_lat)
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def tile_bbox(z: int, x: int, y: int) -> BBox:
+    """
+    Bounding box of a Web Mercator (XYZ) tile.
+
+    Raises:
+        ValueError: If the tile coordinates are out of range
+    """
+    if not 0 <= z <= MAX_TILE_ZOOM:
+        raise ValueError(f"Zoom must be between 0 and {MAX_TILE_ZOOM}")
+
+    n = 2 ** z
+    if not (0 <= x < n and 0 <= y < n):
+        raise ValueError(f"Tile x/y must be between 0 and {n - 1} at zoom {z}")
+
+    def tile_lat(tile_y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return (x / n * 360.0 - 180.0, tile_lat(y + 1), (x + 1) / n * 360.0 - 180.0, tile_lat(y))
+
+
+def tile_for_point(lat: float, lon: float, z: int) -> Tuple[int, int]:
+    """XYZ tile containing a point; latitudes are clamped to the Mercator range."""
+    n = 2 ** z
+    lat_rad = math.radians(max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat)))
+    x = int(math.floor((lon + 180.0) / 360.0 * n))
+    y = int(math.floor((1 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2 * n))
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def split_antimeridian(bbox: BBox) -> List[BBox]:
+    """Split a box whose min_lon > max_lon (crossing 180°) into two boxes."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if min_lon <= max_lon:
+        return [bbox]
+    return [(min_lon, min_lat, 180.0, max_lat), (-180.0, min_lat, max_lon, max_lat)]
+
+
+def radius_bbox(lat: float, lon: float, radius_m: float) -> List[BBox]:
+    """Boxes that fully contain a circle, already split at the antimeridian."""
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if min_lat <= -90.0 or max_lat >= 90.0 or cos_lat <= 1e-9:
+        return [(-180.0, min_lat, 180.0, max_lat)]
+
+    dlon = radius_m / (METERS_PER_DEGREE_LAT * cos_lat)
+    if dlon >= 180.0:
+        return [(-180.0, min_lat, 180.0, max_lat)]
+
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180.0:
+        min_lon += 360.0
+    if max_lon > 180.0:
+        max_lon -= 360.0
+
+    return split_antimeridian((min_lon, min_lat, max_lon, max_lat))
+
+
+class GridIndex:
+    """
+    Uniform lat/lon grid of feature rows.
+
+    Rows are plain dicts as returned by PostgREST; rows without coordinates
+    are ignored.
+    """
+
+    def __init__(self, cell_degrees: float = 1.0):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], Dict[str, dict]] = defaultdict(dict)
+        self._row_cells: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._row_cells)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (
+            int(math.floor((lon + 180.0) / self.cell_degrees)),
+            int(math.floor((lat + 90.0) / self.cell_degrees)),
+        )
+
+    def insert(self, row: dict) -> None:
+        """Add or replace a row."""
+        row_id = str(row["id"])
+        self.remove(row_id)
+
+        if row.get("latitude") is None or row.get("longitude") is None:
+            return
+
+        cell = self._cell(float(row["latitude"]), float(row["longitude"]))
+        self._cells[cell][row_id] = row
+        self._row_cells[row_id] = cell
+
+    def remove(self, row_id: str) -> None:
+        """Remove a row if present."""
+        cell = self._row_cells.pop(row_id, None)
+        if cell is not None:
+            self._cells[cell].pop(row_id, None)
+            if not self._cells[cell]:
+                del self._cells[cell]
+
+    def clear(self) -> None:
+        """Remove every row."""
+        self._cells.clear()
+        self._row_cells.clear()
+
+    def _scan(self, bbox: BBox) -> Iterable[dict]:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        min_cx, min_cy = self._cell(min_lat, min_lon)
+        max_cx, max_cy = self._cell(max_lat, max_lon)
+
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                for row in self._cells.get((cx, cy), {}).values():
+                    lat, lon = float(row["latitude"]), float(row["longitude"])
+                    if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                        yield row
+
+    def bbox(
+        self,
+        bbox: BBox,
+        feature_type: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[dict]:
+        """Rows inside a box; boxes crossing the antimeridian are supported."""
+        result = []
+        for part in split_antimeridian(bbox):
+            for row in self._scan(part):
+                if feature_type and row.get("feature_type") != feature_type:
+                    continue
+                result.append(row)
+                if limit is not None and len(result) >= limit:
+                    return result
+        return result
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: float,
+        limit: int,
+        feature_type: Optional[str] = None
+    ) -> List[Tuple[float, dict]]:
+        """Up to `limit` rows within `radius_m`, nearest first, as (distance_m, row)."""
+        candidates = []
+        for part in radius_bbox(lat, lon, radius_m):
+            for row in self.bbox(part, feature_type=feature_type):
+                distance = haversine_m(lat, lon, float(row["latitude"]), float(row["longitude"]))
+                if distance <= radius_m:
+                    candidates.append((distance, row))
+
+        return heapq.nsmallest(limit, candidates, key=lambda item: item[0])
@@ -0,0 +1,193 @@
+"""
+Geo Service
+Spatial lookups for geographic features.
+
+Queries go to the PostGIS / full-text functions in schema.sql by default.
+With GEO_INDEX_BACKEND=memory (spatial) or GEO_SEARCH_BACKEND=memory
+(search) they are answered from in-process indexes loaded from the table
+on first use.
+"""
+
+import asyncio
+from typing import List, Optional
+
+from supabase import Client
+
+from config import settings
+from services.supabase_client import execute
+from services.geo_index import BBox, GridIndex, split_antimeridian, tile_bbox
+from services.geo_clusters import aggregate_rows, cells_from_rpc, cluster_cache, render_clusters
+from services.search_index import SearchIndex
+
+# Columns returned to clients; excludes derived columns such as `location`
+GEO_FEATURE_COLUMNS = "id,name,description,feature_type,latitude,longitude,region,image_url,stats,created_at"
+
+_memory_index = GridIndex(cell_degrees=settings.geo_index_cell_degrees)
+_search_index = SearchIndex()
+_memory_indexes_loaded = False
+_memory_indexes_lock = asyncio.Lock()
+
+
+def use_memory_index() -> bool:
+    """Whether spatial queries are served by the in-process index."""
+    return settings.geo_index_backend == "memory"
+
+
+def use_memory_search() -> bool:
+    """Whether searches are served by the in-process index."""
+    return settings.geo_search_backend == "memory"
+
+
+async def _ensure_memory_indexes(db: Client) -> None:
+    """Load every feature into the in-process indexes once."""
+    global _memory_indexes_loaded
+
+    if _memory_indexes_loaded:
+        return
+
+    async with _memory_indexes_lock:
+        if not _memory_indexes_loaded:
+            offset = 0
+            page_size = settings.geo_index_load_page_size
+            while True:
+                response = await execute(
+                    db.table("geographic_features").select(GEO_FEATURE_COLUMNS)
+                    .order("id").range(offset, offset + page_size - 1)
+                )
+                rows = response.data or []
+                for row in rows:
+                    _memory_index.insert(row)
+                    _search_index.add(row)
+                if len(rows) < page_size:
+                    break
+                offset += page_size
+            _memory_indexes_loaded = True
+
+
+def index_feature(row: dict) -> None:
+    """Keep the in-process indexes and cluster tiles in sync after a feature is created."""
+    if _memory_indexes_loaded:
+        _memory_index.insert(row)
+        _search_index.add(row)
+    cluster_cache.add_feature(row)
+
+
+async def features_in_bbox(
+    db: Client,
+    bbox: BBox,
+    feature_type: Optional[str] = None,
+    limit: int = 500
+) -> List[dict]:
+    """Features inside a lon/lat box; min_lon > max_lon crosses the antimeridian."""
+    if use_memory_index():
+        await _ensure_memory_indexes(db)
+        return _memory_index.bbox(bbox, feature_type=feature_type, limit=limit)
+
+    result = []
+    for min_lon, min_lat, max_lon, max_lat in split_antimeridian(bbox):
+        response = await execute(db.rpc("geo_features_in_bbox", {
+            "p_min_lon": min_lon,
+            "p_min_lat": min_lat,
+            "p_max_lon": max_lon,
+            "p_max_lat": max_lat,
+            "p_feature_type": feature_type,
+            "p_limit": limit - len(result),
+        }))
+        result.extend(response.data or [])
+        if len(result) >= limit:
+            break
+
+    return result
+
+
+async def features_nearby(
+    db: Client,
+    lat: float,
+    lon: float,
+    radius_m: float,
+    feature_type: Optional[str] = None,
+    limit: int = 20
+) -> List[dict]:
+    """Up to `limit` features within `radius_m` meters, nearest first, with distance_m."""
+    if use_memory_index():
+        await _ensure_memory_indexes(db)
+        return [
+            {**row, "distance_m": distance}
+            for distance, row in _memory_index.nearest(lat, lon, radius_m, limit, feature_type=feature_type)
+        ]
+
+    response = await execute(db.rpc("geo_features_nearby", {
+        "p_lat": lat,
+        "p_lon": lon,
+        "p_radius_m": radius_m,
+        "p_feature_type": feature_type,
+        "p_limit": limit,
+    }))
+
+    return response.data or []
+
+
+async def search_features(db: Client, query: str, limit: int = 10) -> List[dict]:
+    """Features matching a free-text query, best match first."""
+    if use_memory_search():
+        await _ensure_memory_indexes(db)
+        return [row for _, row in _search_index.search(query, limit)]
+
+    response = await execute(db.rpc("search_geo_features", {
+        "p_query": query,
+        "p_limit": limit,
+    }))
+
+    return response.data or []
+
+
+async def feature_clusters(db: Client, z: int, x: int, y: int) -> dict:
+    """
+    Cluster the features of an XYZ tile into at most 4^precision cells.
+
+    Raises:
+        ValueError: If the tile is out of range or above the cluster zoom limit
+    """
+    if z > settings.geo_cluster_max_zoom:
+        raise ValueError(
+            f"Clusters are available up to zoom {settings.geo_cluster_max_zoom}; "
+            "use the tiles endpoint for individual features"
+        )
+
+    bbox = tile_bbox(z, x, y)
+    level = z + settings.geo_cluster_precision
+
+    cells = cluster_cache.get(z, x, y)
+    if cells is None:
+        generation = cluster_cache.generation()
+        if use_memory_index():
+            await _ensure_memory_indexes(db)
+            cells = aggregate_rows(_memory_index.bbox(bbox), level)
+        else:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            response = await execute(db.rpc("geo_feature_clusters", {
+                "p_min_lon": min_lon,
+                "p_min_lat": min_lat,
+                "p_max_lon": max_lon,
+                "p_max_lat": max_lat,
+                "p_level": level,
+            }))
+            cells = cells_from_rpc(response.data or [])
+
+        # Points exactly on a tile edge are matched by both neighbours; keep our own cells
+        scale = 2 ** settings.geo_cluster_precision
+        cells = {
+            (cx, cy): cell for (cx, cy), cell in cells.items()
+            if cx // scale == x and cy // scale == y
+        }
+        cluster_cache.set(z, x, y, cells, generation=generation)
+
+    clusters = render_clusters(cells)
+
+    return {
+        "z": z,
+        "x": x,
+        "y": y,
+        "total": sum(cluster["count"] for cluster in clusters),
+        "clusters": clusters,
+    }
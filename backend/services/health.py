@@ -0,0 +1,124 @@
+"""
+Health
+Liveness and readiness checks for load balancers and orchestrators.
+
+Liveness only says the process is serving. Readiness also checks that the
+database answers (a probe cached for `health_db_probe_interval_seconds`,
+so frequent polling costs at most one query per interval per worker),
+that the data-access thread pool is not backed up and that the event loop
+is not lagging, so an overloaded or disconnected worker is taken out of
+rotation until it recovers.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from config import settings
+from services import supabase_client
+from services.auth_service import password_pool_stats
+from services.metrics import loop_lag_seconds, register_collector
+from services.singleflight import singleflight
+
+
+@dataclass
+class ProbeResult:
+    ok: bool
+    latency_seconds: float
+    checked_at: float  # time.monotonic()
+    error: Optional[str] = None
+
+
+_last_probe: Optional[ProbeResult] = None
+_probes = 0
+_probe_failures = 0
+
+
+async def _probe_db() -> ProbeResult:
+    global _last_probe, _probes, _probe_failures
+    _probes += 1
+    started = time.monotonic()
+    error = None
+
+    if supabase_client.supabase is None:
+        error = "Supabase client not initialized"
+    else:
+        try:
+            await asyncio.wait_for(
+                supabase_client.execute(supabase_client.supabase.table("levels").select("id").limit(1)),
+                timeout=settings.health_db_probe_timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            error = f"no response within {settings.health_db_probe_timeout_seconds:g}s"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+    if error:
+        _probe_failures += 1
+    _last_probe = ProbeResult(error is None, time.monotonic() - started, time.monotonic(), error)
+    return _last_probe
+
+
+async def check_db() -> ProbeResult:
+    """Database reachability, probing at most once per interval (concurrent checks share a probe)."""
+    probe = _last_probe
+    if probe is not None and time.monotonic() - probe.checked_at < settings.health_db_probe_interval_seconds:
+        return probe
+    return await singleflight.do(("health", "db"), _probe_db)
+
+
+async def readiness() -> dict:
+    """
+    Run the readiness checks.
+
+    Returns:
+        {"status": "ready" | "not_ready", "checks": {name: {"ok": bool, ...}}}
+    """
+    db = await check_db()
+    pool = supabase_client.pool_stats()
+    queued = pool["threads"]["queued"]
+    connections = pool["connections"] or {}
+    lag = loop_lag_seconds()
+
+    checks = {
+        "database": {
+            "ok": db.ok,
+            "latency_ms": round(db.latency_seconds * 1000, 1),
+            "age_seconds": round(time.monotonic() - db.checked_at, 1),
+            "error": db.error,
+        },
+        "db_pool": {
+            "ok": queued < settings.health_max_db_queue,
+            "queued": queued,
+            "max_queued": settings.health_max_db_queue,
+            "threads": pool["threads"]["max"],
+            "connections_waiting": connections.get("waiting"),
+        },
+        "event_loop": {
+            "ok": lag < settings.health_max_loop_lag_seconds,
+            "lag_ms": round(lag * 1000, 1),
+            "max_lag_ms": settings.health_max_loop_lag_seconds * 1000,
+        },
+    }
+    # Reported for diagnosis only: logins already shed with 503 when this pool is full
+    password_pool = password_pool_stats()
+
+    return {
+        "status": "ready" if all(check["ok"] for check in checks.values()) else "not_ready",
+        "checks": checks,
+        "password_pool": password_pool,
+    }
+
+
+def stats() -> dict:
+    """Return DB probe counts and the last probe outcome."""
+    return {
+        "probes": _probes,
+        "probe_failures": _probe_failures,
+        "db_ok": int(_last_probe.ok) if _last_probe else 0,
+        "db_probe_latency_seconds": _last_probe.latency_seconds if _last_probe else 0.0,
+    }
+
+
+register_collector("health", stats)
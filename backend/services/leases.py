@@ -0,0 +1,28 @@
+"""
+Scheduler Leases
+Database-backed leases used to elect one worker per cluster-wide job.
+"""
+
+import os
+import socket
+from uuid import uuid4
+
+from services.supabase_client import get_db, execute
+
+# Identifies this worker process as a lease holder
+HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+
+async def acquire_lease(name: str, ttl_seconds: int) -> bool:
+    """
+    Take or renew the named lease for this worker.
+
+    Returns:
+        True if this worker holds the lease for the next `ttl_seconds`
+    """
+    response = await execute(get_db().rpc("acquire_scheduler_lease", {
+        "p_name": name,
+        "p_holder": HOLDER_ID,
+        "p_ttl_seconds": ttl_seconds,
+    }))
+    return response.data is True
@@ -0,0 +1,48 @@
+"""
+Maintenance Service
+Purges expired authentication data in bounded batches.
+"""
+
+import logging
+
+from config import settings
+from services.supabase_client import get_db, execute
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_expired_auth_data() -> dict:
+    """
+    Delete expired verification codes, refresh tokens and empty token families.
+
+    Each RPC call deletes at most AUTH_PURGE_BATCH_SIZE rows per table, so
+    no statement holds locks for long; calls repeat until every table is
+    drained or AUTH_PURGE_MAX_BATCHES is reached.
+
+    Returns:
+        Rows deleted per table and the number of batches run
+    """
+    db = get_db()
+    batch_size = settings.auth_purge_batch_size
+    deleted = {"verification_codes": 0, "refresh_tokens": 0, "refresh_token_families": 0}
+    batches = 0
+
+    while batches < settings.auth_purge_max_batches:
+        response = await execute(db.rpc("purge_expired_auth_data", {"p_batch_size": batch_size}))
+        row = response.data[0] if response.data else {}
+        batches += 1
+
+        counts = (
+            row.get("codes_deleted", 0),
+            row.get("tokens_deleted", 0),
+            row.get("families_deleted", 0),
+        )
+        for name, count in zip(deleted, counts):
+            deleted[name] += count
+
+        if max(counts) < batch_size:
+            break
+    else:
+        logger.warning("Auth purge stopped after %d batches; the rest is left for the next run", batches)
+
+    return {**deleted, "batches": batches}
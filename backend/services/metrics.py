@@ -0,0 +1,280 @@
+"""
+Metrics
+Request-level performance instrumentation in Prometheus text format.
+
+MetricsMiddleware times every request and records its route, status and
+payload sizes; execute() in services.supabase_client reports each
+Supabase round-trip into the current request's context, so per-request
+DB call counts and time are known. Both are exposed at /metrics and as a
+Server-Timing response header. Services register collectors that turn
+their stats() dicts into gauges at scrape time.
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "geoexplorer_"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_CALL_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = PREFIX + name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = PREFIX + name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # labels -> (per-bucket counts incl. +Inf, sum)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+# Collector: name -> (stats function, label name for nested dicts)
+_collectors: Dict[str, Tuple[Callable[[], dict], Optional[str]]] = {}
+
+
+def register_collector(name: str, stats: Callable[[], dict], label: Optional[str] = None) -> None:
+    """
+    Export a component's stats() as gauges named `geoexplorer_<name>_<key>`.
+
+    Nested dicts become one more name segment, or with `label` set, a label
+    (e.g. catalog_cache.stats() returns {namespace: {...}} -> label="namespace").
+    """
+    _collectors[name] = (stats, label)
+
+
+def _render_collector(name: str, stats: dict, label: Optional[str]) -> List[str]:
+    samples: Dict[str, List[str]] = {}
+
+    def visit(metric: str, value, labels: str) -> None:
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if label and not labels and metric == name:
+                    visit(metric, item, f'{label}="{_escape(key)}"')
+                else:
+                    visit(f"{metric}_{key}", item, labels)
+        elif isinstance(value, (int, float)):
+            samples.setdefault(PREFIX + metric, []).append(
+                f"{PREFIX}{metric}{{{labels}}} {_format_value(float(value))}" if labels
+                else f"{PREFIX}{metric} {_format_value(float(value))}"
+            )
+
+    visit(name, stats, "")
+
+    lines = []
+    for metric, metric_samples in samples.items():
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(metric_samples)
+    return lines
+
+
+# Request metrics
+http_requests = Counter("http_requests_total", "HTTP requests", ("method", "route", "status"))
+http_latency = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", LATENCY_BUCKETS, ("method", "route")
+)
+http_response_size = Histogram(
+    "http_response_size_bytes", "HTTP response body size", SIZE_BUCKETS, ("method", "route")
+)
+http_request_size = Histogram(
+    "http_request_size_bytes", "HTTP request body size (Content-Length)", SIZE_BUCKETS, ("method", "route")
+)
+db_calls_per_request = Histogram(
+    "db_calls_per_request", "Supabase round-trips per HTTP request", DB_CALL_BUCKETS, ("method", "route")
+)
+db_call_latency = Histogram(
+    "db_call_duration_seconds", "Supabase round-trip latency (including thread pool wait)", LATENCY_BUCKETS
+)
+db_call_errors = Counter("db_call_errors_total", "Supabase round-trips that raised")
+loop_lag = Histogram("event_loop_lag_seconds", "Event loop scheduling delay", LAG_BUCKETS)
+
+_histograms_and_counters = [
+    http_requests, http_latency, http_response_size, http_request_size,
+    db_calls_per_request, db_call_latency, db_call_errors, loop_lag,
+]
+
+# Last measured event loop lag, also exported as a gauge
+_loop_lag_seconds = 0.0
+
+
+@dataclass
+class RequestStats:
+    """Per-request accounting filled in by execute()."""
+    db_calls: int = 0
+    db_seconds: float = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def record_db_call(duration_seconds: float, failed: bool = False) -> None:
+    """Record one Supabase round-trip globally and against the current request."""
+    db_call_latency.observe(duration_seconds)
+    if failed:
+        db_call_errors.inc()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_calls += 1
+        stats.db_seconds += duration_seconds
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """DB accounting of the request being handled, if any."""
+    return _request_stats.get()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, sizes and DB usage per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        response_bytes = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.server_timing_enabled:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    timing = (
+                        f"app;dur={elapsed_ms:.1f}, "
+                        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_calls} calls"'
+                    )
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode())]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded; unmatched paths share one label
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+
+            http_requests.inc(1, method, route_label, str(status_code))
+            http_latency.observe(time.perf_counter() - started, method, route_label)
+            http_response_size.observe(response_bytes, method, route_label)
+            db_calls_per_request.observe(stats.db_calls, method, route_label)
+
+            for name, value in scope.get("headers", ()):
+                if name == b"content-length":
+                    http_request_size.observe(int(value), method, route_label)
+                    break
+
+
+async def monitor_loop_lag(interval_seconds: float) -> None:
+    """Measure how late the event loop wakes up from a sleep, forever."""
+    global _loop_lag_seconds
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval_seconds)
+        _loop_lag_seconds = max(0.0, time.perf_counter() - started - interval_seconds)
+        loop_lag.observe(_loop_lag_seconds)
+        if _loop_lag_seconds > settings.loop_lag_warn_seconds:
+            logger.warning("Event loop lag %.0f ms", _loop_lag_seconds * 1000)
+
+
+def loop_lag_seconds() -> float:
+    """Most recent event loop lag measurement."""
+    return _loop_lag_seconds
+
+
+def render_metrics() -> str:
+    """All metrics and collectors in Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _histograms_and_counters:
+        lines.extend(metric.render())
+
+    lines.append(f"# TYPE {PREFIX}event_loop_lag_last_seconds gauge")
+    lines.append(f"{PREFIX}event_loop_lag_last_seconds {_format_value(_loop_lag_seconds)}")
+
+    for name, (stats, label) in _collectors.items():
+        try:
+            lines.extend(_render_collector(name, stats(), label))
+        except Exception:
+            logger.exception("Metrics collector %s failed", name)
+
+    return "\n".join(lines) + "\n"
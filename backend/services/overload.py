@@ -0,0 +1,197 @@
+"""
+Overload Protection
+Per-route-class concurrency limits, load shedding and request deadlines.
+
+Each route class (auth, catalog, progress, mistakes) admits a bounded
+number of requests at once per worker; a bounded number more may wait
+briefly for a slot, and anything beyond that is rejected immediately with
+503 + Retry-After instead of piling up. Admitted requests carry a
+deadline that execute() in services.supabase_client enforces on every
+data-access call, so work for a request that has already run out of time
+is dropped (queued calls never reach the database) and it fails with 504.
+Health, metrics, docs and admin routes are never limited.
+"""
+
+import asyncio
+import json
+import re
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from services.metrics import register_collector
+
+
+class DeadlineExceeded(Exception):
+    """The current request ran out of time before a data-access call could finish."""
+
+
+# (time.monotonic() by which the current request must finish, its limiter); None outside requests
+_deadline: ContextVar[Optional[Tuple[float, "ConcurrencyLimiter"]]] = ContextVar("request_deadline", default=None)
+
+
+def remaining_seconds() -> Optional[float]:
+    """Time left before the current request's deadline, or None without one."""
+    current = _deadline.get()
+    return None if current is None else current[0] - time.monotonic()
+
+
+def deadline_exceeded() -> DeadlineExceeded:
+    """Count a missed deadline against the current route class and build the error to raise."""
+    current = _deadline.get()
+    if current is not None:
+        current[1].deadline_exceeded += 1
+    return DeadlineExceeded(f"request deadline of {settings.request_deadline_seconds:g}s exceeded")
+
+
+class ConcurrencyLimiter:
+    """At most `limit` requests in flight, `queue_size` more waiting up to `queue_timeout_seconds`."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout_seconds: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.queue_timeouts = 0
+        self.deadline_exceeded = 0
+        self._released = asyncio.Condition()
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting briefly if allowed; False means the request should be shed."""
+        if self.in_flight < self.limit and not self.waiting:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+        if self.waiting >= self.queue_size:
+            self.shed += 1
+            return False
+
+        self.waiting += 1
+        try:
+            async with self._released:
+                await asyncio.wait_for(
+                    self._released.wait_for(lambda: self.in_flight < self.limit),
+                    self.queue_timeout_seconds,
+                )
+                self.in_flight += 1
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            self.shed += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+        self.admitted += 1
+        return True
+
+    async def release(self) -> None:
+        self.in_flight -= 1
+        async with self._released:
+            # Waiters whose wait timed out drop out, so wake all and let the predicate decide
+            self._released.notify_all()
+
+    def stats(self) -> dict:
+        """Current load and shedding counters for monitoring."""
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "queue_timeouts": self.queue_timeouts,
+            "deadline_exceeded": self.deadline_exceeded,
+        }
+
+
+def _limiter(name: str, limit: int) -> ConcurrencyLimiter:
+    return ConcurrencyLimiter(
+        name,
+        limit,
+        settings.concurrency_queue_size,
+        settings.concurrency_queue_timeout_seconds,
+    )
+
+
+limiters: Dict[str, ConcurrencyLimiter] = {
+    "auth": _limiter("auth", settings.concurrency_limit_auth),
+    "catalog": _limiter("catalog", settings.concurrency_limit_catalog),
+    "progress": _limiter("progress", settings.concurrency_limit_progress),
+    "mistakes": _limiter("mistakes", settings.concurrency_limit_mistakes),
+}
+
+# (path pattern, route class); the first match wins, None means unlimited
+ROUTE_CLASSES: List[Tuple["re.Pattern", Optional[str]]] = [
+    # Long-running streams and ingestion would hold a slot and outlive any deadline;
+    # bulk ingestion is admin-only (X-Admin-Token) and bounded by bulk_max_body_bytes
+    (re.compile(r"^/api/users/[^/]+/export$"), None),
+    (re.compile(r"^/api/[^/]+/bulk$"), None),
+    (re.compile(r"^/api/auth(/|$)"), "auth"),
+    (re.compile(r"^/api/levels/user(/|$)"), "progress"),
+    (re.compile(r"^/api/users(/|$)"), "progress"),
+    (re.compile(r"^/api/(levels|trivia|ar-landforms|geo-features)(/|$)"), "catalog"),
+    (re.compile(r"^/api/mistakes(/|$)"), "mistakes"),
+]
+
+
+def route_class(path: str) -> Optional[str]:
+    """The route class limiting `path`, or None for unlimited paths."""
+    for pattern, name in ROUTE_CLASSES:
+        if pattern.match(path):
+            return name
+    return None
+
+
+_SHED_BODY = json.dumps(
+    {"detail": "服务繁忙，请稍后重试 / Server busy, please retry later"}, ensure_ascii=False
+).encode()
+
+
+class OverloadMiddleware:
+    """ASGI middleware admitting requests through their route class's limiter."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        name = route_class(scope["path"]) if scope["type"] == "http" else None
+        if name is None or not settings.overload_protection_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = limiters[name]
+        token = _deadline.set((time.monotonic() + settings.request_deadline_seconds, limiter))
+        try:
+            if not await limiter.acquire():
+                await send({
+                    "type": "http.response.start",
+                    "status": 503,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(_SHED_BODY)).encode()),
+                        (b"retry-after", str(settings.overload_retry_after_seconds).encode()),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": _SHED_BODY})
+                return
+
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                await limiter.release()
+        finally:
+            _deadline.reset(token)
+
+
+def overload_stats() -> Dict[str, dict]:
+    """Stats of every route class limiter, keyed by class."""
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+register_collector("overload", overload_stats, label="route_class")
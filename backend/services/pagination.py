@@ -0,0 +1,82 @@
+"""
+Pagination
+Opaque keyset cursors for list endpoints.
+
+A cursor encodes the sort-key values of the last row of a page; the next
+page is everything strictly after that row in (sort column, id) order,
+which stays stable while rows are inserted and never degrades with depth.
+"""
+
+import base64
+import json
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+
+# Header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(row: dict, columns: Sequence[str]) -> str:
+    """Encode the sort-key values of a row into an opaque cursor."""
+    payload = json.dumps([row[column] for column in columns], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[str]) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return values
+
+
+def _quote(value: Any) -> str:
+    """Quote a value for a PostgREST logic-tree filter."""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def apply_cursor(query, cursor: str, column: str, desc: bool = False):
+    """
+    Restrict a query to the rows after a cursor and order it by (column, id).
+
+    Args:
+        query: PostgREST select builder
+        cursor: Cursor from a previous page, or None for the first page
+        column: Primary sort column; `id` breaks ties
+        desc: Sort descending
+
+    Returns:
+        The ordered (and filtered) query builder
+    """
+    if cursor:
+        value, last_id = decode_cursor(cursor, (column, "id"))
+        op = "lt" if desc else "gt"
+        query = query.or_(
+            f"{column}.{op}.{_quote(value)},"
+            f"and({column}.eq.{_quote(value)},id.{op}.{_quote(last_id)})"
+        )
+
+    return query.order(column, desc=desc).order("id", desc=desc)
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, column: str) -> Optional[str]:
+    """Expose the next-page cursor in a response header when the page is full."""
+    if limit <= 0 or not rows or len(rows) < limit:
+        return None
+
+    cursor = encode_cursor(rows[-1], (column, "id"))
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    return cursor
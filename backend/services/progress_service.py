@@ -0,0 +1,38 @@
+"""
+Progress Service
+Maintenance of denormalized progress data such as users.total_stars.
+"""
+
+import logging
+
+from config import settings
+from services.supabase_client import get_db, execute
+from services.auth_service import invalidate_cached_user
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_total_stars() -> int:
+    """
+    Verify users.total_stars against progress rows and repair any drift.
+
+    The trigger keeps totals up to date incrementally; this catches rows
+    changed outside it (manual edits, restores, trigger disabled).
+
+    Returns:
+        Number of users whose total was repaired
+    """
+    db = get_db()
+
+    response = await execute(db.rpc("reconcile_total_stars", {
+        "p_limit": settings.stars_reconcile_batch_size
+    }))
+
+    for row in response.data or []:
+        logger.warning(
+            "Repaired total_stars drift for user %s: %s -> %s",
+            row["user_id"], row["stored_stars"], row["actual_stars"]
+        )
+        invalidate_cached_user(row["user_id"])
+
+    return len(response.data) if response.data else 0
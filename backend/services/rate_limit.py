@@ -0,0 +1,230 @@
+"""
+Rate Limiting
+Token-bucket rate limiters with a pluggable backend.
+
+The memory backend keeps buckets per worker process, so effective limits
+scale with the number of workers. RATE_LIMIT_BACKEND=redis shares them
+through any Redis-compatible server (requires the `redis` package);
+RATE_LIMIT_REDIS_URL=local:// runs the same backend against an in-process
+stand-in instead, for development and tests without a server.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Protocol, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from config import settings
+from services.metrics import register_collector
+
+
+class RateLimitBackend(Protocol):
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)."""
+        ...
+
+
+class MemoryBackend:
+    """In-process buckets, least recently used evicted beyond `max_keys`."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return allowed, 0.0 if allowed else (1 - tokens) / refill_per_second
+
+
+# Refill and take atomically on the server, using the server clock
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the redis.asyncio client RedisBackend uses.
+
+    Only the token-bucket script is supported: its logic runs in Python
+    against per-key hashes that expire like the script's EXPIRE, with
+    values returned as the server would (allowed as an int, retry-after
+    as a string). Buckets are per process, so this shares nothing.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        # key -> (tokens, updated, expires_at), least recently written first
+        self._hashes: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+
+    def register_script(self, script: str):
+        """The token-bucket script's Python equivalent; any other script is a ValueError."""
+        if script != _TOKEN_BUCKET_SCRIPT:
+            raise ValueError("LocalRedis runs only the rate limiter's token-bucket script")
+        return self._token_bucket
+
+    async def _token_bucket(self, keys: List[str], args: list) -> list:
+        capacity, rate = float(args[0]), float(args[1])
+        now = self._clock()
+
+        while self._hashes and next(iter(self._hashes.values()))[2] <= now:
+            self._hashes.popitem(last=False)
+
+        tokens, updated, expires_at = self._hashes.pop(keys[0], (capacity, now, math.inf))
+        if expires_at <= now:
+            tokens, updated = capacity, now
+        tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+
+        allowed = 0
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+            allowed = 1
+        else:
+            retry_after = (1 - tokens) / rate
+
+        self._hashes[keys[0]] = (tokens, now, now + math.ceil(capacity / rate) + 1)
+        return [allowed, str(retry_after)]
+
+
+class RedisBackend:
+    """Buckets shared by every worker through a Redis-compatible server."""
+
+    def __init__(self, url: str):
+        if url.startswith("local://"):
+            self._redis = LocalRedis()
+        else:
+            try:
+                from redis.asyncio import Redis
+            except ImportError:
+                raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the redis package (pip install redis)")
+            self._redis = Redis.from_url(url)
+
+        self._script = self._redis.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        allowed, retry_after = await self._script(
+            keys=[f"ratelimit:{key}"],
+            args=[capacity, refill_per_second],
+        )
+        return bool(allowed), float(retry_after)
+
+
+def create_backend() -> RateLimitBackend:
+    """Backend selected by RATE_LIMIT_BACKEND ("memory" or "redis")."""
+    if settings.rate_limit_backend == "redis":
+        return RedisBackend(settings.rate_limit_redis_url)
+    return MemoryBackend(max_keys=settings.rate_limit_max_keys)
+
+
+_backend: RateLimitBackend = create_backend()
+
+
+class RateLimiter:
+    """A named bucket policy: `limit` requests per `period_seconds`, bursting up to `limit`."""
+
+    def __init__(self, name: str, limit: int, period_seconds: float):
+        self.name = name
+        self.limit = limit
+        self.period_seconds = period_seconds
+        self.allowed = 0
+        self.limited = 0
+        _limiters.append(self)
+
+    async def hit(self, key: str) -> None:
+        """
+        Count a request against `key`.
+
+        Raises:
+            HTTPException: 429 with Retry-After when the bucket is empty
+        """
+        allowed, retry_after = await _backend.take(
+            f"{self.name}:{key}",
+            capacity=self.limit,
+            refill_per_second=self.limit / self.period_seconds,
+        )
+
+        if allowed:
+            self.allowed += 1
+            return
+
+        self.limited += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="请求过于频繁，请稍后重试 / Too many requests, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    def stats(self) -> dict:
+        """Allowed/limited counters for monitoring."""
+        return {
+            "limit": self.limit,
+            "period_seconds": self.period_seconds,
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+_limiters: List[RateLimiter] = []
+
+
+def client_ip(request: Request) -> str:
+    """The client address, taken from X-Forwarded-For only when the proxy is trusted."""
+    if settings.rate_limit_trust_forwarded_for:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def limit_by_ip(limiter: RateLimiter):
+    """Build a dependency that applies `limiter` per client IP."""
+    async def dependency(request: Request) -> None:
+        await limiter.hit(client_ip(request))
+    return dependency
+
+
+def rate_limit_stats() -> Dict[str, dict]:
+    """Counters of every limiter, keyed by name."""
+    return {limiter.name: limiter.stats() for limiter in _limiters}
+
+
+# Limiters for the authentication endpoints; auth_ip covers the credential endpoints only
+auth_ip_limiter = RateLimiter("auth_ip", settings.rate_limit_auth_per_minute, 60)
+send_code_ip_limiter = RateLimiter("send_code_ip", settings.rate_limit_send_code_ip_per_hour, 3600)
+send_code_target_limiter = RateLimiter("send_code_target", settings.rate_limit_send_code_target_per_hour, 3600)
+send_code_cooldown_limiter = RateLimiter("send_code_cooldown", 1, settings.rate_limit_send_code_cooldown_seconds)
+
+register_collector("rate_limit", rate_limit_stats, label="limiter")
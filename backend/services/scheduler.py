@@ -0,0 +1,135 @@
+"""
+Background Scheduler
+Runs periodic maintenance jobs inside the API process.
+
+Every worker runs the scheduler. Jobs that act on the whole database are
+registered as leader_only: before each run the worker must hold the job's
+lease, so only one worker in the cluster runs it per interval.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+from services.leases import acquire_lease
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """A periodic job and the outcome of its most recent run."""
+
+    def __init__(
+        self,
+        name: str,
+        interval_seconds: float,
+        func: Callable[[], Awaitable[Any]],
+        leader_only: bool = False
+    ):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.leader_only = leader_only
+        self.skipped_runs = 0  # scheduled runs left to the lease holder
+        self.last_started_at: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_result: Any = None
+        self.last_error: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def run(self) -> Any:
+        """Run the job once; overlapping runs of the same job are serialized."""
+        async with self._lock:
+            self.last_started_at = datetime.now(timezone.utc)
+            started = time.perf_counter()
+            try:
+                self.last_result = await self.func()
+                self.last_error = None
+                return self.last_result
+            except Exception as e:
+                self.last_error = repr(e)
+                raise
+            finally:
+                self.last_duration_ms = (time.perf_counter() - started) * 1000
+
+    def status(self) -> dict:
+        """Return a JSON-friendly summary of the last run."""
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval_seconds,
+            "leader_only": self.leader_only,
+            "skipped_runs": self.skipped_runs,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_duration_ms": self.last_duration_ms,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+
+class Scheduler:
+    """Runs each registered job on its own interval until stopped."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(
+        self,
+        name: str,
+        interval_seconds: float,
+        func: Callable[[], Awaitable[Any]],
+        leader_only: bool = False
+    ) -> Job:
+        """Register a job; it starts running when the scheduler starts."""
+        job = Job(name, interval_seconds, func, leader_only=leader_only)
+        self._jobs[name] = job
+        return job
+
+    def get_job(self, name: str) -> Optional[Job]:
+        """Look up a registered job by name."""
+        return self._jobs.get(name)
+
+    def start(self) -> None:
+        """Start a loop task per job."""
+        for job in self._jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"job:{job.name}"))
+
+    async def stop(self) -> None:
+        """Cancel all job loops and wait for them to finish."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def status(self) -> List[dict]:
+        """Return the status of every job."""
+        return [job.status() for job in self._jobs.values()]
+
+    async def _is_leader(self, job: Job) -> bool:
+        # The lease outlives one interval, so the holder keeps renewing it and
+        # another worker only takes over once the holder has missed a run
+        ttl_seconds = int(job.interval_seconds + settings.scheduler_lease_grace_seconds)
+        try:
+            return await acquire_lease(f"job:{job.name}", ttl_seconds)
+        except Exception:
+            logger.exception("Could not acquire lease for job %s", job.name)
+            return False
+
+    async def _loop(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(job.interval_seconds)
+            if job.leader_only and not await self._is_leader(job):
+                job.skipped_runs += 1
+                continue
+            try:
+                result = await job.run()
+                logger.info("Job %s finished in %.1f ms: %s", job.name, job.last_duration_ms, result)
+            except Exception:
+                logger.exception("Job %s failed", job.name)
+
+
+# Global scheduler instance
+scheduler = Scheduler()
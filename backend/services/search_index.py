@@ -0,0 +1,181 @@
+"""
+Search Index
+In-process inverted index for geographic feature search.
+
+Latin text is split into lowercase words (prefix and typo tolerant);
+CJK text, which has no word boundaries, is indexed as character bigrams
+plus unigrams so that any substring of two or more characters matches.
+"""
+
+import bisect
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+_WORD_RE = re.compile(r"[0-9a-z]+")
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+")
+
+# Field weights used for ranking; matches in the name count most
+FIELD_WEIGHTS = {"name": 3.0, "region": 2.0, "description": 1.0}
+
+MIN_PREFIX_LENGTH = 2
+MIN_FUZZY_LENGTH = 4
+FUZZY_THRESHOLD = 0.45
+PREFIX_PENALTY = 0.7
+FUZZY_PENALTY = 0.5
+
+
+def _cjk_tokens(run: str) -> List[str]:
+    if len(run) == 1:
+        return [run]
+    return list(run) + [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Index tokens for a piece of text (latin words, CJK unigrams + bigrams)."""
+    if not text:
+        return []
+    text = text.lower()
+    tokens = _WORD_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        tokens.extend(_cjk_tokens(run))
+    return tokens
+
+
+def _query_groups(query: str) -> Tuple[List[str], List[str]]:
+    """Split a query into latin words and CJK tokens that must all match."""
+    query = query.lower()
+    words = _WORD_RE.findall(query)
+    cjk = []
+    for run in _CJK_RE.findall(query):
+        # Bigrams alone cover a run; a lone character has to match as a unigram
+        cjk.extend([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+    return words, cjk
+
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Weighted inverted index over feature rows with ranked retrieval."""
+
+    def __init__(self):
+        self._rows: Dict[str, dict] = {}
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._words: List[str] = []  # sorted latin vocabulary, for prefix lookup
+        self._word_trigrams: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, row: dict) -> None:
+        """Index or re-index a row."""
+        doc_id = str(row["id"])
+        self.remove(doc_id)
+
+        weights: Dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(row.get(field)):
+                weights[token] += weight
+
+        for token, weight in weights.items():
+            if not self._postings.get(token) and _WORD_RE.fullmatch(token):
+                bisect.insort(self._words, token)
+                for trigram in _trigrams(token):
+                    self._word_trigrams[trigram].add(token)
+            self._postings[token][doc_id] = weight
+
+        self._rows[doc_id] = row
+        self._doc_terms[doc_id] = set(weights)
+
+    def remove(self, doc_id: str) -> None:
+        """Drop a row from the index if present."""
+        for token in self._doc_terms.pop(doc_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[token]
+                if _WORD_RE.fullmatch(token):
+                    position = bisect.bisect_left(self._words, token)
+                    if position < len(self._words) and self._words[position] == token:
+                        del self._words[position]
+                    for trigram in _trigrams(token):
+                        self._word_trigrams[trigram].discard(token)
+        self._rows.pop(doc_id, None)
+
+    def clear(self) -> None:
+        """Remove every row."""
+        self.__init__()
+
+    def _idf(self, token: str) -> float:
+        return math.log(1 + len(self._rows) / (1 + len(self._postings.get(token, ()))))
+
+    def _expand_word(self, word: str) -> List[Tuple[str, float]]:
+        """Vocabulary terms matching a query word, with a score multiplier each."""
+        matches = []
+        if word in self._postings:
+            matches.append((word, 1.0))
+
+        if len(word) >= MIN_PREFIX_LENGTH:
+            position = bisect.bisect_left(self._words, word)
+            while position < len(self._words) and self._words[position].startswith(word):
+                if self._words[position] != word:
+                    matches.append((self._words[position], PREFIX_PENALTY))
+                position += 1
+
+        if not matches and len(word) >= MIN_FUZZY_LENGTH:
+            query_trigrams = _trigrams(word)
+            candidates: Dict[str, int] = defaultdict(int)
+            for trigram in query_trigrams:
+                for term in self._word_trigrams.get(trigram, ()):
+                    candidates[term] += 1
+            for term, shared in candidates.items():
+                similarity = shared / len(query_trigrams | _trigrams(term))
+                if similarity >= FUZZY_THRESHOLD:
+                    matches.append((term, FUZZY_PENALTY * similarity))
+
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[float, dict]]:
+        """
+        Rows matching every query term, best first, as (score, row).
+
+        Latin words match exactly, by prefix, or (failing both) by trigram
+        similarity; CJK tokens must match exactly.
+        """
+        words, cjk_tokens = _query_groups(query)
+        groups = [self._expand_word(word) for word in words]
+        groups += [[(token, 1.0)] for token in cjk_tokens]
+
+        if not groups:
+            return []
+
+        scores: Optional[Dict[str, float]] = None
+        for group in groups:
+            group_scores: Dict[str, float] = defaultdict(float)
+            for term, multiplier in group:
+                idf = self._idf(term)
+                for doc_id, weight in self._postings.get(term, {}).items():
+                    group_scores[doc_id] = max(group_scores[doc_id], weight * idf * multiplier)
+
+            if scores is None:
+                scores = dict(group_scores)
+            else:
+                scores = {
+                    doc_id: score + group_scores[doc_id]
+                    for doc_id, score in scores.items() if doc_id in group_scores
+                }
+            if not scores:
+                return []
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], self._rows[item[0]].get("name") or ""),
+        )
+        return [(score, self._rows[doc_id]) for doc_id, score in ranked[:limit]]
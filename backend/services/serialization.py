@@ -0,0 +1,97 @@
+"""
+Serialization
+Fast JSON responses for rows the data layer has already shaped.
+
+A route returning dicts with a response_model makes FastAPI build a
+Pydantic model per row only to dump it straight back to JSON. List
+endpoints whose rows come from known PostgREST columns can skip that:
+trusted_response() projects each row onto the response model's fields
+and serializes the result directly (TRUSTED_ROWS_ENABLED). Values are
+emitted as the database returned them, so timestamps keep PostgREST's
+ISO-8601 form ("+00:00" rather than Pydantic's "Z").
+
+JSON_RESPONSE_BACKEND=orjson renders these bodies with orjson (requires
+the `orjson` package; falls back to pydantic-core when it is missing).
+It is deliberately not installed as the app's default response class:
+that would turn off FastAPI's own pydantic-core JSON path for validated
+routes, which benchmarks.serialization measures as slower.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from config import settings
+
+
+def _load_orjson():
+    if settings.json_response_backend != "orjson":
+        return None
+    try:
+        import orjson
+    except ImportError:
+        print("⚠️ Warning: orjson is not installed, using pydantic-core for JSON responses")
+        return None
+    return orjson
+
+
+_orjson = _load_orjson()
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON (datetimes, UUIDs and dates included)."""
+    if _orjson is not None:
+        return _orjson.dumps(content)
+    return to_json(content)
+
+
+@lru_cache(maxsize=None)
+def _fields(model: Type[BaseModel]) -> Tuple[Tuple[str, Any], ...]:
+    return tuple(
+        (name, None if field.is_required() else field.get_default(call_default_factory=True))
+        for name, field in model.model_fields.items()
+    )
+
+
+def trusted_rows(content: Any, model: Type[BaseModel]) -> Any:
+    """Project a row (or list of rows) onto the model's fields, filling defaults, without validating."""
+    fields = _fields(model)
+    if isinstance(content, dict):
+        return {name: content.get(name, default) for name, default in fields}
+    return [{name: row.get(name, default) for name, default in fields} for row in content]
+
+
+def trusted_response(
+    content: Any,
+    model: Type[BaseModel],
+    response: Response,
+    cache: Optional[Dict[type, bytes]] = None
+) -> Any:
+    """
+    Serialize rows the route trusts to match `model`, bypassing response validation.
+
+    Args:
+        content: A row or list of rows; a Response (e.g. a 304) is returned as is
+        model: The route's response model (per row)
+        response: The route's injected Response, whose headers are carried over
+        cache: Per-payload dict to memoize the body in (catalog cache entries)
+
+    Returns:
+        A JSON Response when TRUSTED_ROWS_ENABLED, otherwise `content` unchanged
+        for FastAPI to validate
+    """
+    if isinstance(content, Response) or not settings.trusted_rows_enabled:
+        return content
+
+    body = cache.get(model) if cache is not None else None
+    if body is None:
+        body = dumps(trusted_rows(content, model))
+        if cache is not None:
+            cache[model] = body
+
+    result = Response(content=body, status_code=response.status_code or 200, media_type="application/json")
+    result.headers.raw.extend(response.headers.raw)
+    return result
@@ -0,0 +1,69 @@
+"""
+Single-Flight
+Coalesces concurrent identical reads into one upstream call.
+
+When many requests miss a cache at the same moment (a class opening the
+app together), only the first caller for a key runs the loader; everyone
+else awaits the same in-flight result. Keys are explicit so callers decide
+what "identical" means, e.g. ("levels", "all") or ("user", user_id).
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from services.metrics import register_collector
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key.
+
+    The loader runs in its own task, so a caller that is cancelled (client
+    disconnect) does not cancel the work the other callers are waiting on.
+    Results are not cached: once the call finishes the key is free again.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `loader` for `key`, or join the call already in flight."""
+        self.calls += 1
+
+        task = self._calls.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(loader())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def forget(self, key: Hashable) -> None:
+        """Detach an in-flight call so later callers start a fresh one (after a write)."""
+        self._calls.pop(key, None)
+
+    def stats(self) -> dict:
+        """Return call counts and the share of calls served by another caller's load."""
+        coalesced = self.calls - self.executions
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": coalesced,
+            "coalescing_ratio": coalesced / self.calls if self.calls else 0.0,
+            "in_flight": len(self._calls),
+        }
+
+
+# Global single-flight group shared by routes and services
+singleflight = SingleFlight()
+register_collector("singleflight", singleflight.stats)
@@ -1,31 +1,168 @@
-from supabase import create_client, Client
+import asyncio
+import importlib.util
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+import httpx
+from supabase import create_client, Client, ClientOptions
 from config import settings
+from services.metrics import record_db_call, register_collector
+from services.overload import deadline_exceeded, remaining_seconds
+
+def create_http_client() -> httpx.Client:
+    """
+    Build the pooled HTTP client shared by every Supabase request in this process.
+
+    Connections are kept alive and reused across requests (and multiplexed
+    when HTTP/2 is available) instead of paying a TCP + TLS handshake per call.
+    """
+    http2 = settings.db_http2 and importlib.util.find_spec("h2") is not None
+    if settings.db_http2 and not http2:
+        print("⚠️ Warning: h2 is not installed, using HTTP/1.1 for Supabase")
 
-def get_supabase_client() -> Client:
+    return httpx.Client(
+        http2=http2,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=settings.db_max_connections,
+            max_keepalive_connections=settings.db_max_keepalive_connections,
+            keepalive_expiry=settings.db_keepalive_expiry_seconds,
+        ),
+        timeout=httpx.Timeout(
+            settings.db_read_timeout_seconds,
+            connect=settings.db_connect_timeout_seconds,
+            pool=settings.db_pool_timeout_seconds,
+        ),
+    )
+
+def get_supabase_client(http_client: Optional[httpx.Client] = None) -> Client:
     """Create and return a Supabase client instance."""
     if not settings.supabase_url or not settings.supabase_key:
         raise ValueError(
             "Supabase credentials not configured. "
             "Please set SUPABASE_URL and SUPABASE_KEY environment variables."
         )
-    
-    return create_client(settings.supabase_url, settings.supabase_key)
+
+    options = ClientOptions(httpx_client=http_client) if http_client else None
+    return create_client(settings.supabase_url, settings.supabase_key, options=options)
 
 # Global client instance
 supabase: Client = None
 
+# Pooled HTTP client behind `supabase`; created per worker process at startup
+_http_client: Optional[httpx.Client] = None
+
+# Bounded pool the blocking PostgREST calls run on, so they never stall the event loop
+_db_executor = ThreadPoolExecutor(
+    max_workers=settings.db_pool_size,
+    thread_name_prefix="supabase",
+)
+
 def init_supabase():
     """Initialize the global Supabase client."""
-    global supabase
+    global supabase, _http_client
     try:
-        supabase = get_supabase_client()
+        _http_client = create_http_client()
+        supabase = get_supabase_client(_http_client)
         print("✅ Supabase client initialized successfully")
     except ValueError as e:
         print(f"⚠️ Warning: {e}")
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
         supabase = None
 
+def shutdown_supabase():
+    """Release the data-access thread pool and close pooled connections."""
+    global _http_client
+    _db_executor.shutdown(wait=False, cancel_futures=True)
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
+
+def pool_stats() -> dict:
+    """
+    Utilization of the data-access thread pool and HTTP connection pool.
+
+    Reads private ThreadPoolExecutor / httpx / httpcore attributes; a field
+    whose attribute is missing in the installed version reports 0, and
+    "connections" is None when the connection pool cannot be reached.
+    """
+    work_queue = getattr(_db_executor, "_work_queue", None)
+    stats = {
+        "threads": {
+            "max": settings.db_pool_size,
+            "started": len(getattr(_db_executor, "_threads", ())),
+            "queued": work_queue.qsize() if work_queue is not None else 0,
+        },
+        "connections": None,
+    }
+
+    pool = getattr(getattr(_http_client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is not None:
+        connections = list(connections)
+        idle = sum(1 for connection in connections if connection.is_idle())
+        requests = list(getattr(pool, "_requests", ()))
+        stats["connections"] = {
+            "max": settings.db_max_connections,
+            "max_keepalive": settings.db_max_keepalive_connections,
+            "open": len(connections),
+            "active": len(connections) - idle,
+            "idle": idle,
+            "http2": sum(1 for connection in connections if "HTTP/2" in connection.info()),
+            "waiting": sum(1 for request in requests if getattr(request, "is_queued", lambda: False)()),
+        }
+
+    return stats
+
 def get_db() -> Client:
     """Get the Supabase client for dependency injection."""
     if supabase is None:
         raise RuntimeError("Supabase client not initialized")
     return supabase
+
+async def execute(query) -> Any:
+    """
+    Run a PostgREST query builder without blocking the event loop.
+
+    Every route and service awaits this instead of calling ``.execute()``
+    directly; the synchronous HTTP round-trip runs on a bounded thread pool
+    and is counted against the current request's metrics.
+
+    Inside a request the call is bounded by the request deadline: a call
+    still waiting for a pool thread when time runs out is dropped, and one
+    already running is abandoned (its thread finishes in the background).
+
+    Args:
+        query: A Supabase/PostgREST request builder (table or rpc call)
+
+    Returns:
+        The PostgREST API response
+
+    Raises:
+        DeadlineExceeded: The request's deadline passed before the call finished
+    """
+    remaining = remaining_seconds()
+    if remaining is not None and remaining <= 0:
+        raise deadline_exceeded()
+
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    failed = True
+    try:
+        future = loop.run_in_executor(_db_executor, query.execute)
+        if remaining is None:
+            response = await future
+        else:
+            try:
+                response = await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                raise deadline_exceeded() from None
+        failed = False
+        return response
+    finally:
+        record_db_call(time.perf_counter() - started, failed=failed)
+
+register_collector("db_pool", pool_stats)
@@ -0,0 +1,170 @@
+"""
+Token Revocation
+In-memory set of revoked refresh-token families.
+
+A Bloom filter answers "definitely not revoked" without touching the
+database; the rare positive (a real revocation or a false positive) is
+confirmed with an exact lookup. Each worker syncs the filter from
+refresh_token_families on a short interval and adds its own revocations
+immediately.
+"""
+
+import hashlib
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Set
+
+from supabase import Client
+
+from config import settings
+from services.supabase_client import get_db, execute
+from services.cache import TTLCache
+from services.metrics import register_collector
+
+SYNC_OVERLAP_SECONDS = 5
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one BLAKE2b digest)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        """Add an item."""
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationSet:
+    """Revoked family ids: Bloom filter for the fast path, database for confirmation."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._exact = TTLCache(maxsize=10000, ttl_seconds=settings.refresh_token_revocation_sync_seconds)
+        self._synced_until: Optional[str] = None
+        self._local: Set[str] = set()  # own revocations not yet seen by a sync
+        self.filter_negatives = 0
+        self.exact_checks = 0
+        self.false_positives = 0
+
+    def add(self, family_id: str) -> None:
+        """Record a revocation made by this worker."""
+        self._filter.add(str(family_id))
+        self._exact.set(str(family_id), True)
+        self._local.add(str(family_id))
+
+    async def is_revoked(self, db: Client, family_id: str) -> bool:
+        """Whether a family is revoked; only filter hits cost a query."""
+        family_id = str(family_id)
+        if family_id not in self._filter:
+            self.filter_negatives += 1
+            return False
+
+        revoked = self._exact.get(family_id)
+        if revoked is None:
+            self.exact_checks += 1
+            response = await execute(
+                db.table("refresh_token_families").select("revoked_at").eq("id", family_id).limit(1)
+            )
+            # A family that no longer exists has expired; treat it as revoked
+            revoked = not response.data or response.data[0]["revoked_at"] is not None
+            if not revoked:
+                self.false_positives += 1
+            self._exact.set(family_id, revoked)
+
+        return revoked
+
+    async def sync(self, db: Client) -> int:
+        """
+        Pull revocations made since the last sync (by any worker).
+
+        The filter is rebuilt from the whole retention window on the first
+        sync and whenever it fills past its capacity.
+
+        Returns:
+            Number of revoked families loaded
+        """
+        rebuild = self._synced_until is None or self._filter.count >= self._filter.capacity
+        local, self._local = self._local, set()
+        if rebuild:
+            # Tokens of a family revoked longer ago than a token lifetime have all expired
+            since = (
+                datetime.now(timezone.utc) - timedelta(days=settings.refresh_token_expire_days)
+            ).isoformat()
+        else:
+            # Overlap so revocations committed slightly out of timestamp order are not missed
+            since = (
+                datetime.fromisoformat(self._synced_until) - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+            ).isoformat()
+
+        rows = []
+        offset = 0
+        page_size = 1000
+        while True:
+            response = await execute(
+                db.table("refresh_token_families").select("id,revoked_at")
+                .gt("revoked_at", since).order("revoked_at")
+                .range(offset, offset + page_size - 1)
+            )
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+            offset += page_size
+
+        if rebuild:
+            bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+            # Revocations made here during the query may not be in its result yet
+            for family_id in local | self._local:
+                bloom.add(family_id)
+            self._filter = bloom
+        for row in rows:
+            if row["id"] not in self._filter:
+                self._filter.add(row["id"])
+        if rows:
+            self._synced_until = rows[-1]["revoked_at"]
+        elif self._synced_until is None:
+            self._synced_until = since
+
+        return len(rows)
+
+    def stats(self) -> dict:
+        """Filter fill and lookup counters."""
+        return {
+            "revoked": self._filter.count,
+            "capacity": self._filter.capacity,
+            "filter_negatives": self.filter_negatives,
+            "exact_checks": self.exact_checks,
+            "false_positives": self.false_positives,
+        }
+
+
+async def sync_revoked_families() -> int:
+    """Scheduler job: keep this worker's revocation filter current."""
+    return await revoked_families.sync(get_db())
+
+
+# Global revocation set (one per worker process)
+revoked_families = RevocationSet(
+    capacity=settings.refresh_token_bloom_capacity,
+    error_rate=settings.refresh_token_bloom_error_rate,
+)
+register_collector("token_revocation", revoked_families.stats)
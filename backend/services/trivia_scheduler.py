@@ -0,0 +1,111 @@
+"""
+Trivia Scheduler
+Precomputed daily trivia schedule served from memory.
+
+The next TRIVIA_SCHEDULE_DAYS days are resolved in one refresh: each day
+gets the trivia featured on it, or the most recently created entry when
+nothing is featured. Today's entry is picked from that schedule in the
+configured timezone, so the midnight rollover needs no database access
+and /api/trivia/today costs zero queries in steady state.
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+from supabase import Client
+
+from config import settings
+from services.supabase_client import get_db, execute
+from services.catalog_cache import CatalogEntry, make_entry
+from services.singleflight import singleflight
+
+logger = logging.getLogger(__name__)
+
+
+class TriviaScheduler:
+    """Holds the featured trivia for today and the following days."""
+
+    def __init__(self, days: int, timezone: str):
+        self.days = days
+        self.timezone = ZoneInfo(timezone)
+        self._schedule: Dict[date, Optional[CatalogEntry]] = {}
+        self._generation = 0
+        self._loaded_generation = -1
+
+    def today(self) -> date:
+        """The current date in the trivia timezone."""
+        return datetime.now(self.timezone).date()
+
+    def _is_current(self, day: date) -> bool:
+        return self._loaded_generation == self._generation and day in self._schedule
+
+    async def refresh(self, db: Client) -> int:
+        """
+        Rebuild the schedule starting today.
+
+        Returns:
+            Number of scheduled days with featured (not fallback) trivia
+        """
+        generation = self._generation
+        start = self.today()
+        end = start + timedelta(days=self.days - 1)
+
+        featured_response, latest_response = await asyncio.gather(
+            execute(
+                db.table("daily_trivia").select("*")
+                .gte("featured_date", start.isoformat())
+                .lte("featured_date", end.isoformat())
+                .order("created_at", desc=True)
+            ),
+            execute(db.table("daily_trivia").select("*").order("created_at", desc=True).limit(1)),
+        )
+
+        # Newest first, so the newest entry wins when several share a date
+        featured: Dict[str, CatalogEntry] = {}
+        for row in featured_response.data or []:
+            featured.setdefault(row["featured_date"], make_entry(row))
+
+        fallback = make_entry(latest_response.data[0]) if latest_response.data else None
+
+        schedule = {
+            start + timedelta(days=i): featured.get((start + timedelta(days=i)).isoformat(), fallback)
+            for i in range(self.days)
+        }
+
+        # A write during the refresh leaves the schedule marked stale
+        self._schedule = schedule
+        self._loaded_generation = generation
+        return len(featured)
+
+    async def get_today(self, db: Client) -> Optional[CatalogEntry]:
+        """Today's entry, refreshing only after a rollover past the horizon or a write."""
+        today = self.today()
+        if not self._is_current(today):
+            await singleflight.do(("trivia_schedule", self._generation, today), lambda: self.refresh(db))
+        return self._schedule.get(today)
+
+    def invalidate(self) -> None:
+        """Mark the schedule stale after trivia is created or changed."""
+        self._generation += 1
+
+    def status(self) -> dict:
+        """Scheduled trivia id per day."""
+        return {
+            day.isoformat(): entry.payload["id"] if entry else None
+            for day, entry in sorted(self._schedule.items())
+        }
+
+
+async def refresh_trivia_schedule() -> int:
+    """Scheduler job: roll the precomputed window forward and pick up other workers' writes."""
+    return await trivia_scheduler.refresh(get_db())
+
+
+# Global trivia scheduler instance
+trivia_scheduler = TriviaScheduler(
+    days=settings.trivia_schedule_days,
+    timezone=settings.trivia_timezone,
+)
@@ -10,6 +10,8 @@ from typing import Optional
 from supabase import Client
 
 from config import settings
+from services.supabase_client import execute
+from services.delivery import OutboundMessage, delivery_queue
 
 
 def generate_code(length: int = 6) -> str:
@@ -17,6 +19,21 @@ def generate_code(length: int = 6) -> str:
     return ''.join(random.choices(string.digits, k=length))
 
 
+def verification_message(target: str, code: str, code_type: str) -> OutboundMessage:
+    """Build the outbound message carrying a verification code."""
+    purpose = "注册" if code_type == "register" else "登录"
+    return OutboundMessage(
+        channel="email" if "@" in target else "sms",
+        target=target,
+        subject=f"GeoExplorer {purpose}验证码 / Verification code",
+        body=(
+            f"您的{purpose}验证码是 {code}，{settings.verification_code_expire_minutes} 分钟内有效。\n"
+            f"Your verification code is {code}. "
+            f"It expires in {settings.verification_code_expire_minutes} minutes."
+        ),
+    )
+
+
 async def send_verification_code(
     db: Client,
     target: str,
@@ -25,8 +42,8 @@ async def send_verification_code(
     """
     Generate and send a verification code.
     
-    In development, this prints to console.
-    In production, integrate with SMS/email service.
+    The code is persisted and queued for delivery; sending (console, SMTP
+    or SMS, see DELIVERY_*_SENDER) happens on the delivery worker.
     
     Args:
         db: Supabase client
@@ -45,31 +62,19 @@ async def send_verification_code(
     )
     
     # Mark all previous codes for this target as used
-    db.table("verification_codes").update({"used": True}).eq("target", target).eq("used", False).execute()
+    await execute(db.table("verification_codes").update({"used": True}).eq("target", target).eq("used", False))
     
     # Store code in database
-    db.table("verification_codes").insert({
+    await execute(db.table("verification_codes").insert({
         "target": target,
         "code": code,
         "type": code_type,
         "expires_at": expires_at.isoformat(),
         "used": False
-    }).execute()
-    
-    # In development: print to console
-    print("\n" + "=" * 50)
-    print(f"📧 验证码发送至: {target}")
-    print(f"🔢 验证码: {code}")
-    print(f"📝 类型: {'注册' if code_type == 'register' else '登录'}")
-    print(f"⏰ 有效期: {settings.verification_code_expire_minutes} 分钟")
-    print("=" * 50 + "\n")
-    
-    # TODO: In production, integrate with SMS/email service
-    # Example:
-    # if '@' in target:
-    #     send_email(target, f"Your verification code is: {code}")
-    # else:
-    #     send_sms(target, f"Your verification code is: {code}")
+    }))
+    
+    # Deliver in the background so a slow provider never delays the response
+    delivery_queue.enqueue(verification_message(target, code, code_type))
     
     return code
 
@@ -95,14 +100,14 @@ async def verify_code(
     now = datetime.now(timezone.utc).isoformat()
     
     # Find valid code
-    response = db.table("verification_codes").select("*").eq("target", target).eq("code", code).eq("type", code_type).eq("used", False).gte("expires_at", now).execute()
+    response = await execute(db.table("verification_codes").select("*").eq("target", target).eq("code", code).eq("type", code_type).eq("used", False).gte("expires_at", now))
     
     if not response.data:
         return False
     
     # Mark code as used
     code_id = response.data[0]["id"]
-    db.table("verification_codes").update({"used": True}).eq("id", code_id).execute()
+    await execute(db.table("verification_codes").update({"used": True}).eq("id", code_id))
     
     return True
 
@@ -117,6 +122,6 @@ async def cleanup_expired_codes(db: Client) -> int:
     now = datetime.now(timezone.utc).isoformat()
     
     # Delete expired codes
-    response = db.table("verification_codes").delete().lt("expires_at", now).execute()
+    response = await execute(db.table("verification_codes").delete().lt("expires_at", now))
     
     return len(response.data) if response.data else 0
@@ -0,0 +1,29 @@
+import pytest
+from fastapi import HTTPException
+
+from config import settings
+from routes.admin import require_admin_token
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+
+
+async def test_matching_token_is_accepted():
+    assert await require_admin_token("s3cret") is None
+
+
+@pytest.mark.parametrize("header", ["", "wrong", "s3crét", "\xff\xfe"])
+async def test_other_tokens_are_forbidden(header):
+    with pytest.raises(HTTPException) as excinfo:
+        await require_admin_token(header)
+    assert excinfo.value.status_code == 403
+
+
+async def test_admin_routes_are_hidden_without_a_configured_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "")
+
+    with pytest.raises(HTTPException) as excinfo:
+        await require_admin_token("anything")
+    assert excinfo.value.status_code == 404
@@ -0,0 +1,115 @@
+from typing import Dict, List
+
+import pytest
+from fastapi import HTTPException
+
+from config import settings
+from services.bulk_ingest import _iter_lines, iter_records
+
+
+class StreamedRequest:
+    """Just enough of a Starlette Request for the body parsers."""
+
+    def __init__(self, chunks: List[bytes], headers: Dict[str, str] = None):
+        self.chunks = chunks
+        self.headers = headers or {}
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+async def test_lines_split_across_chunks():
+    request = StreamedRequest([b"\xef\xbb\xbffirst\r\nsec", b"ond\n", b"\n", b"last"])
+
+    assert await collect(_iter_lines(request)) == ["first", "second", "", "last"]
+
+
+async def test_multibyte_character_split_between_chunks():
+    encoded = "冰川\n".encode()
+
+    assert await collect(_iter_lines(StreamedRequest([encoded[:4], encoded[4:]]))) == ["冰川"]
+
+
+async def test_long_line_without_newlines_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "bulk_max_line_length", 8)
+
+    with pytest.raises(HTTPException) as excinfo:
+        await collect(_iter_lines(StreamedRequest([b"abcd"] * 3)))
+    assert excinfo.value.status_code == 413
+
+
+async def test_body_over_the_limit_is_rejected_while_streaming(monkeypatch):
+    monkeypatch.setattr(settings, "bulk_max_body_bytes", 10)
+    request = StreamedRequest([b"line one\n", b"line two\n"])
+
+    lines = []
+    with pytest.raises(HTTPException) as excinfo:
+        async for line in _iter_lines(request):
+            lines.append(line)
+    assert excinfo.value.status_code == 413
+    assert lines == ["line one"]
+
+
+async def test_declared_length_over_the_limit_is_rejected_up_front(monkeypatch):
+    monkeypatch.setattr(settings, "bulk_max_body_bytes", 10)
+    request = StreamedRequest([], {"content-length": "11", "content-type": "application/json"})
+
+    with pytest.raises(HTTPException) as excinfo:
+        await collect(iter_records(request))
+    assert excinfo.value.status_code == 413
+
+
+async def test_ndjson_records_and_errors():
+    request = StreamedRequest(
+        [b'{"name": "Everest"}\n\nnot json\n[1]\n'],
+        {"content-type": "application/x-ndjson"},
+    )
+
+    records = await collect(iter_records(request))
+
+    assert records[0] == ({"name": "Everest"}, None)
+    assert records[1][0] is None and records[1][1].startswith("Invalid JSON")
+    assert records[2] == (None, "Each line must be a JSON object")
+
+
+async def test_csv_quoted_field_spanning_lines():
+    request = StreamedRequest(
+        [b'name,stats\nK2,"{""height"":\n', b' 8611}"\n', b"Lhotse,\n"],
+        {"content-type": "text/csv"},
+    )
+
+    records = await collect(iter_records(request, json_fields=("stats",)))
+
+    assert records == [
+        ({"name": "K2", "stats": {"height": 8611}}, None),
+        ({"name": "Lhotse", "stats": None}, None),
+    ]
+
+
+async def test_csv_record_over_the_limit_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "bulk_max_line_length", 20)
+    request = StreamedRequest([b'name\n"' + b"x\n" * 20], {"content-type": "text/csv"})
+
+    with pytest.raises(HTTPException) as excinfo:
+        await collect(iter_records(request))
+    assert excinfo.value.status_code == 413
+
+
+async def test_json_array_body():
+    request = StreamedRequest([b'[{"name": "Fuji"}, ', b"3]"], {"content-type": "application/json"})
+
+    assert await collect(iter_records(request)) == [
+        ({"name": "Fuji"}, None),
+        (None, "Each item must be a JSON object"),
+    ]
+
+
+def test_unsupported_content_type():
+    with pytest.raises(HTTPException) as excinfo:
+        iter_records(StreamedRequest([], {"content-type": "application/xml"}))
+    assert excinfo.value.status_code == 415
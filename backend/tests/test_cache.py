@@ -0,0 +1,103 @@
+import pytest
+
+from services import cache
+from services.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    entries = TTLCache(maxsize=4, ttl_seconds=10)
+    entries.set("a", 1)
+
+    clock[0] += 9.9
+    assert entries.get("a") == 1
+
+    clock[0] += 0.2
+    assert entries.get("a") is None
+    assert entries.stats() == {"hits": 1, "misses": 1, "size": 0, "maxsize": 4}
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    entries = TTLCache(maxsize=2, ttl_seconds=10)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.get("a")
+
+    entries.set("c", 3)
+
+    assert entries.peek("b") is None
+    assert entries.peek("a") == 1
+    assert entries.peek("c") == 3
+
+
+def test_peek_does_not_touch_order_or_counters(clock):
+    entries = TTLCache(maxsize=2, ttl_seconds=10)
+    entries.set("a", 1)
+    entries.set("b", 2)
+
+    assert entries.peek("a") == 1
+    entries.set("c", 3)
+
+    assert entries.peek("a") is None
+    assert entries.stats()["hits"] == 0
+
+
+def test_zero_size_cache_stores_nothing(clock):
+    entries = TTLCache(maxsize=0, ttl_seconds=10)
+    entries.set("a", 1)
+    assert entries.get("a") is None
+
+
+def test_load_racing_an_invalidation_is_not_stored(clock):
+    entries = TTLCache(maxsize=4, ttl_seconds=10)
+    generation = entries.generation()
+
+    entries.invalidate("user")
+    entries.set("user", "stale row", generation=generation)
+    assert entries.peek("user") is None
+
+    entries.set("user", "fresh row", generation=entries.generation())
+    assert entries.peek("user") == "fresh row"
+
+
+def test_invalidation_of_another_key_does_not_block_a_load(clock):
+    entries = TTLCache(maxsize=4, ttl_seconds=10)
+    generation = entries.generation()
+
+    entries.invalidate("other")
+    entries.set("user", "row", generation=generation)
+
+    assert entries.peek("user") == "row"
+
+
+def test_forgotten_invalidations_block_older_loads_conservatively(clock):
+    entries = TTLCache(maxsize=2, ttl_seconds=10)
+    generation = entries.generation()
+
+    # More invalidations than the cache tracks individually
+    for key in ("a", "b", "c", "d"):
+        entries.invalidate(key)
+
+    entries.set("user", "row", generation=generation)
+    assert entries.peek("user") is None
+
+    entries.set("user", "row", generation=entries.generation())
+    assert entries.peek("user") == "row"
+
+
+def test_clear_blocks_loads_started_before_it(clock):
+    entries = TTLCache(maxsize=4, ttl_seconds=10)
+    entries.set("a", 1)
+    generation = entries.generation()
+
+    entries.clear()
+    entries.set("b", 2, generation=generation)
+
+    assert entries.peek("a") is None
+    assert entries.peek("b") is None
@@ -0,0 +1,76 @@
+from typing import List, Optional
+
+from config import settings
+from services.delivery import DeliveryQueue, OutboundMessage
+
+
+class ScriptedSender:
+    """Returns the queued result lists in order, recording each batch."""
+
+    def __init__(self, *results: List[Optional[str]]):
+        self.results = list(results)
+        self.batches: List[List[OutboundMessage]] = []
+
+    async def send_batch(self, messages: List[OutboundMessage]) -> List[Optional[str]]:
+        self.batches.append(list(messages))
+        return self.results.pop(0) if self.results else [None] * len(messages)
+
+
+def message(target: str) -> OutboundMessage:
+    return OutboundMessage(channel="email", target=target, subject="code", body="123456")
+
+
+async def test_missing_results_count_as_failures(monkeypatch):
+    monkeypatch.setattr(settings, "delivery_max_attempts", 1)
+    queue = DeliveryQueue({"email": ScriptedSender([None])})
+
+    await queue._deliver("email", [message("a@example.com"), message("b@example.com")])
+
+    assert queue.sent == 1
+    assert [m.target for m in queue.dead_letters] == ["b@example.com"]
+    assert queue.dead_letters[0].last_error == "Sender returned no result"
+
+
+async def test_stop_dead_letters_pending_retries(monkeypatch):
+    monkeypatch.setattr(settings, "delivery_retry_base_seconds", 60.0)
+    sender = ScriptedSender(["SMTP 451"])
+    queue = DeliveryQueue({"email": sender})
+    queue.start()
+
+    assert queue.enqueue(message("a@example.com"))
+    await queue._queue.join()
+    assert queue.stats()["retrying"] == 1
+
+    await queue.stop()
+
+    assert queue.stats()["retrying"] == 0
+    assert [m.target for m in queue.dead_letters] == ["a@example.com"]
+    assert "SMTP 451" in queue.dead_letters[0].last_error
+
+
+async def test_failure_during_the_shutdown_drain_is_dead_lettered(monkeypatch):
+    monkeypatch.setattr(settings, "delivery_retry_base_seconds", 60.0)
+    queue = DeliveryQueue({"email": ScriptedSender(["SMTP 421"])})
+    queue.start()
+
+    # Still queued when stop() starts draining, so it fails during the drain
+    assert queue.enqueue(message("a@example.com"))
+    await queue.stop()
+
+    assert queue.stats()["retrying"] == 0
+    assert [m.target for m in queue.dead_letters] == ["a@example.com"]
+    assert "SMTP 421" in queue.dead_letters[0].last_error
+
+
+async def test_queue_retries_again_after_a_restart(monkeypatch):
+    monkeypatch.setattr(settings, "delivery_retry_base_seconds", 60.0)
+    queue = DeliveryQueue({"email": ScriptedSender(["SMTP 421"])})
+    queue.start()
+    await queue.stop()
+    queue.start()
+
+    assert queue.enqueue(message("a@example.com"))
+    await queue._queue.join()
+
+    assert queue.stats()["retrying"] == 1
+    await queue.stop()
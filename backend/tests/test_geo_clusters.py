@@ -0,0 +1,38 @@
+from services.geo_clusters import ClusterTileCache, aggregate_rows
+from services.geo_index import tile_for_point
+
+FEATURE = {"latitude": 27.988, "longitude": 86.925, "feature_type": "mountain"}
+
+
+def test_insert_is_folded_into_cached_tiles():
+    tiles = ClusterTileCache(maxsize=16, ttl_seconds=60)
+    x, y = tile_for_point(FEATURE["latitude"], FEATURE["longitude"], 3)
+    tiles.set(3, x, y, {})
+
+    tiles.add_feature(FEATURE)
+
+    cells = tiles.get(3, x, y)
+    assert sum(cell[0] for cell in cells.values()) == 1
+
+
+def test_tile_computed_across_an_insert_is_not_cached():
+    tiles = ClusterTileCache(maxsize=16, ttl_seconds=60)
+    x, y = tile_for_point(FEATURE["latitude"], FEATURE["longitude"], 3)
+
+    generation = tiles.generation()
+    cells = aggregate_rows([], 6)  # read before the insert
+    tiles.add_feature(FEATURE)
+    tiles.set(3, x, y, cells, generation=generation)
+
+    assert tiles.get(3, x, y) is None
+
+
+def test_insert_elsewhere_does_not_block_a_tile():
+    tiles = ClusterTileCache(maxsize=16, ttl_seconds=60)
+    x, y = tile_for_point(-33.9, 18.4, 3)
+
+    generation = tiles.generation()
+    tiles.add_feature(FEATURE)
+    tiles.set(3, x, y, {}, generation=generation)
+
+    assert tiles.get(3, x, y) == {}
@@ -0,0 +1,73 @@
+import asyncio
+
+from services.overload import ConcurrencyLimiter, route_class
+
+
+async def test_admits_up_to_the_limit_then_queues():
+    limiter = ConcurrencyLimiter("test", limit=2, queue_size=1, queue_timeout_seconds=1.0)
+
+    assert await limiter.acquire()
+    assert await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.stats()["waiting"] == 1
+
+    await limiter.release()
+    assert await waiter
+    assert limiter.stats()["in_flight"] == 2
+    assert limiter.stats()["admitted"] == 3
+
+
+async def test_sheds_immediately_when_the_queue_is_full():
+    limiter = ConcurrencyLimiter("test", limit=1, queue_size=1, queue_timeout_seconds=1.0)
+    assert await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    assert not await limiter.acquire()
+    assert limiter.stats()["shed"] == 1
+
+    await limiter.release()
+    assert await waiter
+
+
+async def test_sheds_after_waiting_too_long():
+    limiter = ConcurrencyLimiter("test", limit=1, queue_size=4, queue_timeout_seconds=0.01)
+    assert await limiter.acquire()
+
+    assert not await limiter.acquire()
+
+    stats = limiter.stats()
+    assert stats["queue_timeouts"] == 1
+    assert stats["shed"] == 1
+    assert stats["waiting"] == 0
+    assert stats["in_flight"] == 1
+
+
+async def test_new_arrivals_do_not_overtake_waiters():
+    limiter = ConcurrencyLimiter("test", limit=1, queue_size=4, queue_timeout_seconds=1.0)
+    assert await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    await limiter.release()
+    # A slot is free, but a request is already waiting for it
+    late = asyncio.create_task(limiter.acquire())
+
+    assert await waiter
+    await limiter.release()
+    assert await late
+
+
+def test_route_classes():
+    assert route_class("/api/auth/login/password") == "auth"
+    assert route_class("/api/levels/user/u1/progress") == "progress"
+    assert route_class("/api/users/u1/progress") == "progress"
+    assert route_class("/api/users/u1/export") is None
+    assert route_class("/api/geo-features/bulk") is None
+    assert route_class("/api/geo-features/nearby") == "catalog"
+    assert route_class("/api/levels/") == "catalog"
+    assert route_class("/api/mistakes/") == "mistakes"
+    assert route_class("/health/ready") is None
+    assert route_class("/metrics") is None
@@ -0,0 +1,77 @@
+import pytest
+from fastapi import HTTPException, Response
+
+from services.pagination import NEXT_CURSOR_HEADER, apply_cursor, decode_cursor, encode_cursor, set_next_cursor
+
+
+class RecordingQuery:
+    """Stands in for a PostgREST select builder, recording the calls made on it."""
+
+    def __init__(self):
+        self.calls = []
+
+    def or_(self, filters):
+        self.calls.append(("or", filters))
+        return self
+
+    def order(self, column, desc=False):
+        self.calls.append(("order", column, desc))
+        return self
+
+
+def test_cursor_round_trip():
+    row = {"created_at": "2024-05-01T08:00:00+00:00", "id": "7d1f", "name": "ignored"}
+
+    cursor = encode_cursor(row, ("created_at", "id"))
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, ("created_at", "id")) == ["2024-05-01T08:00:00+00:00", "7d1f"]
+
+
+def test_cursor_keeps_unicode_and_non_string_values():
+    row = {"title": "珠穆朗玛峰 \"8848\"", "id": 42}
+
+    assert decode_cursor(encode_cursor(row, ("title", "id")), ("title", "id")) == ['珠穆朗玛峰 "8848"', 42]
+
+
+@pytest.mark.parametrize("cursor", ["not base64 at all!", "e30", encode_cursor({"a": 1}, ("a",))])
+def test_malformed_or_mismatched_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor, ("created_at", "id"))
+    assert excinfo.value.status_code == 400
+
+
+def test_apply_cursor_filters_after_the_last_row():
+    cursor = encode_cursor({"created_at": "2024-05-01", "id": "b"}, ("created_at", "id"))
+
+    query = apply_cursor(RecordingQuery(), cursor, "created_at", desc=True)
+
+    assert query.calls == [
+        ("or", 'created_at.lt."2024-05-01",and(created_at.eq."2024-05-01",id.lt."b")'),
+        ("order", "created_at", True),
+        ("order", "id", True),
+    ]
+
+
+def test_apply_cursor_without_cursor_only_orders():
+    assert apply_cursor(RecordingQuery(), None, "name").calls == [("order", "name", False), ("order", "id", False)]
+
+
+def test_next_cursor_only_for_full_pages():
+    rows = [{"name": "a", "id": 1}, {"name": "b", "id": 2}]
+
+    response = Response()
+    assert set_next_cursor(response, rows, limit=3, column="name") is None
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+    cursor = set_next_cursor(response, rows, limit=2, column="name")
+    assert response.headers[NEXT_CURSOR_HEADER] == cursor
+    assert decode_cursor(cursor, ("name", "id")) == ["b", 2]
+
+
+@pytest.mark.parametrize("limit", [0, -1, 5])
+def test_no_cursor_for_an_empty_page(limit):
+    response = Response()
+
+    assert set_next_cursor(response, [], limit=limit, column="name") is None
+    assert NEXT_CURSOR_HEADER not in response.headers
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from config import settings
+from services import auth_service
+from services.overload import ConcurrencyLimiter, _deadline
+
+
+def set_request_deadline(seconds: float) -> None:
+    """Act as if inside a request due `seconds` from now (the test task's context is discarded after)."""
+    limiter = ConcurrencyLimiter("test", limit=1, queue_size=0, queue_timeout_seconds=0)
+    _deadline.set((time.monotonic() + seconds, limiter))
+
+
+async def test_job_runs_on_the_pool():
+    assert await auth_service._run_password_job(lambda a, b: a + b, 2, 3) == 5
+    assert auth_service.password_pool_stats()["pending"] == 0
+
+
+async def test_sheds_when_too_many_jobs_are_pending(monkeypatch):
+    monkeypatch.setattr(settings, "password_hash_max_pending", 0)
+    shed = auth_service.password_pool_stats()["shed"]
+
+    with pytest.raises(HTTPException) as excinfo:
+        await auth_service._run_password_job(lambda: "hash")
+
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.headers["Retry-After"] == str(settings.password_hash_retry_after_seconds)
+    assert auth_service.password_pool_stats()["shed"] == shed + 1
+
+
+async def test_sheds_when_the_request_is_already_out_of_time():
+    set_request_deadline(-1)
+
+    with pytest.raises(HTTPException) as excinfo:
+        await auth_service._run_password_job(lambda: "hash")
+    assert excinfo.value.status_code == 503
+
+
+async def test_job_queued_past_the_deadline_is_skipped():
+    release = threading.Event()
+    ran = []
+    expired = auth_service.password_pool_stats()["expired"]
+
+    # Occupy every worker so the next job has to wait in the queue
+    blockers = [
+        asyncio.ensure_future(auth_service._run_password_job(release.wait))
+        for _ in range(settings.password_hash_workers)
+    ]
+    await asyncio.sleep(0.05)
+
+    set_request_deadline(0.05)
+    queued = asyncio.ensure_future(auth_service._run_password_job(lambda: ran.append(True)))
+    await asyncio.sleep(0.1)
+    release.set()
+
+    with pytest.raises(HTTPException) as excinfo:
+        await queued
+    await asyncio.gather(*blockers)
+
+    assert excinfo.value.status_code == 503
+    assert ran == []
+    assert auth_service.password_pool_stats()["expired"] == expired + 1
@@ -0,0 +1,108 @@
+import pytest
+from fastapi import HTTPException
+
+from routes.auth import router
+from services import rate_limit
+from services.rate_limit import LocalRedis, MemoryBackend, RateLimiter, RedisBackend
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+async def test_memory_bucket_bursts_then_refills(clock):
+    backend = MemoryBackend(max_keys=10)
+
+    for _ in range(3):
+        assert (await backend.take("k", capacity=3, refill_per_second=1.0))[0]
+
+    allowed, retry_after = await backend.take("k", capacity=3, refill_per_second=1.0)
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+
+    clock.now += 1.0
+    assert (await backend.take("k", capacity=3, refill_per_second=1.0))[0]
+    assert not (await backend.take("k", capacity=3, refill_per_second=1.0))[0]
+
+
+async def test_memory_buckets_are_per_key_and_bounded(clock):
+    backend = MemoryBackend(max_keys=2)
+
+    assert (await backend.take("a", capacity=1, refill_per_second=0.1))[0]
+    assert (await backend.take("b", capacity=1, refill_per_second=0.1))[0]
+    assert not (await backend.take("a", capacity=1, refill_per_second=0.1))[0]
+
+    # "c" evicts the least recently used bucket ("b"), which starts full again
+    assert (await backend.take("c", capacity=1, refill_per_second=0.1))[0]
+    assert (await backend.take("b", capacity=1, refill_per_second=0.1))[0]
+
+
+async def test_redis_backend_against_local_stand_in():
+    backend = RedisBackend("local://")
+    clock = Clock()
+    backend._redis._clock = clock
+
+    assert await backend.take("k", capacity=2, refill_per_second=0.5) == (True, 0.0)
+    assert await backend.take("k", capacity=2, refill_per_second=0.5) == (True, 0.0)
+    allowed, retry_after = await backend.take("k", capacity=2, refill_per_second=0.5)
+    assert not allowed
+    assert retry_after == pytest.approx(2.0)
+
+    clock.now += 2.0
+    assert (await backend.take("k", capacity=2, refill_per_second=0.5))[0]
+
+
+async def test_local_redis_expires_idle_buckets():
+    clock = Clock()
+    redis = LocalRedis(clock=clock)
+    script = redis.register_script(rate_limit._TOKEN_BUCKET_SCRIPT)
+
+    assert await script(keys=["a"], args=[1, 1.0]) == [1, "0.0"]
+    clock.now += 10
+    await script(keys=["b"], args=[1, 1.0])
+    assert "a" not in redis._hashes
+
+
+def test_local_redis_rejects_other_scripts():
+    with pytest.raises(ValueError):
+        LocalRedis().register_script("return 1")
+
+
+async def test_limiter_raises_429_with_retry_after(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "_backend", MemoryBackend(max_keys=10))
+    limiter = RateLimiter("test_limiter", limit=1, period_seconds=60)
+
+    await limiter.hit("1.2.3.4")
+    with pytest.raises(HTTPException) as excinfo:
+        await limiter.hit("1.2.3.4")
+
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.headers["Retry-After"] == "60"
+    assert limiter.stats()["allowed"] == 1
+    assert limiter.stats()["limited"] == 1
+
+
+def test_ip_limit_only_guards_credential_endpoints():
+    limited = {
+        route.path
+        for route in router.routes
+        if any(dependency.dependency.__qualname__.startswith("limit_by_ip") for dependency in route.dependencies)
+    }
+
+    assert limited == {
+        "/api/auth/send-code",
+        "/api/auth/register",
+        "/api/auth/login/password",
+        "/api/auth/login/code",
+    }
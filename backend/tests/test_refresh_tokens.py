@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from supabase import ClientOptions, create_client
+
+from benchmarks.fake_postgrest import FakePostgREST
+from services.auth_service import hash_token, revoke_refresh_token, rotate_refresh_token
+
+LEGACY_TOKEN = "legacy-opaque-refresh-token"
+USER_ID = "5b0f1c0e-8d1e-4c59-9a57-0d7c2f1d9a11"
+
+
+@pytest.fixture
+def fake():
+    fake = FakePostgREST()
+    fake.insert("refresh_tokens", {
+        "user_id": USER_ID,
+        "token_hash": hash_token(LEGACY_TOKEN),
+        "expires_at": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat(),
+    })
+    return fake
+
+
+@pytest.fixture
+def db(fake):
+    http_client = httpx.Client(transport=fake)
+    yield create_client("http://postgrest.test", "test-key", options=ClientOptions(httpx_client=http_client))
+    http_client.close()
+
+
+async def test_legacy_token_is_migrated_once(db):
+    rotated = await rotate_refresh_token(db, LEGACY_TOKEN)
+
+    assert rotated is not None
+    user_id, family_id, new_token = rotated
+    assert user_id == USER_ID
+    assert new_token != LEGACY_TOKEN
+    assert await rotate_refresh_token(db, LEGACY_TOKEN) is None
+
+
+async def test_concurrent_refreshes_with_one_legacy_token_rotate_once(db):
+    results = await asyncio.gather(*(rotate_refresh_token(db, LEGACY_TOKEN) for _ in range(5)))
+
+    assert sum(result is not None for result in results) == 1
+
+
+async def test_revoking_a_legacy_token_twice_reports_the_second_as_not_revoked(db):
+    assert await revoke_refresh_token(db, LEGACY_TOKEN) is True
+    assert await revoke_refresh_token(db, LEGACY_TOKEN) is False
+    assert await rotate_refresh_token(db, LEGACY_TOKEN) is None
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_execution():
+    group = SingleFlight()
+    started = 0
+    release = asyncio.Event()
+
+    async def load():
+        nonlocal started
+        started += 1
+        await release.wait()
+        return "levels"
+
+    callers = [asyncio.create_task(group.do(("levels", "all"), load)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*callers) == ["levels"] * 5
+    assert started == 1
+    assert group.stats()["coalesced"] == 4
+    assert group.stats()["in_flight"] == 0
+
+
+async def test_key_is_free_again_once_the_call_finishes():
+    group = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await group.do("k", load) == 1
+    assert await group.do("k", load) == 2
+
+
+async def test_errors_reach_every_caller():
+    group = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        raise RuntimeError("db down")
+
+    callers = [asyncio.create_task(group.do("k", load)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_cancelled_caller_does_not_cancel_the_shared_load():
+    group = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "row"
+
+    first = asyncio.create_task(group.do("k", load))
+    second = asyncio.create_task(group.do("k", load))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    release.set()
+
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert await second == "row"
+
+
+async def test_forget_starts_a_fresh_call():
+    group = SingleFlight()
+    release = asyncio.Event()
+    results = iter(["before write", "after write"])
+
+    async def load():
+        value = next(results)
+        await release.wait()
+        return value
+
+    stale = asyncio.create_task(group.do("k", load))
+    await asyncio.sleep(0)
+    group.forget("k")
+    fresh = asyncio.create_task(group.do("k", load))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await stale == "before write"
+    assert await fresh == "after write"
@@ -0,0 +1,47 @@
+from services.token_revocation import BloomFilter, RevocationSet
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"family-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    assert bloom.count == 1000
+
+
+def test_bloom_filter_false_positive_rate_stays_near_target():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    for i in range(2000):
+        bloom.add(f"revoked-{i}")
+
+    false_positives = sum(f"active-{i}" in bloom for i in range(20000))
+
+    assert false_positives / 20000 < 0.02
+
+
+def test_bloom_filter_is_sized_from_capacity_and_error_rate():
+    bloom = BloomFilter(capacity=100000, error_rate=0.001)
+
+    # m = -n ln p / (ln 2)^2 ≈ 14.4 bits per item, k = m/n ln 2 ≈ 10 hashes
+    assert 1_430_000 < bloom.size < 1_440_000
+    assert bloom.hash_count == 10
+
+
+async def test_unknown_family_is_answered_by_the_filter_alone():
+    revoked = RevocationSet(capacity=100, error_rate=0.01)
+
+    # No database: a filter negative must not need one
+    assert await revoked.is_revoked(None, "never-revoked") is False
+    assert revoked.stats()["filter_negatives"] == 1
+    assert revoked.stats()["exact_checks"] == 0
+
+
+async def test_local_revocation_is_confirmed_without_a_query():
+    revoked = RevocationSet(capacity=100, error_rate=0.01)
+    revoked.add("family-1")
+
+    assert await revoked.is_revoked(None, "family-1") is True
+    assert revoked.stats()["exact_checks"] == 0
+    assert revoked.stats()["revoked"] == 1